@@ -0,0 +1,140 @@
+"""
+Batched inserts / upserts behind ``POST /{prefix}/bulk`` on the generic CRUD routers.
+
+Rows are validated against the table's column whitelist, split into
+batches and written with a bounded number of concurrent PostgREST calls.
+A batch rejected by the database is bisected until the offending rows are
+isolated, so one bad row costs O(log batch) extra calls and the rest of the
+batch is still written.
+
+An insert batch sends the union of its rows' columns, a row's missing ones
+taking their defaults. An upsert must not do that: on conflict, a column the
+caller never sent for a row would be reset to its default. Upsert rows are
+therefore grouped by their exact set of columns, and each group is batched
+on its own, so an upsert only ever touches the columns a row names.
+"""
+
+import asyncio
+import json
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+
+from app.db import supabase_async, PostgrestError
+from app.query import QueryError, validate_column
+
+
+def parse_rows(body: bytes, ndjson: bool) -> List[Any]:
+    """A JSON array, or one JSON document per line for NDJSON bodies."""
+    try:
+        if ndjson:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        rows = json.loads(body or b"[]")
+    except ValueError as e:
+        raise QueryError(f"Malformed body: {e}")
+    if not isinstance(rows, list):
+        raise QueryError("Body must be a JSON array of rows")
+    return rows
+
+
+def conflict_target(
+    on_conflict: Optional[str],
+    pk: str,
+    unique_keys: Sequence[Tuple[str, ...]],
+) -> str:
+    """Upsert conflict columns: the pk by default, otherwise one of the table's UNIQUE keys."""
+    if not on_conflict:
+        return pk
+    columns = tuple(c.strip() for c in on_conflict.split(",") if c.strip())
+    if columns != (pk,) and columns not in unique_keys:
+        raise QueryError(f"on_conflict must be {pk} or a unique key of the table")
+    return ",".join(columns)
+
+
+def _row_error(index: int, detail: str) -> Dict[str, Any]:
+    return {"index": index, "status": "error", "detail": detail}
+
+
+async def write_rows(
+    table: str,
+    rows: List[Any],
+    allowed: Optional[Collection[str]],
+    *,
+    batch_size: int,
+    concurrency: int,
+    upsert_on: Optional[str] = None,
+    returning: bool = True,
+    ignore_duplicates: bool = False,
+    select: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Write ``rows`` in batches; returns per-row results in input order plus totals. With
+    ``upsert_on``, conflicting rows are merged (only the columns each row has), or left
+    untouched when ``ignore_duplicates``. ``select`` narrows the columns returned for each
+    written row.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    valid: List[int] = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or not row:
+            results[index] = _row_error(index, "Row must be a non-empty JSON object")
+            continue
+        try:
+            for column in row:
+                validate_column(column, allowed)
+        except QueryError as e:
+            results[index] = _row_error(index, str(e))
+            continue
+        valid.append(index)
+
+    prefer = ["return=representation" if returning else "return=minimal", "missing=default"]
+    if upsert_on:
+        prefer.append("resolution=ignore-duplicates" if ignore_duplicates else "resolution=merge-duplicates")
+
+    async def write(indices: List[int]) -> None:
+        batch = [rows[i] for i in indices]
+        # One column list per batch: the union of an insert batch's keys, an upsert batch's shared keys
+        columns = sorted(set().union(*batch))
+        params = [("columns", ",".join(columns))]
+        if upsert_on:
+            params.append(("on_conflict", upsert_on))
+        if returning and select:
+            params.append(("select", select))
+        try:
+            written = await supabase_async.insert(table, batch, params=params, prefer=prefer)
+        except PostgrestError as e:
+            if e.status_code >= 500 or len(indices) == 1:
+                for i in indices:
+                    results[i] = _row_error(i, e.message)
+                return
+            middle = len(indices) // 2
+            await write(indices[:middle])
+            await write(indices[middle:])
+            return
+        aligned = returning and len(written) == len(indices)
+        for position, i in enumerate(indices):
+            result = {"index": i, "status": "ok"}
+            if aligned:
+                result["row"] = written[position]
+            results[i] = result
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(indices: List[int]) -> None:
+        async with semaphore:
+            await write(indices)
+
+    # Upserts: one group per distinct column set (see the module docstring); inserts: one group
+    groups: Dict[Any, List[int]] = {}
+    for i in valid:
+        groups.setdefault(frozenset(rows[i]) if upsert_on else None, []).append(i)
+    await asyncio.gather(*(
+        guarded(group[start:start + batch_size])
+        for group in groups.values() for start in range(0, len(group), batch_size)
+    ))
+
+    failed = sum(1 for r in results if r["status"] == "error")
+    return {
+        "total": len(rows),
+        "succeeded": len(rows) - failed,
+        "failed": failed,
+        "results": results,
+    }
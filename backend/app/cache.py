@@ -0,0 +1,123 @@
+"""
+In-process read-through cache for the generic CRUD routers.
+
+Each cache is a size-bounded LRU whose entries expire after a TTL. Entries
+are keyed by the exact upstream query, so a cached page is only reused for
+the same filters / order / fields / cursor. Caches are registered per table
+and ``invalidate(table)`` drops them all; the CRUD routers call it after
+every write so a router never serves its own stale data. Writes made outside
+this process (other workers, the Supabase dashboard) are bounded by the TTL.
+
+Concurrent misses on one key share a single upstream call. The call runs in
+a task owned by the cache, and every caller waits on it through
+``asyncio.shield``: a caller that is cancelled (client gone, timeout) stops
+waiting, while the load carries on for the others and is still cached.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Sequence, Tuple
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Bumped by invalidate() so a load that raced a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        self.misses += 1
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._load(key, load, self._generation))
+        # Every waiter may be gone by the time it fails: the error must not be reported as unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        try:
+            value = await load()
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "ttl": self.ttl,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# table -> caches holding its rows
+_caches: Dict[str, List[TTLCache]] = {}
+
+
+def table_cache(table: str, ttl: float, max_entries: int) -> TTLCache:
+    return shared_cache(table, (table,), ttl, max_entries)
+
+
+def shared_cache(name: str, tables: Sequence[str], ttl: float, max_entries: int) -> TTLCache:
+    """A cache derived from several tables; a write to any of them clears it."""
+    cache = TTLCache(name, ttl, max_entries)
+    for table in tables:
+        _caches.setdefault(table, []).append(cache)
+    return cache
+
+
+def invalidate(table: str) -> None:
+    """Drop every cached read of ``table``; a no-op for tables without a cache."""
+    for cache in _caches.get(table, ()):
+        cache.invalidate()
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    # A shared cache is registered under each of its tables but reported once
+    unique = {id(cache): cache for caches in _caches.values() for cache in caches}
+    return [cache.stats() for cache in unique.values()]
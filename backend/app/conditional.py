@@ -0,0 +1,79 @@
+"""
+Conditional GET helpers: strong ETags, ``If-None-Match`` handling and
+single byte ranges (``Range`` / ``If-Range``) for resumable downloads.
+
+ETags are derived from digests that already exist (the hash of the upstream
+PostgREST body, see ``app.db.Page``) plus whatever shapes the response, so
+a revalidation that matches is answered 304 without encoding the body.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Clients must revalidate every time; the ETag makes that cheap
+CACHE_CONTROL = "no-cache"
+
+
+def strong_etag(*parts: Any) -> str:
+    raw = "\x1f".join(str(p) for p in parts).encode()
+    return '"' + hashlib.blake2b(raw, digest_size=16).hexdigest() + '"'
+
+
+def payload_etag(payload: Any) -> str:
+    """ETag for a small computed payload (e.g. dashboard counters)."""
+    return strong_etag(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str))
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True when the request's ``If-None-Match`` already names ``etag`` (or ``*``)."""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # GET uses weak comparison (RFC 9110 13.1.2), so a W/ prefix from an intermediary still matches
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str, **headers: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, **headers})
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def byte_range(request: Request, size: int, etag: str) -> Optional[Tuple[int, int]]:
+    """
+    The inclusive ``(first, last)`` byte range a ``Range: bytes=...`` header asks of a
+    ``size``-byte body, or None for the whole body: no header, several ranges, or an
+    ``If-Range`` naming another version (the client's partial copy is stale).
+    RangeNotSatisfiable when the range starts past the end.
+    """
+    header = request.headers.get("range", "")
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    validator = request.headers.get("if-range")
+    # If-Range uses strong comparison (RFC 9110 13.1.5)
+    if validator is not None and validator.strip() != etag:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            count = int(last)
+            if count <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - count, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, end
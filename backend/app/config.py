@@ -1,6 +1,7 @@
 import os
+from datetime import time
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     SUPABASE_URL: str
@@ -8,6 +9,81 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_KEY: Optional[str] = None
     ALLOWED_ORIGINS: List[str] = ["http://localhost:5173", "https://hrms-frontend.vercel.app"]
 
+    # Async upstream pool (app/db.py)
+    DB_MAX_CONNECTIONS: int = 100
+    DB_MAX_KEEPALIVE: int = 20
+    DB_KEEPALIVE_EXPIRY: float = 30.0
+    DB_TIMEOUT: float = 30.0
+    DB_MAX_CONCURRENCY: int = 64
+
+    # Generic CRUD list endpoints (app/crud.py)
+    CRUD_DEFAULT_PAGE_SIZE: int = 100
+    CRUD_MAX_PAGE_SIZE: int = 1000
+
+    # POST /{prefix}/bulk (app/bulk.py)
+    BULK_BATCH_SIZE: int = 500
+    BULK_MAX_BATCH_SIZE: int = 2000
+    BULK_MAX_ROWS: int = 50000
+    BULK_CONCURRENCY: int = 4
+
+    # PATCH / DELETE /{prefix}?<filters>: ceiling on rows one statement may touch
+    BULK_MAX_AFFECTED: int = 1000
+
+    # GET /{prefix}/export: rows fetched per upstream page while streaming
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # Responses at least this large are brotli/gzip compressed (app/compression.py)
+    COMPRESSION_MIN_SIZE: int = 1024
+
+    # Read-through cache for rarely changing reference tables (app/cache.py)
+    CACHE_REFERENCE_TTL: float = 300.0
+    CACHE_MAX_ENTRIES: int = 256
+
+    # GET /api/dashboard/stats: count method and how long a snapshot is reused
+    DASHBOARD_COUNT_METHOD: Literal["exact", "planned", "estimated"] = "exact"
+    DASHBOARD_STATS_TTL: float = 15.0
+    # GET /api/dashboard/overview: aggregates are recomputed at most this often (writes clear them)
+    DASHBOARD_OVERVIEW_TTL: float = 60.0
+
+    # Attendance rollup (app/rollup.py): a check-in after this local time counts as late
+    ATTENDANCE_LATE_AFTER: time = time(9, 30)
+
+    # Write-behind check-ins (app/ingest.py): ack after a local journal append, flush in batches
+    ATTENDANCE_WRITE_BEHIND: bool = False
+    INGEST_JOURNAL_DIR: str = "data/ingest"
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_FLUSH_INTERVAL: float = 0.2
+    INGEST_MAX_PENDING: int = 20000
+
+    # Daily attendance derived from attendance_logs (app/derive.py)
+    ATTENDANCE_PUNCH_DEBOUNCE: float = 60.0  # seconds; closer repeats of a punch count once
+    DERIVE_FETCH_CONCURRENCY: int = 8
+    DERIVE_BATCH_SIZE: int = 2000
+
+    # POST /api/attendance/device-logs (app/device_logs.py): NDJSON punches from devices
+    DEVICE_LOG_BATCH_SIZE: int = 5000
+    DEVICE_LOG_CONCURRENCY: int = 4
+    DEVICE_LOG_DEDUPE_WINDOW: int = 500000
+    DEVICE_LOG_MAX_ERRORS: int = 100
+
+    # Payroll runs (app/payroll_engine.py)
+    PAYROLL_PAGE_SIZE: int = 1000  # rows per input page; keep at or below PostgREST's max-rows
+    PAYROLL_BATCH_SIZE: int = 2000
+    PAYROLL_CONCURRENCY: int = 4  # inserts in flight per run (per shard with PAYROLL_WORKERS)
+    PAYROLL_WORKERS: int = 1  # > 1: employees sharded by emp_id across this many processes
+
+    # Payslip PDFs (app/payslip_docs.py): rendered by a process pool, cached on disk by content
+    PAYSLIP_DIR: str = "data/payslips"
+    PAYSLIP_RENDER_WORKERS: int = 2
+    PAYSLIP_RENDER_BATCH: int = 500  # payslips per page and per render task; at most PostgREST's max-rows
+    PAYSLIP_MAX_JOBS: int = 50
+
+    # POST /api/import/{resource} (app/importer.py)
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_CONCURRENCY: int = 4
+    IMPORT_MAX_ERRORS: int = 1000
+    IMPORT_MAX_JOBS: int = 50
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
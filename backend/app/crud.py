@@ -1,55 +1,381 @@
+import logging
+
 from fastapi import APIRouter, HTTPException, Request
-from app.db import supabase
-from typing import List, Optional, Any, Dict
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.bulk import conflict_target, parse_rows, write_rows
+from app.cache import invalidate, table_cache
+from app.config import settings
+from app.conditional import CACHE_CONTROL, if_none_match, not_modified, strong_etag
+from app.db import supabase_async, Page, PostgrestError, parse_content_range
+from app.export import MEDIA_TYPES, encode_csv, encode_ndjson, iter_pages
+from app.passthrough import NO_SINGLE_ROW, SINGLE_OBJECT, RelayResponse, open_upstream, relay, rows_in_range
+from app.query import (
+    QueryError, combine_conditions, count_method, decode_cursor, filter_params, keyset_condition,
+    next_cursor_for, order_clause, page_size, parse_order, search_condition, select_clause, validate_column,
+)
+from app.schema import TABLES, UNIQUE_KEYS, text_columns
+from typing import Awaitable, Callable, List, Literal, Optional, Any, Dict, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Told about every committed write: (rows before, rows after); before=None when it is not known
+WriteHook = Callable[[Optional[List[Dict[str, Any]]], List[Dict[str, Any]]], Awaitable[None]]
+
+def upstream_http_error(e: PostgrestError) -> HTTPException:
+    # Client mistakes (bad column, unique violation, ...) keep their 4xx; everything else is a server error
+    status_code = e.status_code if 400 <= e.status_code < 500 else 500
+    return HTTPException(status_code=status_code, detail=e.message)
+
+# PostgREST error code for a statement rejected by "Prefer: handling=strict, max-affected=N"
+MAX_AFFECTED_EXCEEDED = "PGRST124"
 
-def create_crud_router(table_name: str, pk: str = "id", prefix: str = "") -> APIRouter:
+def create_crud_router(
+    table_name: str,
+    pk: str = "id",
+    prefix: str = "",
+    columns: Optional[Sequence[str]] = None,
+    cache_ttl: Optional[float] = None,
+    passthrough: bool = False,
+    on_write: Optional[WriteHook] = None,
+) -> APIRouter:
+    if cache_ttl and passthrough:
+        raise ValueError("passthrough routers stream upstream bytes and cannot be cached")
     router = APIRouter(prefix=prefix, tags=[table_name.replace("_", "-").title()])
+    # Column -> type whitelist for ?fields= and filters; defaults to the app/schema.py registry entry
+    known_types = TABLES.get(table_name, {})
+    if columns is None and table_name in TABLES:
+        columns = list(known_types)
+    allowed = {c: known_types.get(c) for c in columns} if columns is not None else None
+    search_columns = text_columns(allowed) if allowed else []
+    unique_keys = UNIQUE_KEYS.get(table_name, [])
+    # Opt-in read-through cache for list/get; every write below invalidates it
+    cache = table_cache(table_name, cache_ttl, settings.CACHE_MAX_ENTRIES) if cache_ttl else None
+
+    async def after_write(before: Optional[List[Dict[str, Any]]], after: List[Dict[str, Any]]) -> None:
+        """Run ``on_write``; the write is already committed, so a failing hook is logged, not raised."""
+        if on_write is None or not (before or after):
+            return
+        try:
+            await on_write(before, after)
+        except Exception:
+            logger.exception("on_write hook failed for %s", table_name)
+
+    async def current_rows(params: List[Any]) -> List[Dict[str, Any]]:
+        """Rows a write is about to change, for ``on_write``; skipped when there is no hook."""
+        if on_write is None:
+            return []
+        rows, _ = await supabase_async.select(table_name, [("select", "*"), *params])
+        return rows
+
+    async def select_rows(params: List[Any], count: Optional[str] = None) -> Page:
+        if cache is None:
+            return await supabase_async.select_page(table_name, params, count=count)
+        return await cache.get_or_load(
+            (tuple(params), count), lambda: supabase_async.select_page(table_name, params, count=count)
+        )
 
-    @router.get("", response_model=List[Dict[str, Any]])
+    async def relay_list(params: List[Any], count: Optional[str], paginated: bool, size: int, order) -> RelayResponse:
+        try:
+            upstream, stack = await open_upstream(table_name, params, {"Prefer": f"count={count}"} if count else {})
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+        content_range = upstream.headers.get("content-range")
+        total = parse_content_range(content_range) if count else None
+        body = relay(upstream, envelope=paginated, page_full=rows_in_range(content_range) == size, order=order, pk=pk)
+        return RelayResponse(
+            body,
+            stack,
+            media_type="application/json" if paginated else upstream.headers.get("content-type", "application/json"),
+            headers={"X-Total-Count": str(total)} if total is not None else None,
+        )
+
+    def query_conditions(query) -> List[Any]:
+        """Column filters plus the ?q= search, shared by list and export."""
+        conditions = filter_params(query.multi_items(), allowed)
+        if query.get("q"):
+            if not search_columns:
+                raise QueryError("Search is not supported on this table")
+            conditions.append(search_condition(query["q"], search_columns))
+        return conditions
+
+    @router.get("", response_model=Union[List[Dict[str, Any]], Dict[str, Any]])
     async def list_rows(request: Request):
+        query = request.query_params
+        # ?limit= / ?after= opt into the {"data", "next_cursor"} envelope; plain lists are still capped
+        paginated = "limit" in query or "after" in query
+        try:
+            default_size = settings.CRUD_DEFAULT_PAGE_SIZE if paginated else settings.CRUD_MAX_PAGE_SIZE
+            size = page_size(query.get("limit"), default_size, settings.CRUD_MAX_PAGE_SIZE)
+            order = parse_order(query.get("order"), allowed)
+            count = count_method(query.get("count"))
+            select = select_clause(query.get("fields"), allowed, pk, [order[0]] if order else [])
+            # Keyset on (sort column, pk): cost is the same at any page depth, unlike OFFSET
+            conditions = query_conditions(query)
+            if query.get("after"):
+                conditions.append(keyset_condition(order, pk, decode_cursor(query["after"])))
+        except QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # One extra row tells whether a next page exists; passthrough reads that off Content-Range instead
+        limit = size if passthrough else size + 1
+        params = [("select", select), ("order", order_clause(order, pk)), ("limit", limit)]
+        params.extend(combine_conditions(conditions))
+        if passthrough:
+            return await relay_list(params, count, paginated, size, order)
+        try:
+            page = await select_rows(params, count)
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+
+        rows, total = page.rows, page.total
+        headers = {}
+        if total is not None:
+            headers["X-Total-Count"] = str(total)
+        next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_cursor = next_cursor_for(rows[-1], order, pk)
+            headers["X-Next-Cursor"] = next_cursor
+        # The upstream digest covers the rows; the rest is how they are shaped into this response
+        etag = strong_etag(page.digest, paginated, size, total)
+        if if_none_match(request, etag):
+            return not_modified(etag, **headers)
+        headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        # Rows are upstream JSON already: encode them directly instead of validating them through response_model
+        content = {"data": rows, "next_cursor": next_cursor} if paginated else rows
+        return ORJSONResponse(content, headers=headers)
+
+    # Declared before /{id_val} so "export" is not taken for a primary key
+    @router.get("/export")
+    async def export_rows(request: Request, format: Literal["csv", "ndjson"] = "csv"):
+        """
+        Stream every row matching the list filters / ?q= / ?order= / ?fields= as CSV or
+        NDJSON, paging upstream in EXPORT_CHUNK_SIZE chunks so memory stays flat.
+        """
+        query = request.query_params
+        try:
+            order = parse_order(query.get("order"), allowed)
+            select = select_clause(query.get("fields"), allowed, pk, [order[0]] if order else [])
+            conditions = query_conditions(query)
+        except QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        pages = iter_pages(table_name, select, conditions, order, pk, chunk_size)
         try:
-            query = supabase.table(table_name).select("*")
-            for key, value in request.query_params.items():
-                query = query.eq(key, value)
-            response = query.execute()
-            return response.data
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            # Pull the first page now so a bad filter is still a 4xx rather than a truncated 200
+            first = await pages.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+
+        async def all_pages():
+            if first is None:
+                return
+            yield first
+            async for rows in pages:
+                yield rows
+
+        if format == "csv":
+            columns = select.split(",") if select != "*" else (list(allowed) if allowed else None)
+            body = encode_csv(all_pages(), columns)
+        else:
+            body = encode_ndjson(all_pages())
+        return StreamingResponse(
+            body,
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'},
+        )
 
     @router.get("/{id_val}", response_model=Dict[str, Any])
-    async def get_row(id_val: Any):
+    async def get_row(id_val: Any, request: Request, fields: Optional[str] = None):
         try:
-            response = supabase.table(table_name).select("*").eq(pk, id_val).execute()
-            if not response.data:
-                raise HTTPException(status_code=404, detail="Not found")
-            return response.data[0]
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            select = select_clause(fields, allowed, pk)
+        except QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        params = [("select", select), (pk, f"eq.{id_val}")]
+        if passthrough:
+            try:
+                upstream, stack = await open_upstream(table_name, params, {"Accept": SINGLE_OBJECT})
+            except PostgrestError as e:
+                if e.code == NO_SINGLE_ROW:
+                    raise HTTPException(status_code=404, detail="Not found")
+                raise upstream_http_error(e)
+            # Map PostgREST's vnd.pgrst.object+json to plain JSON for clients
+            return RelayResponse(relay(upstream), stack, media_type="application/json")
+        try:
+            page = await select_rows(params)
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+        if not page.rows:
+            raise HTTPException(status_code=404, detail="Not found")
+        etag = strong_etag(page.digest)
+        if if_none_match(request, etag):
+            return not_modified(etag)
+        return ORJSONResponse(page.rows[0], headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
     @router.post("", response_model=List[Dict[str, Any]], status_code=201)
     async def create_row(body: Dict[str, Any]):
         try:
-            response = supabase.table(table_name).insert(body).execute()
-            return response.data
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            rows = await supabase_async.insert(table_name, body)
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+        finally:
+            invalidate(table_name)
+        await after_write([], rows)
+        return rows
+
+    @router.post("/bulk")
+    async def bulk_write(
+        request: Request,
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        returning: Literal["representation", "minimal"] = "representation",
+    ):
+        """
+        Insert (or with ?upsert=true, upsert on the pk / ?on_conflict= unique key) a JSON
+        array or NDJSON body in batches. Answers per-row results in input order.
+        """
+        ndjson = "ndjson" in request.headers.get("content-type", "")
+        try:
+            target = conflict_target(on_conflict, pk, unique_keys) if upsert else None
+            rows = parse_rows(await request.body(), ndjson)
+        except QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(rows) > settings.BULK_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ROWS} rows per request")
+
+        size = min(max(batch_size or settings.BULK_BATCH_SIZE, 1), settings.BULK_MAX_BATCH_SIZE)
+        try:
+            outcome = await write_rows(
+                table_name,
+                rows,
+                allowed,
+                batch_size=size,
+                concurrency=settings.BULK_CONCURRENCY,
+                upsert_on=target,
+                returning=returning == "representation",
+            )
+        finally:
+            invalidate(table_name)
+        # Upserts may have replaced rows nobody read first, so the hook is told "before unknown"
+        written = [rows[i] for i, result in enumerate(outcome["results"]) if result and result["status"] == "ok"]
+        await after_write(None, written)
+        return outcome
+
+    def matching_params(request: Request) -> List[Any]:
+        """Filters for a set-based PATCH / DELETE; an unfiltered call would touch the whole table."""
+        try:
+            conditions = filter_params(request.query_params.multi_items(), allowed)
+        except QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not conditions:
+            raise HTTPException(status_code=400, detail="At least one filter is required")
+        return conditions
+
+    def affected_limit(max_rows: Optional[int]) -> int:
+        if max_rows is not None and max_rows < 1:
+            raise HTTPException(status_code=400, detail="max_rows must be at least 1")
+        return min(max_rows or settings.BULK_MAX_AFFECTED, settings.BULK_MAX_AFFECTED)
+
+    async def modify_matching(method: str, conditions: List[Any], limit: int, returning: str, body=None):
+        """
+        One upstream statement; PostgREST rolls it back if it would touch more than ``limit``
+        rows, so the safety limit holds without a racy count-then-write.
+        """
+        prefer = ["return=representation", "handling=strict", f"max-affected={limit}"]
+        # returning=minimal still reads back the pks so the affected count is exact
+        full_rows = returning == "representation" or on_write is not None
+        params = [("select", "*" if full_rows else pk), *conditions]
+        try:
+            before = await current_rows([*conditions, ("limit", limit)]) if method == "PATCH" else []
+            if method == "PATCH":
+                rows = await supabase_async.update(table_name, body, params, prefer=prefer)
+            else:
+                rows = await supabase_async.delete(table_name, params, prefer=prefer)
+        except PostgrestError as e:
+            if e.code == MAX_AFFECTED_EXCEEDED:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Filter matches more than {limit} rows; narrow it or raise max_rows",
+                )
+            raise upstream_http_error(e)
+        finally:
+            invalidate(table_name)
+        if method == "PATCH":
+            await after_write(before, rows)
+        else:
+            await after_write(rows, [])
+        return {"count": len(rows), "data": rows if returning == "representation" else None}
+
+    async def dry_run_count(conditions: List[Any], limit: int) -> Dict[str, Any]:
+        try:
+            matched = await supabase_async.count(table_name, conditions)
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+        return {"dry_run": True, "count": matched, "max_rows": limit, "within_limit": matched <= limit}
+
+    @router.patch("", response_model=Dict[str, Any])
+    async def update_matching(
+        request: Request,
+        body: Dict[str, Any],
+        dry_run: bool = False,
+        max_rows: Optional[int] = None,
+        returning: Literal["representation", "minimal"] = "representation",
+    ):
+        """Apply ``body`` to every row matching the list filters (``?dept_id=eq.3``) in one statement."""
+        conditions = matching_params(request)
+        limit = affected_limit(max_rows)
+        if not body:
+            raise HTTPException(status_code=400, detail="Body must set at least one column")
+        try:
+            for column in body:
+                validate_column(column, allowed)
+        except QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if dry_run:
+            return await dry_run_count(conditions, limit)
+        return {"message": "Updated", **await modify_matching("PATCH", conditions, limit, returning, body)}
+
+    @router.delete("", response_model=Dict[str, Any])
+    async def delete_matching(
+        request: Request,
+        dry_run: bool = False,
+        max_rows: Optional[int] = None,
+        returning: Literal["representation", "minimal"] = "representation",
+    ):
+        """Delete every row matching the list filters in one statement."""
+        conditions = matching_params(request)
+        limit = affected_limit(max_rows)
+        if dry_run:
+            return await dry_run_count(conditions, limit)
+        return {"message": "Deleted", **await modify_matching("DELETE", conditions, limit, returning)}
 
     @router.put("/{id_val}", response_model=List[Dict[str, Any]])
     async def update_row(id_val: Any, body: Dict[str, Any]):
         try:
-            response = supabase.table(table_name).update(body).eq(pk, id_val).execute()
-            if not response.data:
-                raise HTTPException(status_code=404, detail="Not found or update failed")
-            return response.data
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            before = await current_rows([(pk, f"eq.{id_val}")])
+            rows = await supabase_async.update(table_name, body, {pk: f"eq.{id_val}"})
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+        finally:
+            invalidate(table_name)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Not found or update failed")
+        await after_write(before, rows)
+        return rows
 
     @router.delete("/{id_val}")
     async def delete_row(id_val: Any):
         try:
-            response = supabase.table(table_name).delete().eq(pk, id_val).execute()
-            return {"message": "Deleted", "data": response.data}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            rows = await supabase_async.delete(table_name, {pk: f"eq.{id_val}"})
+        except PostgrestError as e:
+            raise upstream_http_error(e)
+        finally:
+            invalidate(table_name)
+        await after_write(rows, [])
+        return {"message": "Deleted", "data": rows}
 
     return router
@@ -1,3 +1,10 @@
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import httpx
+import orjson
 from supabase import create_client, Client
 from app.config import settings
 
@@ -6,3 +13,251 @@ key: str = settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY
 
 # Initialize Supabase client
 supabase: Client = create_client(url, key)
+
+# Query params may repeat a key (e.g. two filters on one column), so lists of pairs are accepted too
+Params = Union[Dict[str, Any], Sequence[Tuple[str, Any]]]
+
+
+class Page(NamedTuple):
+    rows: List[Dict[str, Any]]
+    total: Optional[int]
+    # Hash of the upstream body: same digest, same rows
+    digest: str
+
+
+class PostgrestError(Exception):
+    """Non-2xx answer (or transport failure) from the Supabase REST / Auth APIs."""
+
+    def __init__(self, status_code: int, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "PostgrestError":
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return cls(response.status_code, response.text or response.reason_phrase)
+        message = (
+            payload.get("message")
+            or payload.get("msg")
+            or payload.get("error_description")
+            or payload.get("error")
+            or response.reason_phrase
+        )
+        return cls(response.status_code, str(message), payload.get("code") or payload.get("error_code"))
+
+
+def parse_content_range(value: Optional[str]) -> Optional[int]:
+    """Total row count from a PostgREST ``Content-Range`` header (``0-24/3573``, ``*/0``)."""
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+class AsyncSupabase:
+    """
+    Pooled, non-blocking client for the Supabase REST (PostgREST) and Auth APIs.
+
+    A single ``httpx.AsyncClient`` is shared per worker so upstream connections
+    are kept alive between requests, and a semaphore bounds how many upstream
+    calls may be in flight at once so a burst cannot exhaust the pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        *,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 30.0,
+        max_concurrency: int = 64,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout)
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop, not the import-time one
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": self.api_key,
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+                limits=self._limits,
+                timeout=self._timeout,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Params] = None,
+        json: Any = None,
+        content: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Send one upstream request; the response is returned whatever its status."""
+        async with self._semaphore:
+            try:
+                return await self.client.request(
+                    method, path, params=params, json=json, content=content, headers=headers
+                )
+            except httpx.HTTPError as e:
+                raise PostgrestError(503, f"Upstream request failed: {e}") from e
+
+    async def rest(
+        self,
+        method: str,
+        table: str,
+        *,
+        params: Optional[Params] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """PostgREST call on ``/rest/v1/<table>``; raises ``PostgrestError`` on non-2xx."""
+        content = None
+        if json is not None:
+            # orjson: batch bodies of thousands of rows encode several times faster than json.dumps
+            content = orjson.dumps(json)
+            headers = {"Content-Type": "application/json", **(headers or {})}
+        response = await self.request(method, f"/rest/v1/{table}", params=params, content=content, headers=headers)
+        if response.status_code >= 400:
+            raise PostgrestError.from_response(response)
+        return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        table: str,
+        *,
+        params: Optional[Params] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        PostgREST call whose body is left unread for streaming; raises ``PostgrestError``
+        on non-2xx before yielding. Holds a concurrency slot until the body is closed.
+        """
+        async with self._semaphore:
+            request = self.client.build_request(method, f"/rest/v1/{table}", params=params, headers=headers)
+            try:
+                response = await self.client.send(request, stream=True)
+            except httpx.HTTPError as e:
+                raise PostgrestError(503, f"Upstream request failed: {e}") from e
+            try:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise PostgrestError.from_response(response)
+                yield response
+            finally:
+                await response.aclose()
+
+    # --- PostgREST helpers ---
+
+    async def select_page(
+        self,
+        table: str,
+        params: Optional[Params] = None,
+        *,
+        count: Optional[str] = None,
+    ) -> "Page":
+        """Like ``select`` plus a digest of the raw response body, used for ETags without re-encoding."""
+        headers = {"Prefer": f"count={count}"} if count else None
+        response = await self.rest("GET", table, params=params, headers=headers)
+        total = parse_content_range(response.headers.get("content-range")) if count else None
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        return Page(orjson.loads(response.content), total, digest)
+
+    async def select(
+        self,
+        table: str,
+        params: Optional[Params] = None,
+        *,
+        count: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Rows matching ``params`` plus the total count when ``count`` is exact/planned/estimated."""
+        page = await self.select_page(table, params, count=count)
+        return page.rows, page.total
+
+    async def insert(
+        self,
+        table: str,
+        rows: Any,
+        *,
+        params: Optional[Params] = None,
+        prefer: Sequence[str] = ("return=representation",),
+    ) -> List[Dict[str, Any]]:
+        """Insert one row or a batch; ``prefer`` carries PostgREST options such as upsert resolution."""
+        response = await self.rest("POST", table, params=params, json=rows, headers={"Prefer": ",".join(prefer)})
+        return response.json() if response.content else []
+
+    async def count(self, table: str, params: Optional[Params] = None, *, method: str = "exact") -> int:
+        """Number of rows matching ``params`` via a body-less HEAD request."""
+        response = await self.rest("HEAD", table, params=params, headers={"Prefer": f"count={method}"})
+        return parse_content_range(response.headers.get("content-range")) or 0
+
+    async def update(
+        self,
+        table: str,
+        body: Dict[str, Any],
+        params: Params,
+        *,
+        prefer: Sequence[str] = ("return=representation",),
+    ) -> List[Dict[str, Any]]:
+        response = await self.rest("PATCH", table, params=params, json=body, headers={"Prefer": ",".join(prefer)})
+        return response.json() if response.content else []
+
+    async def delete(
+        self,
+        table: str,
+        params: Params,
+        *,
+        prefer: Sequence[str] = ("return=representation",),
+    ) -> List[Dict[str, Any]]:
+        response = await self.rest("DELETE", table, params=params, headers={"Prefer": ",".join(prefer)})
+        return response.json() if response.content else []
+
+    async def rpc(self, function: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Call a Postgres function exposed at ``/rest/v1/rpc/<function>``; ``None`` for void functions."""
+        response = await self.rest("POST", f"rpc/{function}", json=args or {})
+        return orjson.loads(response.content) if response.content else None
+
+
+# Shared async client used by the generic CRUD routers and /api/auth
+supabase_async = AsyncSupabase(
+    url,
+    key,
+    max_connections=settings.DB_MAX_CONNECTIONS,
+    max_keepalive=settings.DB_MAX_KEEPALIVE,
+    keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY,
+    timeout=settings.DB_TIMEOUT,
+    max_concurrency=settings.DB_MAX_CONCURRENCY,
+)
@@ -0,0 +1,289 @@
+"""
+Device punch ingest behind ``POST /api/attendance/device-logs``.
+
+Biometric readers and turnstiles upload NDJSON, one punch per line::
+
+    {"emp_id": 42, "log_time": "2026-10-18T08:59:12+05:30"}
+    {"emp_id": 43, "log_time": 1792310352}
+
+``log_time`` is an ISO-8601 timestamp (naive means UTC) or epoch seconds;
+other keys are ignored. The body is parsed while it streams in (optionally
+gzip-encoded) and written to ``attendance_logs`` in batches of
+``DEVICE_LOG_BATCH_SIZE`` with up to ``DEVICE_LOG_CONCURRENCY`` batches in
+flight, so memory stays bounded whatever the upload size.
+
+Devices resend punches they are unsure about. Repeats of a (emp_id,
+log_time) seen recently are dropped in-process by a bounded window
+(``DEVICE_LOG_DEDUPE_WINDOW`` keys); older repeats, or ones that reach
+another worker, are absorbed by the UNIQUE(emp_id, log_time) index
+(db/attendance_ingest.sql) because batches are upserted with duplicates
+ignored. Resending a whole upload is therefore always safe.
+"""
+
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.bulk import write_rows
+from app.config import settings
+from app.db import supabase_async, PostgrestError
+from app.query import QueryError
+
+logger = logging.getLogger(__name__)
+
+LOG_TABLE = "attendance_logs"
+LOG_CONFLICT = "emp_id,log_time"
+# A line longer than this is refused rather than buffered while waiting for its newline
+MAX_LINE_BYTES = 64 * 1024
+# Decompressed bytes produced per step for gzip bodies
+INFLATE_STEP = 1024 * 1024
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+Row = Dict[str, Any]
+
+
+class DedupeWindow:
+    """
+    Recently seen keys in two generations of ``capacity / 2``: when the current one
+    fills up it becomes the previous one and the old previous one is dropped. Memory
+    is bounded by ``capacity`` keys, and a key is remembered for at least the next
+    ``capacity / 2`` insertions.
+    """
+
+    def __init__(self, capacity: int):
+        self.generation = max(capacity // 2, 1)
+        self.current: set = set()
+        self.previous: set = set()
+
+    def add(self, key: Hashable) -> bool:
+        """Remember ``key``; False when it is already in the window."""
+        if key in self.current or key in self.previous:
+            return False
+        if len(self.current) >= self.generation:
+            self.previous, self.current = self.current, set()
+        self.current.add(key)
+        return True
+
+    def discard(self, keys: Iterable[Hashable]) -> None:
+        """Forget keys whose rows were not written, so a resend is not taken for a repeat."""
+        for key in keys:
+            self.current.discard(key)
+            self.previous.discard(key)
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous)
+
+
+window = DedupeWindow(settings.DEVICE_LOG_DEDUPE_WINDOW)
+totals = {"received": 0, "accepted": 0, "duplicates": 0, "invalid": 0, "rejected": 0, "failed": 0}
+
+
+def parse_punch(line: bytes) -> Tuple[int, datetime]:
+    """``(emp_id, log_time in UTC)`` of one NDJSON line; ValueError explains a bad line."""
+    try:
+        punch = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        raise ValueError("Malformed JSON")
+    if not isinstance(punch, dict):
+        raise ValueError("Line must be a JSON object")
+    emp_id = punch.get("emp_id")
+    if isinstance(emp_id, str) and emp_id.isdigit():
+        emp_id = int(emp_id)
+    if type(emp_id) is not int or emp_id <= 0:
+        raise ValueError("emp_id must be a positive integer")
+    log_time = punch.get("log_time")
+    if isinstance(log_time, str):
+        try:
+            moment = datetime.fromisoformat(log_time)
+        except ValueError:
+            raise ValueError("log_time must be an ISO-8601 timestamp or epoch seconds")
+        moment = moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+    elif isinstance(log_time, (int, float)) and not isinstance(log_time, bool):
+        try:
+            moment = datetime.fromtimestamp(log_time, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError("log_time is out of range")
+    else:
+        raise ValueError("log_time must be an ISO-8601 timestamp or epoch seconds")
+    return emp_id, moment
+
+
+async def _inflate(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """gzip-decoded ``chunks``, produced in bounded steps."""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        async for chunk in chunks:
+            while chunk:
+                yield inflater.decompress(chunk, INFLATE_STEP)
+                chunk = inflater.unconsumed_tail
+        yield inflater.flush()
+    except zlib.error as e:
+        raise QueryError(f"Malformed gzip body: {e}")
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[bytes]]:
+    """Complete lines of the body, in the groups they arrived in."""
+    buffer = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        if len(buffer) > MAX_LINE_BYTES:
+            raise QueryError(f"Line longer than {MAX_LINE_BYTES} bytes")
+        if lines:
+            yield lines
+    if buffer:
+        yield [buffer]
+
+
+class Upload:
+    """Outcome of one request, filled in while its batches are written."""
+
+    def __init__(self, max_errors: int):
+        self.counts = dict.fromkeys(totals, 0)
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+        self.max_errors = max_errors
+
+    def error(self, line: int, detail: str) -> None:
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "detail": detail})
+        else:
+            self.errors_truncated = True
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] += n
+        totals[name] += n
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+async def _write(upload: Upload, rows: List[Row], numbers: List[int], keys: List[int]) -> None:
+    try:
+        await supabase_async.insert(
+            LOG_TABLE,
+            rows,
+            params={"on_conflict": LOG_CONFLICT},
+            prefer=("return=minimal", "resolution=ignore-duplicates"),
+        )
+        upload.count("accepted", len(rows))
+        return
+    except PostgrestError as e:
+        if e.status_code >= 500:
+            window.discard(keys)
+            upload.count("failed", len(rows))
+            upload.error(numbers[0], f"Lines {numbers[0]}-{numbers[-1]} not written: {e.message}")
+            return
+    # Some row is invalid (unknown employee, ...): bisect to find it, keep the rest
+    outcome = await write_rows(
+        LOG_TABLE, rows, None, batch_size=len(rows), concurrency=1,
+        upsert_on=LOG_CONFLICT, returning=False, ignore_duplicates=True,
+    )
+    for number, key, result in zip(numbers, keys, outcome["results"]):
+        if result["status"] == "ok":
+            upload.count("accepted")
+        else:
+            window.discard((key,))
+            upload.count("rejected")
+            upload.error(number, result["detail"])
+
+
+async def ingest(
+    body: AsyncIterator[bytes],
+    *,
+    gzip: bool = False,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_errors: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Parse, dedupe and write an NDJSON stream of punches. Returns counts
+    (received / accepted / duplicates / invalid / rejected / failed) and the
+    first ``max_errors`` per-line errors; ``failed`` rows hit an upstream outage
+    and the upload should be retried.
+    """
+    batch_size = batch_size or settings.DEVICE_LOG_BATCH_SIZE
+    upload = Upload(settings.DEVICE_LOG_MAX_ERRORS if max_errors is None else max_errors)
+    slots = asyncio.Semaphore(concurrency or settings.DEVICE_LOG_CONCURRENCY)
+    tasks: List[asyncio.Task] = []
+    rows: List[Row] = []
+    numbers: List[int] = []
+    keys: List[int] = []
+
+    async def flush() -> None:
+        nonlocal rows, numbers, keys
+        # Waiting for a free slot here stops reading the body, bounding rows held in memory
+        await slots.acquire()
+        batch = (rows, numbers, keys)
+        rows, numbers, keys = [], [], []
+
+        async def run() -> None:
+            try:
+                await _write(upload, *batch)
+            except Exception as e:
+                logger.exception("Device log batch failed")
+                window.discard(batch[2])
+                upload.count("failed", len(batch[0]))
+                upload.error(batch[1][0], f"Lines {batch[1][0]}-{batch[1][-1]} not written: {e}")
+            finally:
+                slots.release()
+
+        tasks.append(asyncio.create_task(run()))
+
+    number = 0
+    try:
+        async for lines in _lines(_inflate(body) if gzip else body):
+            received = invalid = duplicates = 0
+            for line in lines:
+                number += 1
+                if not line.strip():
+                    continue
+                received += 1
+                try:
+                    emp_id, moment = parse_punch(line)
+                except ValueError as e:
+                    invalid += 1
+                    upload.error(number, str(e))
+                    continue
+                # Exact integer key: no collisions, far smaller than an (int, str) tuple
+                key = (emp_id << 64) | ((moment - EPOCH) // MICROSECOND)
+                if not window.add(key):
+                    duplicates += 1
+                    continue
+                rows.append({"emp_id": emp_id, "log_time": moment.isoformat()})
+                numbers.append(number)
+                keys.append(key)
+            upload.count("received", received)
+            upload.count("invalid", invalid)
+            upload.count("duplicates", duplicates)
+            while len(rows) >= batch_size:
+                tail = (rows[batch_size:], numbers[batch_size:], keys[batch_size:])
+                rows, numbers, keys = rows[:batch_size], numbers[:batch_size], keys[:batch_size]
+                await flush()
+                rows, numbers, keys = tail
+        if rows:
+            await flush()
+    except BaseException:
+        # The rest of the body was never read: un-remember what was not written
+        window.discard(keys)
+        raise
+    finally:
+        await asyncio.gather(*tasks)
+    return upload.summary()
+
+
+def metrics() -> Dict[str, Any]:
+    """Punches handled by this worker since start, and the dedupe window's fill."""
+    return {**totals, "window_keys": len(window), "window_capacity": window.generation * 2}
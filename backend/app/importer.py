@@ -0,0 +1,321 @@
+"""
+Streaming CSV / XLSX imports behind ``POST /api/import/{resource}``.
+
+The upload is parsed incrementally with python-multipart and spooled to a
+temporary file as it arrives, so the request never holds the file in
+memory. A background job then reads it back in chunks of
+``IMPORT_CHUNK_SIZE`` rows, validates each chunk against the resource's
+pydantic model in a worker thread, and upserts the valid rows through
+``app.bulk.write_rows``. Up to ``IMPORT_CONCURRENCY`` chunks are in flight,
+so validating one chunk overlaps with writing the previous ones. Progress
+and per-row errors are kept on the job for ``GET /api/import/jobs/{id}``.
+
+A blank cell means "not supplied": a new row gets the column's default and
+an existing row keeps its stored value. The column is left out of that row,
+and ``write_rows`` upserts each set of supplied columns as its own statement.
+To clear a value, edit the record instead of importing a blank.
+"""
+
+import asyncio
+import csv
+import os
+import tempfile
+import uuid
+from bisect import insort
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from multipart.multipart import MultipartParser, parse_options_header
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.bulk import write_rows
+from app.cache import invalidate
+from app.config import settings
+from app.models.employees import (
+    AddressImport, BankDetailImport, ContactImport, EmployeeImport, SalaryStructureImport,
+)
+from app.query import QueryError
+
+# resource -> (table, pk, row model)
+RESOURCES: Dict[str, Tuple[str, str, Type[BaseModel]]] = {
+    "employees": ("employees", "emp_id", EmployeeImport),
+    "contacts": ("contacts", "contact_id", ContactImport),
+    "addresses": ("addresses", "address_id", AddressImport),
+    "bank_details": ("bank_details", "bank_id", BankDetailImport),
+    "salary_structure": ("salary_structure", "salary_id", SalaryStructureImport),
+}
+
+FORMATS = ("csv", "xlsx")
+
+# job id -> job; oldest finished jobs are dropped past IMPORT_MAX_JOBS
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+# --- Upload spooling ---
+
+def _format_for(filename: Optional[str], content_type: str, requested: Optional[str]) -> str:
+    if requested:
+        fmt = requested
+    elif filename and "." in filename:
+        fmt = filename.rsplit(".", 1)[1].lower()
+    elif "spreadsheetml" in content_type:
+        fmt = "xlsx"
+    else:
+        fmt = "csv"
+    if fmt not in FORMATS:
+        raise QueryError("Upload must be a .csv or .xlsx file")
+    return fmt
+
+
+async def spool_upload(request: Request, requested_format: Optional[str]) -> Tuple[str, str]:
+    """
+    Write the uploaded file to a temp file while it streams in; returns ``(path, format)``.
+    Accepts multipart/form-data (first part carrying a filename) or a raw CSV / XLSX body.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    content_type = content_type.decode("latin-1")
+    spool = tempfile.NamedTemporaryFile(prefix="hrms-import-", delete=False)
+    try:
+        if content_type != "multipart/form-data":
+            fmt = _format_for(None, content_type, requested_format)
+            async for block in request.stream():
+                spool.write(block)
+        else:
+            fmt = await _spool_multipart(request, options.get(b"boundary"), spool, requested_format)
+        spool.close()
+        return spool.name, fmt
+    except BaseException:
+        spool.close()
+        os.unlink(spool.name)
+        raise
+
+
+async def _spool_multipart(request: Request, boundary: Optional[bytes], spool, requested_format) -> str:
+    if not boundary:
+        raise QueryError("Missing multipart boundary")
+    state: Dict[str, Any] = {"field": b"", "value": b"", "headers": {}, "target": False, "done": False, "filename": None}
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"], state["value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        filename = disposition.get(b"filename")
+        # Only the first file part is imported; other form fields are ignored
+        state["target"] = filename is not None and not state["done"]
+        if state["target"]:
+            state["filename"] = filename.decode("utf-8", "replace")
+
+    def on_part_data(data, start, end):
+        if state["target"]:
+            spool.write(data[start:end])
+
+    def on_part_end():
+        if state["target"]:
+            state["target"], state["done"] = False, True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+    async for block in request.stream():
+        parser.write(block)
+    parser.finalize()
+    if not state["done"]:
+        raise QueryError("No file part in the upload")
+    return _format_for(state["filename"], "", requested_format)
+
+
+# --- Row sources ---
+
+def _clean(row: Dict[Any, Any]) -> Dict[str, Any]:
+    # Blank cells mean "not supplied": defaults for new rows, stored values kept for existing ones
+    return {
+        str(k).strip(): v.strip() if isinstance(v, str) else v
+        for k, v in row.items()
+        if k is not None and v is not None and not (isinstance(v, str) and not v.strip())
+    }
+
+
+def _csv_rows(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for number, row in enumerate(reader, start=2):
+            yield number, _clean(row)
+
+
+def _xlsx_sheet_rows(path: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    # A file object rather than the path: openpyxl refuses paths without an .xlsx suffix.
+    # read_only streams the sheet XML instead of building the whole workbook.
+    with open(path, "rb") as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+def _xlsx_rows(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    rows = _xlsx_sheet_rows(path)
+    try:
+        header = [str(c).strip() if c is not None else None for c in next(rows, ())]
+        for number, values in enumerate(rows, start=2):
+            if any(v is not None for v in values):
+                yield number, _clean(dict(zip(header, values)))
+    finally:
+        rows.close()
+
+
+def read_header(path: str, fmt: str) -> List[str]:
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return [c.strip() for c in next(csv.reader(f), [])]
+    rows = _xlsx_sheet_rows(path)
+    try:
+        first = next(rows, ())
+    finally:
+        rows.close()
+    return [str(c).strip() for c in first if c is not None]
+
+
+def check_header(header: List[str], model: Type[BaseModel]) -> None:
+    """Reject files whose columns cannot match the model before any row is processed."""
+    if not header:
+        raise QueryError("The file has no header row")
+    fields = model.model_fields
+    unknown = [c for c in header if c and c not in fields]
+    if unknown:
+        raise QueryError(f"Unknown column(s): {', '.join(unknown)}")
+    missing = [name for name, field in fields.items() if field.is_required() and name not in header]
+    if missing:
+        raise QueryError(f"Missing required column(s): {', '.join(missing)}")
+
+
+# --- Validation & write pipeline ---
+
+def validate_chunk(
+    model: Type[BaseModel], chunk: List[Tuple[int, Dict[str, Any]]],
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    valid, errors = [], []
+    for number, raw in chunk:
+        try:
+            row = model.model_validate(raw).model_dump(mode="json", exclude_unset=True)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append({"row": number, "detail": detail})
+            continue
+        valid.append((number, row))
+    return valid, errors
+
+
+def create_job(resource: str, fmt: str) -> Dict[str, Any]:
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "resource": resource,
+        "format": fmt,
+        "status": "queued",
+        "processed": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "errors": [],
+        "errors_truncated": False,
+        "detail": None,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+    }
+    _jobs[job["job_id"]] = job
+    while len(_jobs) > settings.IMPORT_MAX_JOBS:
+        oldest = next((k for k, j in _jobs.items() if j["status"] in ("completed", "failed")), None)
+        if oldest is None:
+            break
+        del _jobs[oldest]
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return _jobs.get(job_id)
+
+
+def _record_errors(job: Dict[str, Any], errors: List[Dict[str, Any]]) -> None:
+    job["failed"] += len(errors)
+    room = settings.IMPORT_MAX_ERRORS - len(job["errors"])
+    if len(errors) > room:
+        job["errors_truncated"] = True
+    # Chunks finish out of order; keep the reported errors sorted by file row
+    for error in errors[:max(room, 0)]:
+        insort(job["errors"], error, key=lambda e: e["row"])
+
+
+async def run_import(job: Dict[str, Any], path: str, upsert_on: Optional[str]) -> None:
+    """Background task: chunked validate + batched upsert of the spooled file, then delete it."""
+    table, _, model = RESOURCES[job["resource"]]
+    rows = _csv_rows(path) if job["format"] == "csv" else _xlsx_rows(path)
+    chunk_size = settings.IMPORT_CHUNK_SIZE
+    slots = asyncio.Semaphore(settings.IMPORT_CONCURRENCY)
+
+    async def process(chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        try:
+            valid, errors = await run_in_threadpool(validate_chunk, model, chunk)
+            if valid:
+                result = await write_rows(
+                    table,
+                    [row for _, row in valid],
+                    model.model_fields,
+                    batch_size=settings.BULK_BATCH_SIZE,
+                    concurrency=1,
+                    upsert_on=upsert_on,
+                    returning=False,
+                )
+                errors.extend(
+                    {"row": valid[r["index"]][0], "detail": r["detail"]}
+                    for r in result["results"] if r["status"] == "error"
+                )
+            _record_errors(job, sorted(errors, key=lambda e: e["row"]))
+            job["succeeded"] += len(chunk) - len(errors)
+            job["processed"] += len(chunk)
+        finally:
+            slots.release()
+
+    job["status"] = "running"
+    tasks = []
+    try:
+        while True:
+            await slots.acquire()
+            chunk = await run_in_threadpool(lambda: list(islice(rows, chunk_size)))
+            if not chunk:
+                slots.release()
+                break
+            tasks.append(asyncio.ensure_future(process(chunk)))
+        await asyncio.gather(*tasks)
+        job["status"] = "completed"
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        job["status"] = "failed"
+        job["detail"] = str(e)
+    finally:
+        rows.close()
+        os.unlink(path)
+        invalidate(table)
+        job["finished_at"] = datetime.now(timezone.utc).isoformat()
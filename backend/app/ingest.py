@@ -0,0 +1,405 @@
+"""
+Write-behind ingestion for check-in bursts (``ATTENDANCE_WRITE_BEHIND=true``).
+
+A punch is acknowledged once it is durably appended to a local journal
+(``INGEST_JOURNAL_DIR/punches.ndjson``). Concurrent punches share one fsync
+(group commit), so an acknowledgement costs one local disk flush instead of
+an upstream round trip. A background flusher drains the queue into
+``attendance`` (upsert, duplicates ignored) and ``attendance_logs`` (upsert
+on (emp_id, log_time), shared with device punches) in batches of ``INGEST_BATCH_SIZE``, then advances a
+checkpoint. Both writes are idempotent, so replaying a batch after a crash
+or a failed flush never double-counts.
+
+On start the journal is replayed from the checkpoint; a torn last line (a
+write that never reached fsync, so was never acknowledged) is cut off.
+Backpressure: once ``INGEST_MAX_PENDING`` punches are unflushed, new ones
+are refused with 503 + Retry-After until the flusher catches up. Rows either
+table rejects (unknown employee, ...) go to ``rejected.ndjson`` with the
+table and error instead of holding up the queue.
+
+One process per journal directory; a second one fails to start.
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import orjson
+
+from app.bulk import write_rows
+from app.cache import invalidate
+from app.config import settings
+from app.db import supabase_async, PostgrestError
+from app.device_logs import LOG_CONFLICT, LOG_TABLE
+from app.rollup import record_change
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_CONFLICT = "emp_id,attendance_date"
+ATTENDANCE_FIELDS = ("emp_id", "attendance_date", "check_in", "check_out")
+# Journal is truncated once fully flushed and larger than this
+ROTATE_BYTES = 16 * 1024 * 1024
+# Flush retry backoff after upstream failures (seconds)
+RETRY_INITIAL = 0.5
+RETRY_MAX = 30.0
+# Flush durations kept for the latency percentiles
+LATENCY_SAMPLES = 256
+
+
+class Backpressure(Exception):
+    """Too many unflushed punches; the client should retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Ingestion queue is full")
+        self.retry_after = retry_after
+
+
+class DuplicatePunch(Exception):
+    pass
+
+
+class Journal:
+    """Append-only NDJSON file; ``append`` returns once the record is on disk."""
+
+    def __init__(self, directory: Path):
+        self.path = directory / "punches.ndjson"
+        self.checkpoint_path = directory / "checkpoint"
+        self.rejected_path = directory / "rejected.ndjson"
+        self._file = None
+        self._waiting: List[Any] = []
+        self._writer: Optional[asyncio.Task] = None
+        # Serialises appends with truncation
+        self._lock = asyncio.Lock()
+
+    def recover(self) -> tuple:
+        """(checkpoint, records after it); cuts a torn trailing line off the file."""
+        checkpoint = int(self.checkpoint_path.read_text() or 0) if self.checkpoint_path.exists() else 0
+        records: List[Dict[str, Any]] = []
+        good_bytes = 0
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        break
+                    good_bytes += len(line)
+                    if record["seq"] > checkpoint:
+                        records.append(record)
+            if good_bytes < self.path.stat().st_size:
+                logger.warning("Truncating torn journal tail of %s", self.path)
+                os.truncate(self.path, good_bytes)
+        self._file = open(self.path, "ab")
+        return checkpoint, records
+
+    async def append(self, record: Dict[str, Any]) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE), future))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_waiting())
+        await future
+
+    async def _write_waiting(self) -> None:
+        # Everything queued while the previous fsync ran goes out in the next one
+        while self._waiting:
+            group, self._waiting = self._waiting, []
+            try:
+                async with self._lock:
+                    await asyncio.to_thread(self._write_sync, b"".join(data for data, _ in group))
+            except Exception as e:
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in group:
+                    if not future.done():
+                        future.set_result(None)
+
+    def _write_sync(self, data: bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def save_checkpoint(self, seq: int, rotate: bool) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._checkpoint_sync, seq, rotate)
+
+    def _checkpoint_sync(self, seq: int, rotate: bool) -> None:
+        temporary = self.checkpoint_path.with_suffix(".tmp")
+        with open(temporary, "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+        # Only with nothing outstanding: every record in the file is at or below the checkpoint
+        if rotate and self.size() > ROTATE_BYTES:
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+
+    def reject(self, records: List[Dict[str, Any]]) -> None:
+        with open(self.rejected_path, "ab") as f:
+            for record in records:
+                f.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+
+    def size(self) -> int:
+        return os.fstat(self._file.fileno()).st_size if self._file is not None else 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PunchQueue:
+    def __init__(self, directory: str, *, batch_size: int, max_pending: int, flush_interval: float):
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.journal = Journal(self.directory)
+        self.pending: Deque[Dict[str, Any]] = deque()
+        # seq -> record from acceptance until flushed; insertion order is seq order
+        self._outstanding: Dict[int, Dict[str, Any]] = {}
+        # attendance_date -> employees with a punch accepted by this process
+        self._seen: Dict[str, Set[int]] = {}
+        self._next_seq = 1
+        self._wake = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._lock_file = None
+        self._flush_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.started = False
+        self.counters = dict.fromkeys(
+            ("accepted", "flushed", "replayed", "duplicates_refused", "duplicates_ignored",
+             "rejected", "backpressure_refusals", "flush_batches", "flush_failures"),
+            0,
+        )
+
+    # --- lifecycle ---
+
+    async def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.directory / "lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(f"Ingest journal {self.directory} is in use by another process")
+        checkpoint, records = await asyncio.to_thread(self.journal.recover)
+        for record in records:
+            self._track(record)
+            self.pending.append(record)
+        self._next_seq = max([checkpoint, *(r["seq"] for r in records)]) + 1
+        self.counters["replayed"] = len(records)
+        if records:
+            logger.info("Replaying %d unflushed punches from %s", len(records), self.journal.path)
+            self._wake.set()
+        self._flusher = asyncio.create_task(self._run())
+        self.started = True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give the flusher ``timeout`` seconds to drain; whatever is left stays journaled."""
+        if not self.started:
+            return
+        self.started = False
+        deadline = time.monotonic() + timeout
+        while self._outstanding and time.monotonic() < deadline:
+            self._wake.set()
+            await asyncio.sleep(0.05)
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self.journal.close()
+        self._lock_file.close()
+
+    # --- accepting punches ---
+
+    def _track(self, record: Dict[str, Any]) -> None:
+        self._outstanding[record["seq"]] = record
+        self._seen.setdefault(record["attendance_date"], set()).add(record["emp_id"])
+
+    def _forget(self, record: Dict[str, Any]) -> None:
+        self._outstanding.pop(record["seq"], None)
+
+    async def submit(self, punch: Dict[str, Any]) -> Dict[str, Any]:
+        """Journal one check-in; returns the journaled record once it is durable."""
+        if len(self._outstanding) >= self.max_pending:
+            self.counters["backpressure_refusals"] += 1
+            raise Backpressure(retry_after=max(1, round(self.flush_interval * len(self._outstanding) / self.batch_size)))
+        day = punch["attendance_date"]
+        if punch["emp_id"] in self._seen.get(day, ()):
+            self.counters["duplicates_refused"] += 1
+            raise DuplicatePunch(f"Already checked in for {day}")
+        if day not in self._seen and len(self._seen) >= 2:
+            # Only the current and previous day can still see duplicates
+            for old in sorted(self._seen)[:-1]:
+                del self._seen[old]
+
+        record = {"seq": self._next_seq, "punch_id": str(uuid.uuid4()), "received_at": time.time(), **punch}
+        self._next_seq += 1
+        self._track(record)
+        try:
+            await self.journal.append(record)
+        except BaseException:
+            self._forget(record)
+            self._seen.get(day, set()).discard(punch["emp_id"])
+            raise
+        self.counters["accepted"] += 1
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size or not self._wake.is_set():
+            self._wake.set()
+        return record
+
+    # --- flushing ---
+
+    async def _run(self) -> None:
+        backoff = RETRY_INITIAL
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if len(self.pending) < self.batch_size and self.started:
+                # Let a burst fill the batch before paying for a round trip
+                await asyncio.sleep(self.flush_interval)
+            while self.pending:
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                started = time.perf_counter()
+                try:
+                    await self._flush(batch)
+                except asyncio.CancelledError:
+                    self.pending.extendleft(reversed(batch))
+                    raise
+                except Exception:
+                    self.pending.extendleft(reversed(batch))
+                    self.counters["flush_failures"] += 1
+                    logger.warning("Punch flush failed, retrying in %.1fs", backoff, exc_info=True)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RETRY_MAX)
+                    continue
+                backoff = RETRY_INITIAL
+                self._flush_ms.append((time.perf_counter() - started) * 1000)
+                self.counters["flush_batches"] += 1
+                for record in batch:
+                    self._forget(record)
+                checkpoint = next(iter(self._outstanding)) - 1 if self._outstanding else self._next_seq - 1
+                await self.journal.save_checkpoint(checkpoint, rotate=not self._outstanding)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        rows = [attendance_row(record) for record in batch]
+        try:
+            inserted = await supabase_async.insert(
+                "attendance",
+                rows,
+                params={"on_conflict": ATTENDANCE_CONFLICT, "columns": ",".join(ATTENDANCE_FIELDS)},
+                prefer=("return=representation", "resolution=ignore-duplicates", "missing=default"),
+            )
+            kept = batch
+        except PostgrestError as e:
+            if e.status_code >= 500:
+                raise
+            # Some row is invalid: bisect to find it, keep the rest
+            kept = await self._write_valid("attendance", rows, batch, ATTENDANCE_CONFLICT)
+            inserted = None
+
+        if kept:
+            # As after a direct check-in: cached attendance reads are stale now
+            invalidate("attendance")
+            logs = [
+                {
+                    "emp_id": record["emp_id"],
+                    "log_time": record.get("check_in") or _isoformat(record["received_at"]),
+                    "punch_id": record["punch_id"],
+                }
+                for record in kept
+            ]
+            # A device may already have logged the same punch; that row is kept as it is
+            try:
+                await supabase_async.insert(
+                    LOG_TABLE,
+                    logs,
+                    params={"on_conflict": LOG_CONFLICT},
+                    prefer=("return=minimal", "resolution=ignore-duplicates"),
+                )
+            except PostgrestError as e:
+                if e.status_code >= 500:
+                    raise
+                # The attendance rows are in either way; only the invalid log rows are rejected
+                await self._write_valid(LOG_TABLE, logs, kept, LOG_CONFLICT)
+
+        self.counters["flushed"] += len(kept)
+        if inserted is not None:
+            self.counters["duplicates_ignored"] += len(kept) - len(inserted)
+        try:
+            # Already-present rows were ignored upstream, so a replayed batch adds nothing twice
+            if inserted is None:
+                await record_change(None, [attendance_row(record) for record in kept])
+            elif inserted:
+                await record_change([], inserted)
+        except Exception:
+            logger.exception("Attendance rollup update failed")
+
+    async def _write_valid(
+        self, table: str, rows: List[Dict[str, Any]], batch: List[Dict[str, Any]], conflict: str,
+    ) -> List[Dict[str, Any]]:
+        """
+        Write ``rows`` (one per ``batch`` record) bisecting around the ones ``table`` refuses;
+        those records go to the rejected file. Returns the records whose row was written.
+        """
+        outcome = await write_rows(
+            table, rows, None, batch_size=len(rows), concurrency=1,
+            upsert_on=conflict, returning=False, ignore_duplicates=True,
+        )
+        kept, rejected = [], []
+        for record, result in zip(batch, outcome["results"]):
+            if result["status"] == "ok":
+                kept.append(record)
+            else:
+                rejected.append({**record, "table": table, "error": result["detail"]})
+        if rejected:
+            await asyncio.to_thread(self.journal.reject, rejected)
+            self.counters["rejected"] += len(rejected)
+        return kept
+
+    # --- metrics ---
+
+    def metrics(self) -> Dict[str, Any]:
+        samples = sorted(self._flush_ms)
+
+        def pct(p: float) -> Optional[float]:
+            return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))], 2) if samples else None
+
+        oldest = self.pending[0]["received_at"] if self.pending else None
+        return {
+            "enabled": self.started,
+            "queue_depth": len(self.pending),
+            "unflushed": len(self._outstanding),
+            "max_pending": self.max_pending,
+            "oldest_pending_age_s": round(time.time() - oldest, 3) if oldest else None,
+            "journal_bytes": self.journal.size(),
+            "flush_ms": {"last": round(self._flush_ms[-1], 2) if self._flush_ms else None, "p50": pct(50), "p99": pct(99)},
+            **self.counters,
+        }
+
+
+def attendance_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: record[k] for k in ATTENDANCE_FIELDS if k in record}
+
+
+def _isoformat(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(timestamp))
+
+
+punch_queue = PunchQueue(
+    settings.INGEST_JOURNAL_DIR,
+    batch_size=settings.INGEST_BATCH_SIZE,
+    max_pending=settings.INGEST_MAX_PENDING,
+    flush_interval=settings.INGEST_FLUSH_INTERVAL,
+)
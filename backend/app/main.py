@@ -1,16 +1,32 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.compression import CompressionMiddleware
 from app.config import settings
+from app.db import supabase_async
+from app.ingest import punch_queue
+from app import payslip_docs
 from app.routers import employees, attendance, leave, dashboard, recruitment, performance, finance, payroll, auth
-from app.routers import assets
+from app.routers import assets, imports
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="HRMS API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.ATTENDANCE_WRITE_BEHIND:
+        # Replays punches journaled but not flushed before the last shutdown / crash
+        await punch_queue.start()
+    yield
+    await punch_queue.stop()
+    await payslip_docs.stop()
+    # Drain the pooled upstream connections on shutdown
+    await supabase_async.aclose()
+
+app = FastAPI(title="HRMS API", version="1.0.0", lifespan=lifespan)
 
 # Global Exception Handler
 @app.exception_handler(Exception)
@@ -21,6 +37,8 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"message": "Internal Server Error", "detail": str(exc)},
     )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +46,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
 # --- Dedicated Routers ---
@@ -41,14 +60,24 @@ app.include_router(performance.router, prefix="/api/performance")
 app.include_router(finance.router, prefix="/api/finance")
 app.include_router(payroll.router, prefix="/api/payroll")
 app.include_router(assets.router, prefix="/api/assets")
+app.include_router(imports.router, prefix="/api/import")
 
+from app.cache import cache_stats
+from app.rollup import record_change
 from app.crud import create_crud_router
 
+# Reference tables change rarely: list/get are served from an in-process cache, cleared on writes
+REFERENCE_TTL = settings.CACHE_REFERENCE_TTL
+
 # --- Flat CRUD Routers (matching table names in frontend CrudPage) ---
 
 # Core flat access
 app.include_router(create_crud_router("employees", pk="emp_id", prefix="/api/employees"), tags=["Flat CRUD"])
-app.include_router(create_crud_router("attendance", pk="attendance_id", prefix="/api/attendance"), tags=["Flat CRUD"])
+# Writes also keep the daily attendance rollup (app/rollup.py) current
+app.include_router(
+    create_crud_router("attendance", pk="attendance_id", prefix="/api/attendance", passthrough=True, on_write=record_change),
+    tags=["Flat CRUD"],
+)
 
 # Employee Module
 app.include_router(create_crud_router("personal_details", pk="emp_id", prefix="/api/employee-personal-details"))
@@ -60,17 +89,18 @@ app.include_router(create_crud_router("salary_structure", pk="salary_id", prefix
 app.include_router(create_crud_router("status_history", pk="status_id", prefix="/api/employee-status-history"))
 
 # Organization Module
-app.include_router(create_crud_router("companies", pk="company_id", prefix="/api/companies"))
-app.include_router(create_crud_router("branches", pk="branch_id", prefix="/api/branches"))
-app.include_router(create_crud_router("departments", pk="dept_id", prefix="/api/departments"))
-app.include_router(create_crud_router("designations", pk="designation_id", prefix="/api/designations"))
-app.include_router(create_crud_router("employment_types", pk="emp_type_id", prefix="/api/employment-types"))
-app.include_router(create_crud_router("work_locations", pk="location_id", prefix="/api/work-locations"))
-app.include_router(create_crud_router("shifts", pk="shift_id", prefix="/api/shifts"))
+app.include_router(create_crud_router("companies", pk="company_id", prefix="/api/companies", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("branches", pk="branch_id", prefix="/api/branches", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("departments", pk="dept_id", prefix="/api/departments", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("designations", pk="designation_id", prefix="/api/designations", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("employment_types", pk="emp_type_id", prefix="/api/employment-types", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("work_locations", pk="location_id", prefix="/api/work-locations", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("shifts", pk="shift_id", prefix="/api/shifts", cache_ttl=REFERENCE_TTL))
 
 # Attendance & Leave Module
-app.include_router(create_crud_router("attendance_logs", pk="log_id", prefix="/api/attendance-logs"))
-app.include_router(create_crud_router("leave_types", pk="leave_type_id", prefix="/api/leave-types"))
+# High-volume log table: list/get relay the PostgREST bytes unparsed (no ETag / response cache)
+app.include_router(create_crud_router("attendance_logs", pk="log_id", prefix="/api/attendance-logs", passthrough=True))
+app.include_router(create_crud_router("leave_types", pk="leave_type_id", prefix="/api/leave-types", cache_ttl=REFERENCE_TTL))
 app.include_router(create_crud_router("leave_balances", pk="balance_id", prefix="/api/leave-balances"))
 app.include_router(create_crud_router("leave_requests", pk="request_id", prefix="/api/leave-requests"))
 app.include_router(create_crud_router("leave_approvals", pk="approval_id", prefix="/api/leave-approvals"))
@@ -96,8 +126,8 @@ app.include_router(create_crud_router("certifications", pk="cert_id", prefix="/a
 app.include_router(create_crud_router("asset_allocations", pk="allocation_id", prefix="/api/asset-allocations"))
 
 # Access & Roles
-app.include_router(create_crud_router("system_roles", pk="role_id", prefix="/api/system-roles"))
-app.include_router(create_crud_router("permissions", pk="permission_id", prefix="/api/permissions"))
+app.include_router(create_crud_router("system_roles", pk="role_id", prefix="/api/system-roles", cache_ttl=REFERENCE_TTL))
+app.include_router(create_crud_router("permissions", pk="permission_id", prefix="/api/permissions", cache_ttl=REFERENCE_TTL))
 app.include_router(create_crud_router("role_permissions", pk="role_id", prefix="/api/role-permissions"))
 app.include_router(create_crud_router("user_accounts", pk="user_id", prefix="/api/user-accounts"))
 
@@ -109,3 +139,7 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/api/cache/metrics")
+def get_cache_metrics():
+    return {"caches": cache_stats()}
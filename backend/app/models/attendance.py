@@ -16,6 +16,7 @@ class AttendanceUpdate(BaseModel):
 
 class AttendanceResponse(AttendanceBase):
     attendance_id: int
+    worked_hours: Optional[float] = None
 
     class Config:
         from_attributes = True
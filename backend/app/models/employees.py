@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional
 from datetime import date
 
@@ -41,3 +41,54 @@ class EmployeeResponse(EmployeeBase):
 
     class Config:
         from_attributes = True
+
+# Row shapes for POST /api/import/{resource}: one model per table, columns as in db/master_setup.sql.
+# Spreadsheet cells often arrive as numbers, hence coerce_numbers_to_str on the text columns.
+
+class EmployeeImport(BaseModel):
+    model_config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+
+    emp_id: Optional[int] = None
+    first_name: str
+    last_name: str
+    email: EmailStr
+    company_id: Optional[int] = None
+    dept_id: Optional[int] = None
+    designation_id: Optional[int] = None
+    emp_type_id: Optional[int] = None
+    manager_id: Optional[int] = None
+    join_date: Optional[date] = None
+    status: Optional[str] = None
+
+class ContactImport(BaseModel):
+    model_config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+
+    contact_id: Optional[int] = None
+    emp_id: int
+    phone: Optional[str] = None
+    email: Optional[EmailStr] = None
+
+class AddressImport(BaseModel):
+    model_config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+
+    address_id: Optional[int] = None
+    emp_id: int
+    address_type: Optional[str] = None
+    address: str
+
+class BankDetailImport(BaseModel):
+    model_config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+
+    bank_id: Optional[int] = None
+    emp_id: int
+    account_no: str
+    ifsc: Optional[str] = None
+
+class SalaryStructureImport(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    salary_id: Optional[int] = None
+    emp_id: int
+    basic: float = Field(ge=0)
+    hra: Optional[float] = Field(default=None, ge=0)
+    allowances: Optional[float] = Field(default=None, ge=0)
@@ -0,0 +1,131 @@
+"""
+Zero-copy list/get for ``create_crud_router(..., passthrough=True)``.
+
+The PostgREST body is relayed to the client chunk by chunk without being
+parsed or re-encoded, so CPU and peak memory no longer grow with the page.
+Paginated lists wrap the upstream array as ``{"data": <bytes>, "next_cursor": ...}``.
+The row count comes from ``Content-Range``, and the cursor is read from the
+last row, which is parsed out of the tail of the stream. Because the headers
+are sent before the body, such routes have no ``X-Next-Cursor`` header and no
+ETag. ``RelayResponse`` owns the upstream response and its connection slot
+and releases both however the response ends, including when the client
+disconnects before the body starts.
+"""
+
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.db import Params, supabase_async
+from app.query import next_cursor_for
+
+# Upper bound on the bytes kept to recover the last row of a page
+TAIL_BYTES = 1024 * 1024
+# PostgREST answers a single-object request that matched no row with this code
+NO_SINGLE_ROW = "PGRST116"
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+
+async def open_upstream(
+    table: str, params: Params, headers: Dict[str, str],
+) -> Tuple[httpx.Response, AsyncExitStack]:
+    """Start the upstream GET; non-2xx raises ``PostgrestError`` before anything is sent."""
+    stack = AsyncExitStack()
+    try:
+        # Identity keeps the bytes relayable as-is; the response is compressed on the way out
+        headers = {"Accept-Encoding": "identity", **headers}
+        response = await stack.enter_async_context(supabase_async.stream("GET", table, params=params, headers=headers))
+    except BaseException:
+        await stack.aclose()
+        raise
+    return response, stack
+
+
+def rows_in_range(content_range: Optional[str]) -> int:
+    """Rows in this response from ``Content-Range`` (``0-99/*``, ``*/0``)."""
+    if not content_range:
+        return 0
+    span = content_range.split("/", 1)[0]
+    first, sep, last = span.partition("-")
+    if not sep or not first.isdigit() or not last.isdigit():
+        return 0
+    return int(last) - int(first) + 1
+
+
+def last_row(tail: bytes) -> Optional[Dict[str, Any]]:
+    """
+    The last object of a JSON array given the array's final bytes. Every ``{`` that
+    follows ``[`` or ``,`` (PostgREST's json_agg puts whitespace in between) is tried
+    from the end; a nested object can never parse because closing brackets follow
+    it, so the first success is the last row.
+    """
+    body = tail.rstrip()
+    if not body.endswith(b"]"):
+        return None
+    body = body[:-1]
+    position = len(body)
+    while True:
+        position = body.rfind(b"{", 0, position)
+        if position < 0:
+            return None
+        before = body[:position].rstrip()
+        if not before.endswith((b",", b"[")):
+            continue
+        try:
+            row = orjson.loads(body[position:])
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(row, dict):
+            return row
+
+
+async def relay(
+    response: httpx.Response,
+    *,
+    envelope: bool = False,
+    page_full: bool = False,
+    order: Optional[Tuple[str, bool]] = None,
+    pk: str = "id",
+) -> AsyncIterator[bytes]:
+    """Upstream bytes as they arrive, optionally inside the ``{"data", "next_cursor"}`` envelope."""
+    tail: List[bytes] = []
+    tail_size = 0
+    if envelope:
+        yield b'{"data":'
+    async for chunk in response.aiter_bytes():
+        if not chunk:
+            continue
+        yield chunk
+        if envelope and page_full:
+            tail.append(chunk)
+            tail_size += len(chunk)
+            while tail_size - len(tail[0]) >= TAIL_BYTES:
+                tail_size -= len(tail.pop(0))
+    if envelope:
+        cursor = None
+        if page_full:
+            row = last_row(b"".join(tail))
+            cursor = next_cursor_for(row, order, pk) if row is not None else None
+        yield b',"next_cursor":' + orjson.dumps(cursor) + b"}"
+
+
+class RelayResponse(StreamingResponse):
+    """
+    Streams a ``relay`` body and closes ``stack`` (the upstream response from
+    ``open_upstream``) once the response ends, whether the body was sent, failed, or
+    never started because the client had already gone.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], stack: AsyncExitStack, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.stack = stack
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.stack.aclose()
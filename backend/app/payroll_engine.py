@@ -0,0 +1,785 @@
+"""
+Payroll runs: every employee's payslip for a ``payroll_cycles`` month in one batch.
+
+``start_run(cycle_id)`` opens a RUNNING ``payroll_runs`` row (one per cycle at
+a time, db/payroll_engine.sql) and ``execute_run(run)``:
+
+1. loads the run's inputs in bulk, each table in keyset pages of narrow
+   columns and all tables concurrently: active employees, their latest
+   ``salary_structure``, ABSENT ``attendance`` days, approved leave of an
+   unpaid type, ``bonuses`` dated in the month, approved ``reimbursements``
+   not paid by another cycle, and ``tax_deductions``
+2. computes all payslips at once on numpy arrays (``compute_payslips``), in
+   integer cents so lines and totals add up exactly
+3. writes ``payslips`` and their non-zero ``payroll_details`` lines in
+   batched inserts, marks the reimbursements as paid by the cycle and closes
+   the run with its totals (FAILED with the error otherwise)
+
+Pay rules:
+
+* earnings: basic, hra and allowances of the latest salary structure, plus bonuses and reimbursements
+* loss of pay: (basic + hra + allowances) x unpaid days / days in the month, rounded half up
+  to the cent; unpaid days are days before ``join_date``, days marked ABSENT and days of
+  approved leave with ``leave_types.is_paid = false``, each day counted once
+* tax: the employee's ``tax_deductions``, capped so net pay is never negative
+
+Every payslip stores a fingerprint of the inputs it was computed from (the
+salary components, unpaid days, bonus, reimbursement and tax totals).
+``reopen_run(run_id)`` + ``execute_run(run, incremental=True)`` recomputes a
+finished run after late corrections: all payslips are recomputed in memory,
+which is cheap, but only those whose fingerprint changed are rewritten (plus
+employees who became payable, minus those who no longer are), and the
+summary lists what moved. A payslip's fingerprint is stored only once all
+its lines are written, so one whose lines failed (or whose shard died
+half-way) is rewritten by the next recompute; reimbursements the cycle had
+marked as paid on a rewritten or removed payslip are released first.
+
+With ``PAYROLL_WORKERS`` > 1 a run is split into that many contiguous emp_id
+ranges, each loaded, computed and written by its own spawned process with its
+own upstream connections (``process_shard``). A shard's output depends only on
+its employees, amounts come back as integer cents, and the parent adds them up
+and closes the run; each shard's stage is kept in ``progress`` while it runs.
+"""
+
+import asyncio
+import calendar
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.bulk import write_rows
+from app.config import settings
+from app.db import supabase_async, PostgrestError
+from app.export import iter_pages
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+# Employees in these states are not paid
+INACTIVE_STATUSES = ("INACTIVE", "TERMINATED", "RESIGNED", "EXITED")
+# Payslip line -> salary_components.name (seeded by db/payroll_engine.sql)
+COMPONENTS = {
+    "basic": "Basic",
+    "hra": "HRA",
+    "allowances": "Allowances",
+    "bonus": "Bonus",
+    "reimbursement": "Reimbursement",
+    "loss_of_pay": "Loss of Pay",
+    "tax": "Tax",
+}
+# Ids per ``?<pk>=in.(...)`` filter
+ID_CHUNK = 1000
+# Per-payslip write errors kept in the run's detail
+MAX_ERRORS = 20
+# Changed payslips listed in a recompute summary
+MAX_DIFF = 500
+# Bump when the pay rules change, so a recompute rewrites every payslip
+FINGERPRINT_VERSION = b"payroll-1"
+# Runs whose shard progress is remembered
+MAX_TRACKED_RUNS = 50
+
+Row = Dict[str, Any]
+
+# run_id -> progress of each shard, for runs executed by this process
+progress: Dict[int, List[Row]] = {}
+
+
+class PayrollError(Exception):
+    """A run that cannot start: unknown cycle, or one already running."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class Cycle(NamedTuple):
+    cycle_id: int
+    start: date
+    end: date
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+
+class Inputs(NamedTuple):
+    """A cycle's inputs as columns; ``*_emp`` arrays hold employee ids aligned with their amounts."""
+
+    emp_id: np.ndarray  # int64, sorted: the employees paid
+    join_day: np.ndarray  # int64, first payable day index in the cycle
+    basic: np.ndarray  # int64 cents
+    hra: np.ndarray
+    allowances: np.ndarray
+    absent_emp: np.ndarray
+    absent_day: np.ndarray  # int64 day index
+    leave_emp: np.ndarray
+    leave_first: np.ndarray  # int64 day index, clipped to the cycle
+    leave_last: np.ndarray
+    bonus_emp: np.ndarray
+    bonus: np.ndarray  # int64 cents
+    reimbursement_emp: np.ndarray
+    reimbursement: np.ndarray
+    tax_emp: np.ndarray
+    tax: np.ndarray
+    reimbursement_id: np.ndarray  # int64, aligned with reimbursement_emp
+
+
+class Payslips(NamedTuple):
+    """One element per employee of ``Inputs.emp_id``; amounts in int64 cents."""
+
+    emp_id: np.ndarray
+    lop_days: np.ndarray
+    basic: np.ndarray
+    hra: np.ndarray
+    allowances: np.ndarray
+    bonus: np.ndarray
+    reimbursement: np.ndarray
+    loss_of_pay: np.ndarray
+    tax: np.ndarray
+    gross: np.ndarray
+    deductions: np.ndarray
+    net_pay: np.ndarray
+    fingerprint: np.ndarray  # str, 16 hex digits of the employee's inputs
+
+
+def _ids(values: Sequence[Any]) -> np.ndarray:
+    return np.asarray(values, dtype=np.int64)
+
+
+def _cents(values: Sequence[Any]) -> np.ndarray:
+    """NUMERIC amounts (numbers or strings, None as 0) as int64 cents."""
+    return np.rint(np.asarray([float(v or 0) for v in values], dtype=np.float64) * 100).astype(np.int64)
+
+
+def _day_index(values: Sequence[Optional[str]], start: date) -> np.ndarray:
+    """ISO dates as day offsets from ``start``; None becomes the smallest int64."""
+    days = np.asarray([v[:10] if v else None for v in values], dtype="datetime64[D]")
+    index = (days - np.datetime64(start, "D")).astype(np.int64)
+    index[np.isnat(days)] = np.iinfo(np.int64).min
+    return index
+
+
+def _per_employee(emp_id: np.ndarray, ids: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """``amounts`` summed per employee of the sorted ``emp_id``; unknown ids are dropped."""
+    totals = np.zeros(len(emp_id), dtype=np.int64)
+    rows = _rows(emp_id, ids)
+    np.add.at(totals, rows[rows >= 0], amounts[rows >= 0])
+    return totals
+
+
+def _rows(emp_id: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Position of each id in the sorted ``emp_id``, -1 when absent."""
+    if not len(emp_id):
+        return np.full(len(ids), -1, dtype=np.int64)
+    rows = np.minimum(np.searchsorted(emp_id, ids), len(emp_id) - 1)
+    return np.where(emp_id[rows] == ids, rows, -1)
+
+
+def _take(values: np.ndarray, rows: np.ndarray, missing: Any) -> np.ndarray:
+    """``values[rows]``, with ``missing`` where a row is -1."""
+    if not len(values):
+        return np.full(len(rows), missing, dtype=values.dtype)
+    return np.where(rows >= 0, values[np.maximum(rows, 0)], missing)
+
+
+def _fingerprints(amounts: Sequence[np.ndarray], unpaid: np.ndarray) -> np.ndarray:
+    """Hash of each employee's amounts and unpaid-day mask: equal inputs, equal payslip."""
+    count = len(unpaid)
+    columns = np.ascontiguousarray(np.stack(amounts, axis=1), dtype=np.int64).view(np.uint8).reshape(count, -1)
+    data = np.ascontiguousarray(np.concatenate([columns, np.packbits(unpaid, axis=1)], axis=1))
+    width = data.shape[1]
+    raw = data.tobytes()
+    return np.asarray([
+        hashlib.blake2b(raw[i:i + width], digest_size=8, person=FINGERPRINT_VERSION).hexdigest()
+        for i in range(0, len(raw), width)
+    ], dtype="U16")
+
+
+def compute_payslips(inputs: Inputs, days: int) -> Payslips:
+    """Every payslip of a ``days``-long cycle, without a Python loop over employees."""
+    emp_id = inputs.emp_id
+    count = len(emp_id)
+    # [employee, day] -> unpaid; a day both absent and on unpaid leave is still one day
+    unpaid = np.arange(days)[None, :] < inputs.join_day[:, None]
+    rows = _rows(emp_id, inputs.absent_emp)
+    known = (rows >= 0) & (inputs.absent_day >= 0) & (inputs.absent_day < days)
+    unpaid[rows[known], inputs.absent_day[known]] = True
+    rows = _rows(emp_id, inputs.leave_emp)
+    known = (rows >= 0) & (inputs.leave_first <= inputs.leave_last)
+    # Leave ranges as +1 / -1 steps; a running sum above zero is a day on leave
+    steps = np.zeros((count, days + 1), dtype=np.int32)
+    np.add.at(steps, (rows[known], inputs.leave_first[known]), 1)
+    np.add.at(steps, (rows[known], inputs.leave_last[known] + 1), -1)
+    unpaid |= np.cumsum(steps[:, :days], axis=1) > 0
+    lop_days = unpaid.sum(axis=1).astype(np.int64)
+
+    fixed = inputs.basic + inputs.hra + inputs.allowances
+    # Integer half-up rounding of fixed * lop_days / days
+    loss_of_pay = (2 * fixed * lop_days + days) // (2 * days)
+    bonus = _per_employee(emp_id, inputs.bonus_emp, inputs.bonus)
+    reimbursement = _per_employee(emp_id, inputs.reimbursement_emp, inputs.reimbursement)
+    gross = fixed + bonus + reimbursement
+    tax_due = _per_employee(emp_id, inputs.tax_emp, inputs.tax)
+    tax = np.clip(tax_due, 0, np.maximum(gross - loss_of_pay, 0))
+    deductions = loss_of_pay + tax
+    fingerprint = _fingerprints((inputs.basic, inputs.hra, inputs.allowances, bonus, reimbursement, tax_due), unpaid)
+    return Payslips(
+        emp_id, lop_days, inputs.basic, inputs.hra, inputs.allowances, bonus, reimbursement,
+        loss_of_pay, tax, gross, deductions, gross - deductions, fingerprint,
+    )
+
+
+async def _read(table: str, select: str, conditions: Sequence[Tuple[str, str]], pk: str) -> List[Row]:
+    rows: List[Row] = []
+    async for page in iter_pages(table, select, conditions, None, pk, settings.PAYROLL_PAGE_SIZE):
+        rows.extend(page)
+    return rows
+
+
+async def load_cycle(cycle_id: int) -> Cycle:
+    rows, _ = await supabase_async.select(
+        "payroll_cycles", {"select": "cycle_id,month,year", "cycle_id": f"eq.{cycle_id}"},
+    )
+    if not rows:
+        raise PayrollError(404, f"Payroll cycle {cycle_id} not found")
+    month, year = int(rows[0]["month"]), int(rows[0]["year"])
+    if not 1 <= month <= 12:
+        raise PayrollError(400, f"Payroll cycle {cycle_id} has an invalid month: {month}")
+    return Cycle(cycle_id, date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]))
+
+
+def _scope(column: str, emp_range: Optional[Tuple[int, int]]) -> List[Tuple[str, str]]:
+    """Filters keeping employee ids in ``[low, high)``; none for every employee."""
+    if emp_range is None:
+        return []
+    return [(column, f"gte.{emp_range[0]}"), (column, f"lt.{emp_range[1]}")]
+
+
+async def load_inputs(cycle: Cycle, emp_range: Optional[Tuple[int, int]] = None) -> Inputs:
+    """The cycle's inputs, for every employee or only ids in ``[low, high)`` of ``emp_range``."""
+    def scope(column: str) -> List[Tuple[str, str]]:
+        return _scope(column, emp_range)
+
+    start, end = cycle.start.isoformat(), cycle.end.isoformat()
+    (employees, salaries, absences, leaves, unpaid_types, bonuses, reimbursements, taxes) = await asyncio.gather(
+        _read("employees", "id,join_date,status", scope("id"), "id"),
+        _read("salary_structure", "salary_id,emp_id,basic,hra,allowances", scope("emp_id"), "salary_id"),
+        _read(
+            "attendance", "attendance_id,emp_id,attendance_date",
+            [*scope("emp_id"), ("status", "ilike.absent"),
+             ("attendance_date", f"gte.{start}"), ("attendance_date", f"lte.{end}")],
+            "attendance_id",
+        ),
+        _read(
+            "leave_requests", "request_id,emp_id,leave_type_id,from_date,to_date",
+            [*scope("emp_id"), ("status", "ilike.approved"), ("from_date", f"lte.{end}"), ("to_date", f"gte.{start}")],
+            "request_id",
+        ),
+        _read("leave_types", "leave_type_id", [("is_paid", "is.false")], "leave_type_id"),
+        _read(
+            "bonuses", "bonus_id,emp_id,amount",
+            [*scope("emp_id"), ("bonus_date", f"gte.{start}"), ("bonus_date", f"lte.{end}")],
+            "bonus_id",
+        ),
+        _read(
+            "reimbursements", "reimb_id,emp_id,amount",
+            [*scope("emp_id"), ("status", "ilike.approved"),
+             ("or", f"(cycle_id.is.null,cycle_id.eq.{cycle.cycle_id})")],
+            "reimb_id",
+        ),
+        _read("tax_deductions", "deduction_id,emp_id,amount", scope("emp_id"), "deduction_id"),
+    )
+    return _columns(cycle, employees, salaries, absences, leaves, unpaid_types, bonuses, reimbursements, taxes)
+
+
+def _columns(
+    cycle: Cycle,
+    employees: List[Row],
+    salaries: List[Row],
+    absences: List[Row],
+    leaves: List[Row],
+    unpaid_types: List[Row],
+    bonuses: List[Row],
+    reimbursements: List[Row],
+    taxes: List[Row],
+) -> Inputs:
+    # Latest salary structure per employee: the highest salary_id
+    salary_emp = _ids([r["emp_id"] or 0 for r in salaries])
+    order = np.lexsort((_ids([r["salary_id"] for r in salaries]), salary_emp))
+    latest = order[np.append(salary_emp[order][1:] != salary_emp[order][:-1], True)] if len(order) else order
+    salary_emp = salary_emp[latest]
+
+    inactive = set(INACTIVE_STATUSES)
+    active = [r for r in employees if str(r.get("status") or "ACTIVE").upper() not in inactive]
+    join_day = np.maximum(_day_index([r.get("join_date") for r in active], cycle.start), 0)
+    emp_id = _ids([r["id"] for r in active])
+    # Paid: active, joined by the end of the cycle, with a salary structure
+    paid = (join_day < cycle.days) & np.isin(emp_id, salary_emp)
+    order = np.argsort(emp_id[paid], kind="stable")
+    emp_id, join_day = emp_id[paid][order], join_day[paid][order]
+    salary = latest[_rows(salary_emp, emp_id)].tolist()
+
+    def pick(column: str) -> np.ndarray:
+        return _cents([salaries[i][column] for i in salary])
+
+    unpaid = {r["leave_type_id"] for r in unpaid_types}
+    leaves = [r for r in leaves if r.get("leave_type_id") in unpaid and r.get("emp_id")]
+    absences = [r for r in absences if r.get("emp_id")]
+    last_day = cycle.days - 1
+    return Inputs(
+        emp_id=emp_id,
+        join_day=join_day,
+        basic=pick("basic"),
+        hra=pick("hra"),
+        allowances=pick("allowances"),
+        absent_emp=_ids([r["emp_id"] for r in absences]),
+        absent_day=_day_index([r["attendance_date"] for r in absences], cycle.start),
+        leave_emp=_ids([r["emp_id"] for r in leaves]),
+        leave_first=np.clip(_day_index([r["from_date"] for r in leaves], cycle.start), 0, cycle.days),
+        leave_last=np.clip(_day_index([r["to_date"] for r in leaves], cycle.start), -1, last_day),
+        bonus_emp=_ids([r["emp_id"] or 0 for r in bonuses]),
+        bonus=_cents([r["amount"] for r in bonuses]),
+        reimbursement_emp=_ids([r["emp_id"] or 0 for r in reimbursements]),
+        reimbursement=_cents([r["amount"] for r in reimbursements]),
+        tax_emp=_ids([r["emp_id"] or 0 for r in taxes]),
+        tax=_cents([r["amount"] for r in taxes]),
+        reimbursement_id=_ids([r["reimb_id"] for r in reimbursements]),
+    )
+
+
+async def component_ids() -> Dict[str, int]:
+    rows, _ = await supabase_async.select("salary_components", {"select": "component_id,name"})
+    by_name = {r["name"]: r["component_id"] for r in rows}
+    missing = [name for name in COMPONENTS.values() if name not in by_name]
+    if missing:
+        raise PayrollError(500, f"salary_components is missing {', '.join(missing)}: run db/payroll_engine.sql")
+    return {line: by_name[name] for line, name in COMPONENTS.items()}
+
+
+def payslip_rows(
+    run_id: int, payslips: Payslips, days: int, picked: np.ndarray, hashed: bool = False,
+) -> List[Row]:
+    """
+    ``payslips`` rows for the employees at positions ``picked``; ``input_hash`` is only
+    filled in when ``hashed`` (once the payslip's lines are written).
+    """
+    amounts = {
+        name: (getattr(payslips, name)[picked] / 100).tolist() for name in ("gross", "deductions", "net_pay")
+    }
+    return [
+        {"run_id": run_id, "emp_id": emp, "gross": gross, "deductions": deductions, "net_pay": net,
+         "paid_days": days - lop, "lop_days": lop, "input_hash": fingerprint if hashed else None}
+        for emp, gross, deductions, net, lop, fingerprint in zip(
+            payslips.emp_id[picked].tolist(), amounts["gross"], amounts["deductions"], amounts["net_pay"],
+            payslips.lop_days[picked].tolist(), payslips.fingerprint[picked].tolist(),
+        )
+    ]
+
+
+def detail_rows(payslips: Payslips, payslip_ids: np.ndarray, components: Dict[str, int]) -> List[Row]:
+    """Non-zero lines of every payslip; ``payslip_ids`` aligns with ``payslips`` (0: not written)."""
+    rows: List[Row] = []
+    for line, component_id in components.items():
+        amounts = getattr(payslips, line)
+        present = np.flatnonzero((amounts != 0) & (payslip_ids > 0))
+        rows.extend(
+            {"payslip_id": payslip, "component_id": component_id, "amount": amount}
+            for payslip, amount in zip(payslip_ids[present].tolist(), (amounts[present] / 100).tolist())
+        )
+    return rows
+
+
+async def start_run(cycle_id: int) -> Row:
+    """Open a RUNNING run of the cycle; PayrollError when the cycle is unknown or already running."""
+    await load_cycle(cycle_id)
+    try:
+        rows = await supabase_async.insert("payroll_runs", {"cycle_id": cycle_id, "status": RUNNING})
+    except PostgrestError as e:
+        if e.code == "23505":
+            raise PayrollError(409, f"Payroll for cycle {cycle_id} is already running")
+        raise
+    return rows[0]
+
+
+async def reopen_run(run_id: int) -> Row:
+    """Set a finished run back to RUNNING for a recompute; PayrollError when unknown or busy."""
+    try:
+        rows = await supabase_async.update(
+            "payroll_runs", {"status": RUNNING, "detail": None},
+            {"run_id": f"eq.{run_id}", "status": f"in.({COMPLETED},{FAILED})"},
+        )
+    except PostgrestError as e:
+        if e.code == "23505":
+            raise PayrollError(409, f"Another run of the cycle of run {run_id} is in progress")
+        raise
+    if rows:
+        return rows[0]
+    existing, _ = await supabase_async.select("payroll_runs", {"select": "run_id", "run_id": f"eq.{run_id}"})
+    if not existing:
+        raise PayrollError(404, f"Payroll run {run_id} not found")
+    raise PayrollError(409, f"Payroll run {run_id} is in progress")
+
+
+async def _by_ids(
+    method: str, table: str, pk: str, ids: List[int], body: Optional[Row] = None, where: Optional[Row] = None,
+) -> None:
+    """PATCH (with ``body``) or DELETE the rows of ``ids`` (also matching ``where``), a chunk of ids per call."""
+    for start in range(0, len(ids), ID_CHUNK):
+        params = {**(where or {}), pk: "in.(" + ",".join(str(i) for i in ids[start:start + ID_CHUNK]) + ")"}
+        if method == "PATCH":
+            await supabase_async.update(table, body, params, prefer=("return=minimal",))
+        else:
+            await supabase_async.delete(table, params, prefer=("return=minimal",))
+
+
+class Existing(NamedTuple):
+    """A run's payslips as written, sorted by emp_id."""
+
+    emp_id: np.ndarray
+    payslip_id: np.ndarray
+    fingerprint: np.ndarray
+    gross: np.ndarray  # int64 cents
+    deductions: np.ndarray
+    net_pay: np.ndarray
+    lop_days: np.ndarray
+
+    @classmethod
+    def none(cls) -> "Existing":
+        return cls(*(np.empty(0, np.int64),) * 2, np.empty(0, "U16"), *(np.empty(0, np.int64),) * 4)
+
+
+async def load_payslips(run_id: int, emp_range: Optional[Tuple[int, int]] = None) -> Existing:
+    rows = await _read(
+        "payslips", "payslip_id,emp_id,input_hash,gross,deductions,net_pay,lop_days",
+        [("run_id", f"eq.{run_id}"), *_scope("emp_id", emp_range)], "payslip_id",
+    )
+    rows.sort(key=lambda r: r["emp_id"])
+    return Existing(
+        _ids([r["emp_id"] for r in rows]),
+        _ids([r["payslip_id"] for r in rows]),
+        np.asarray([r["input_hash"] or "" for r in rows], dtype="U16"),
+        _cents([r["gross"] for r in rows]),
+        _cents([r["deductions"] for r in rows]),
+        _cents([r["net_pay"] for r in rows]),
+        _ids([r["lop_days"] or 0 for r in rows]),
+    )
+
+
+def payslip_diff(payslips: Payslips, existing: Existing, changed: np.ndarray, removed: np.ndarray) -> List[Row]:
+    """What moved for the employees at ``changed`` positions and the ``removed`` existing payslips."""
+    before = _rows(existing.emp_id, payslips.emp_id[changed])
+    diff: List[Row] = []
+    for position, old in zip(changed.tolist(), before.tolist()):
+        entry: Row = {"emp_id": int(payslips.emp_id[position]), "change": "added" if old < 0 else "changed"}
+        for name in ("gross", "deductions", "net_pay", "lop_days"):
+            after = int(getattr(payslips, name)[position])
+            previous = int(getattr(existing, name)[old]) if old >= 0 else None
+            if previous != after:
+                scale = 1 if name == "lop_days" else 100
+                entry[name] = {"before": None if previous is None else previous / scale, "after": after / scale}
+        diff.append(entry)
+    for old in removed.tolist():
+        diff.append({
+            "emp_id": int(existing.emp_id[old]), "change": "removed",
+            "net_pay": {"before": int(existing.net_pay[old]) / 100, "after": None},
+        })
+    return diff
+
+
+async def _finish(run_id: int, body: Row) -> None:
+    body = {**body, "finished_at": datetime.now(timezone.utc).isoformat()}
+    await supabase_async.update("payroll_runs", body, {"run_id": f"eq.{run_id}"}, prefer=("return=minimal",))
+
+
+async def shard_ranges(workers: int) -> List[Tuple[int, int]]:
+    """At most ``workers`` contiguous ``[low, high)`` emp_id ranges of equal width covering every employee."""
+    (first, _), (last, _) = await asyncio.gather(
+        supabase_async.select("employees", {"select": "id", "order": "id.asc", "limit": 1}),
+        supabase_async.select("employees", {"select": "id", "order": "id.desc", "limit": 1}),
+    )
+    if not first:
+        return [(0, 1)]
+    low, high = first[0]["id"], last[0]["id"] + 1
+    step = -(-(high - low) // workers)
+    return [(start, min(start + step, high)) for start in range(low, high, step)]
+
+
+async def process_shard(
+    run_id: int,
+    cycle: Cycle,
+    components: Dict[str, int],
+    incremental: bool,
+    emp_range: Optional[Tuple[int, int]],
+    report: Callable[..., None],
+) -> Row:
+    """
+    Load, compute and write the payslips of the employees in ``emp_range`` (everyone when
+    None). Amounts in the result are int cents so shard results add up exactly; ``report``
+    receives progress fields as the shard moves through its stages.
+    """
+    timings: Dict[str, float] = {}
+    clock = time.perf_counter()
+
+    def lap(name: str) -> None:
+        nonlocal clock
+        now = time.perf_counter()
+        timings[name] = round(now - clock, 3)
+        clock = now
+
+    report(stage="loading")
+    loads = [load_inputs(cycle, emp_range)]
+    if incremental:
+        loads.append(load_payslips(run_id, emp_range))
+    inputs, *previous_run = await asyncio.gather(*loads)
+    existing = previous_run[0] if previous_run else Existing.none()
+    lap("load")
+    report(stage="computing", employees=int(len(inputs.emp_id)))
+
+    def compute() -> Tuple[Payslips, np.ndarray, np.ndarray, List[Row]]:
+        payslips = compute_payslips(inputs, cycle.days)
+        before = _rows(existing.emp_id, payslips.emp_id)
+        # Positions to (re)write: new employees and changed fingerprints
+        picked = np.flatnonzero((before < 0) | (_take(existing.fingerprint, before, "") != payslips.fingerprint))
+        removed = np.flatnonzero(~np.isin(existing.emp_id, payslips.emp_id))
+        return payslips, picked, removed, payslip_rows(run_id, payslips, cycle.days, picked)
+
+    payslips, picked, removed, rows = await asyncio.to_thread(compute)
+    lap("compute")
+    report(stage="writing", payslips_to_write=len(rows))
+
+    outcome = await write_rows(
+        "payslips", rows, None, batch_size=settings.PAYROLL_BATCH_SIZE,
+        concurrency=settings.PAYROLL_CONCURRENCY, select="payslip_id,emp_id",
+        upsert_on="run_id,emp_id" if incremental else None,
+    )
+    written = {r["row"]["emp_id"]: r["row"]["payslip_id"] for r in outcome["results"] if "row" in r}
+    # Unchanged payslips keep their rows; rewritten ones get their lines replaced
+    before = _rows(existing.emp_id, payslips.emp_id)
+    rewritten = np.zeros(len(payslips.emp_id), dtype=np.int64)
+    rewritten[picked] = [written.get(emp, 0) for emp in payslips.emp_id[picked].tolist()]
+    payslip_ids = np.where(rewritten > 0, rewritten, _take(existing.payslip_id, before, 0))
+    replaced = (rewritten > 0) & (before >= 0)
+    stale = [int(i) for i in rewritten[replaced]]
+    # Reimbursements this cycle marked as paid on payslips being replaced or removed are released:
+    # the new payslip marks again the ones it still pays
+    released = payslips.emp_id[replaced].tolist() + existing.emp_id[removed].tolist()
+    await _by_ids(
+        "PATCH", "reimbursements", "emp_id", released, {"cycle_id": None}, {"cycle_id": f"eq.{cycle.cycle_id}"},
+    )
+    await _by_ids("DELETE", "payroll_details", "payslip_id", stale)
+    await _by_ids("DELETE", "payslips", "payslip_id", existing.payslip_id[removed].tolist())
+    details = await asyncio.to_thread(detail_rows, payslips, rewritten, components)
+    detail_outcome = await write_rows(
+        "payroll_details", details, None, batch_size=settings.PAYROLL_BATCH_SIZE,
+        concurrency=settings.PAYROLL_CONCURRENCY, returning=False,
+    )
+    # Only reimbursements on a written payslip count as paid (unchanged ones already are)
+    paid = np.isin(inputs.reimbursement_emp, payslips.emp_id[rewritten > 0])
+    reimbursements = inputs.reimbursement_id[paid].tolist()
+    await _by_ids("PATCH", "reimbursements", "reimb_id", reimbursements, {"cycle_id": cycle.cycle_id})
+    # Last, the fingerprints of the payslips whose lines all went in: until then a recompute rewrites them
+    lines_failed = [details[r["index"]]["payslip_id"] for r in detail_outcome["results"] if r["status"] == "error"]
+    complete = picked[(rewritten[picked] > 0) & ~np.isin(rewritten[picked], lines_failed)]
+    hash_outcome = await write_rows(
+        "payslips", payslip_rows(run_id, payslips, cycle.days, complete, hashed=True), None,
+        batch_size=settings.PAYROLL_BATCH_SIZE, concurrency=settings.PAYROLL_CONCURRENCY,
+        upsert_on="run_id,emp_id", returning=False,
+    )
+    lap("write")
+
+    errors = [
+        f"emp_id {rows[r['index']]['emp_id']}: {r['detail']}"
+        for r in outcome["results"] if r["status"] == "error"
+    ]
+    errors += [r["detail"] for r in detail_outcome["results"] if r["status"] == "error"]
+    errors += [r["detail"] for r in hash_outcome["results"] if r["status"] == "error"]
+    has_payslip = payslip_ids > 0
+    result = {
+        "employees": int(has_payslip.sum()),
+        "gross": int(payslips.gross[has_payslip].sum()),
+        "deductions": int(payslips.deductions[has_payslip].sum()),
+        "net_pay": int(payslips.net_pay[has_payslip].sum()),
+        "payslips_written": outcome["succeeded"],
+        "payslips_failed": outcome["failed"],
+        "details": len(details),
+        "details_failed": detail_outcome["failed"],
+        "reimbursements": len(reimbursements),
+        "unchanged": int(len(payslips.emp_id) - len(picked)),
+        "changed": int((before[picked] >= 0).sum()),
+        "added": int((before[picked] < 0).sum()),
+        "removed": int(len(removed)),
+        "errors": errors[:MAX_ERRORS],
+        "error_count": len(errors),
+        "diff": payslip_diff(payslips, existing, picked, removed)[:MAX_DIFF] if incremental else [],
+        "seconds": timings,
+    }
+    report(stage="done", payslips_written=outcome["succeeded"], seconds=timings)
+    return result
+
+
+# Set in shard processes: where they send (shard, progress fields)
+_progress_queue: Any = None
+
+
+def _init_shard_process(queue: Any) -> None:
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _shard_main(
+    run_id: int,
+    cycle: Cycle,
+    components: Dict[str, int],
+    incremental: bool,
+    shard: int,
+    emp_range: Tuple[int, int],
+) -> Row:
+    """Entry point of a shard process: its own event loop and upstream connections."""
+    def report(**fields: Any) -> None:
+        _progress_queue.put((shard, fields))
+
+    async def main() -> Row:
+        try:
+            return await process_shard(run_id, cycle, components, incremental, emp_range, report)
+        finally:
+            await supabase_async.aclose()
+
+    try:
+        return asyncio.run(main())
+    except Exception as e:
+        message = str(getattr(e, "message", e))
+        report(stage="failed", detail=message)
+        # Upstream errors do not survive pickling back to the parent; their message does
+        raise RuntimeError(f"Shard {shard} {list(emp_range)} failed: {message}") from None
+
+
+async def _run_shards(
+    run_id: int,
+    cycle: Cycle,
+    components: Dict[str, int],
+    incremental: bool,
+    ranges: List[Tuple[int, int]],
+    shards: List[Row],
+) -> List[Row]:
+    """One spawned process per range; their progress lands in ``shards`` as it is reported."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    loop = asyncio.get_running_loop()
+
+    def drain() -> None:
+        while (item := queue.get()) is not None:
+            shard, fields = item
+            loop.call_soon_threadsafe(shards[shard].update, fields)
+
+    drainer = asyncio.ensure_future(asyncio.to_thread(drain))
+    pool = ProcessPoolExecutor(
+        len(ranges), mp_context=context, initializer=_init_shard_process, initargs=(queue,),
+    )
+    try:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _shard_main, run_id, cycle, components, incremental, shard, emp_range)
+            for shard, emp_range in enumerate(ranges)
+        ), return_exceptions=True)
+    finally:
+        await asyncio.to_thread(pool.shutdown)
+        queue.put(None)
+        await drainer
+    for shard, result in zip(shards, results):
+        if isinstance(result, BaseException):
+            shard["stage"] = "failed"
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures:
+        raise failures[0]
+    return results
+
+
+def _track(run_id: int, ranges: List[Optional[Tuple[int, int]]]) -> List[Row]:
+    shards = [
+        {"shard": i, "emp_range": list(emp_range) if emp_range else None, "stage": "queued"}
+        for i, emp_range in enumerate(ranges)
+    ]
+    progress[run_id] = shards
+    while len(progress) > MAX_TRACKED_RUNS:
+        progress.pop(next(iter(progress)))
+    return shards
+
+
+async def execute_run(run: Row, incremental: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compute and write the payslips of an open run, then close it; returns a summary.
+    ``incremental`` rewrites only payslips whose inputs changed since the run's last
+    computation and adds a ``diff`` of them to the summary. With ``workers`` > 1
+    (default ``PAYROLL_WORKERS``) employees are split by emp_id into that many shards,
+    each loaded, computed and written by its own process.
+    """
+    run_id, cycle_id = run["run_id"], run["cycle_id"]
+    workers = workers or settings.PAYROLL_WORKERS
+    timings: Dict[str, float] = {}
+    clock = time.perf_counter()
+
+    def lap(name: str) -> None:
+        nonlocal clock
+        now = time.perf_counter()
+        timings[name] = round(now - clock, 3)
+        clock = now
+
+    try:
+        cycle, components = await asyncio.gather(load_cycle(cycle_id), component_ids())
+        ranges: List[Any] = await shard_ranges(workers) if workers > 1 else [None]
+        shards = _track(run_id, ranges)
+        lap("setup")
+        if len(ranges) > 1:
+            results = await _run_shards(run_id, cycle, components, incremental, ranges, shards)
+        else:
+            results = [await process_shard(run_id, cycle, components, incremental, None, shards[0].update)]
+        lap("shards")
+    except Exception as e:
+        logger.exception("Payroll run %s failed", run_id)
+        await _finish(run_id, {"status": FAILED, "detail": str(getattr(e, "message", e))[:1000]})
+        raise
+
+    merged = {key: sum(r[key] for r in results) for key in (
+        "employees", "gross", "deductions", "net_pay", "payslips_written", "payslips_failed",
+        "details", "details_failed", "reimbursements", "unchanged", "changed", "added", "removed", "error_count",
+    )}
+    errors = [e for r in results for e in r["errors"]]
+    ok = not merged["error_count"]
+    totals = {
+        "employees": merged["employees"],
+        "total_gross": merged["gross"] / 100,
+        "total_deductions": merged["deductions"] / 100,
+        "total_net": merged["net_pay"] / 100,
+    }
+    detail = None if ok else f"{merged['error_count']} rows not written; " + "; ".join(errors[:MAX_ERRORS])
+    await _finish(run_id, {"status": COMPLETED if ok else FAILED, "detail": detail, **totals})
+    lap("finish")
+    summary = {
+        "run_id": run_id,
+        "cycle_id": cycle_id,
+        "status": COMPLETED if ok else FAILED,
+        **totals,
+        **{key: merged[key] for key in (
+            "payslips_written", "payslips_failed", "details", "details_failed", "reimbursements",
+        )},
+        "errors": errors[:MAX_ERRORS],
+        "shards": shards,
+        "seconds": timings,
+    }
+    if incremental:
+        # Shards are contiguous emp_id ranges in order, so the merged diff is sorted too
+        changes = [c for r in results for c in r["diff"]]
+        summary.update({
+            **{key: merged[key] for key in ("unchanged", "changed", "added", "removed")},
+            "diff": changes[:MAX_DIFF],
+            "diff_truncated": merged["changed"] + merged["added"] + merged["removed"] > MAX_DIFF,
+        })
+    return summary
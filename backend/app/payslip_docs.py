@@ -0,0 +1,392 @@
+"""
+Payslip documents: PDFs of a cycle's payslips, rendered by a background job queue.
+
+``POST /api/payroll/payroll/generate-report`` queues a job for a
+``payroll_cycles`` month (every payslip of its latest COMPLETED run, or one
+employee's) and returns at once. Jobs run one after another: the runner reads
+the run's payslips in pages of ``PAYSLIP_RENDER_BATCH``, fetches each page's
+``payroll_details`` lines and employee names and hands the page to a pool of
+``PAYSLIP_RENDER_WORKERS`` processes, two pages per process in flight. The
+API process only reads and dispatches, so month-end bulk rendering does not
+hold its event loop or threads.
+
+Rendered files are cached by (employee, cycle, content hash) at
+``PAYSLIP_DIR/<cycle_id>/<emp_id>/<hash>.<crc32>.pdf``, where the hash covers
+everything printed on the document. A payslip whose content did not change
+(a recompute that left it alone, a new run with the same figures, a second
+job) is never rendered again; a changed one replaces the employee's previous
+file, and a whole-cycle job drops the files of employees no longer in the
+run. ``GET /reports/{job_id}`` reports a job's progress and
+``GET /payslips/{cycle_id}/{emp_id}`` serves the current file.
+
+``GET /cycles/{cycle_id}/payslips.zip`` streams every rendered payslip of a
+cycle as one archive (app/zipstream.py). The CRC-32 in the file names lets
+the archive be laid out from a directory listing, without reading a file
+before its bytes are due.
+
+Jobs live in the process that queued them, like import jobs; the files are
+shared by every process using the same ``PAYSLIP_DIR``.
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+from app.config import settings
+from app.db import supabase_async
+from app.export import iter_pages
+from app.payroll_engine import COMPLETED, Cycle, PayrollError, _read, load_cycle
+from app.pdf import PAGE_HEIGHT, PAGE_WIDTH, Canvas
+from app.zipstream import ZipEntry
+
+logger = logging.getLogger(__name__)
+
+# Part of every content hash: bump when the layout changes so cached files are re-rendered
+RENDER_VERSION = b"payslip-1"
+# Document links listed on a job
+MAX_DOCUMENTS = 100
+MAX_ERRORS = 20
+
+Row = Dict[str, Any]
+
+# job id -> job; oldest finished jobs are dropped past PAYSLIP_MAX_JOBS
+_jobs: "OrderedDict[str, Row]" = OrderedDict()
+_queue: Optional[asyncio.Queue] = None
+_runner: Optional[asyncio.Task] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+# --- Documents ---
+
+def _money(value: Any) -> str:
+    return f"{Decimal(str(value or 0)):,.2f}"
+
+
+def content_hash(doc: Row) -> str:
+    data = orjson.dumps(doc, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(data, digest_size=12, person=RENDER_VERSION).hexdigest()
+
+
+def cycle_dir(cycle_id: int) -> str:
+    return os.path.join(settings.PAYSLIP_DIR, str(cycle_id))
+
+
+def employee_dir(cycle_id: int, emp_id: int) -> str:
+    return os.path.join(cycle_dir(cycle_id), str(emp_id))
+
+
+def _pdfs(directory: str) -> List[str]:
+    """Rendered files in an employee's directory: ``<hash>.<crc32>.pdf``, normally one."""
+    try:
+        return sorted(n for n in os.listdir(directory) if n.endswith(".pdf") and n.count(".") == 2)
+    except FileNotFoundError:
+        return []
+
+
+def current_file(cycle_id: int, emp_id: int) -> Optional[str]:
+    """Path of the employee's rendered payslip of the cycle, if any."""
+    names = _pdfs(employee_dir(cycle_id, emp_id))
+    return os.path.join(employee_dir(cycle_id, emp_id), names[-1]) if names else None
+
+
+def archive_entries(cycle_id: int) -> List[ZipEntry]:
+    """Every rendered payslip of the cycle, by emp_id, as archive entries (metadata only)."""
+    try:
+        employees = [e for e in os.scandir(cycle_dir(cycle_id)) if e.is_dir() and e.name.isdigit()]
+    except FileNotFoundError:
+        return []
+    entries = []
+    for employee in sorted(employees, key=lambda e: int(e.name)):
+        names = _pdfs(employee.path)
+        if not names:
+            continue
+        path = os.path.join(employee.path, names[-1])
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        crc = int(names[-1].split(".")[1], 16)
+        entries.append(ZipEntry(f"payslip-{cycle_id}-{employee.name}.pdf", path, stat.st_size, crc, stat.st_mtime))
+    return entries
+
+
+def render_payslip(doc: Row) -> bytes:
+    pdf = Canvas()
+    left, right, y = 56, PAGE_WIDTH - 56, PAGE_HEIGHT - 72
+    pdf.text(left, y, "Payslip", size=20, bold=True)
+    pdf.text(right, y, doc["period"], size=12, bold=True, align="right")
+    y -= 18
+    pdf.text(right, y, f"{doc['from']} to {doc['to']}", size=9, align="right")
+    y -= 30
+    for label, value in (
+        ("Employee", doc["employee"]),
+        ("Employee ID", str(doc["emp_id"])),
+        ("Paid days", str(doc["paid_days"])),
+        ("Loss of pay days", str(doc["lop_days"])),
+    ):
+        pdf.text(left, y, label, size=10, bold=True)
+        pdf.text(left + 120, y, value, size=10)
+        y -= 16
+    for title, lines, total_label, total in (
+        ("Earnings", doc["earnings"], "Gross earnings", doc["gross"]),
+        ("Deductions", doc["deductions"], "Total deductions", doc["total_deductions"]),
+    ):
+        y -= 18
+        pdf.text(left, y, title, size=12, bold=True)
+        pdf.text(right, y, "Amount", size=10, bold=True, align="right")
+        y -= 6
+        pdf.line(left, y, right, y)
+        for name, amount in lines:
+            y -= 16
+            pdf.text(left, y, name, size=10)
+            pdf.text(right, y, amount, size=10, align="right")
+        y -= 8
+        pdf.line(left, y, right, y)
+        y -= 16
+        pdf.text(left, y, total_label, size=10, bold=True)
+        pdf.text(right, y, total, size=10, bold=True, align="right")
+    y -= 36
+    pdf.line(left, y + 22, right, y + 22, width=1)
+    pdf.text(left, y, "Net pay", size=14, bold=True)
+    pdf.text(right, y, doc["net_pay"], size=14, bold=True, align="right")
+    pdf.text(left, 48, "This is a computer-generated payslip and needs no signature.", size=8)
+    return pdf.to_pdf(f"Payslip {doc['period']} - {doc['employee']}")
+
+
+def render_files(cycle_id: int, docs: List[Row]) -> Tuple[int, int]:
+    """
+    Render process: write each document not already on disk with its content hash and
+    drop the employee's superseded files; returns ``(rendered, cached)``.
+    """
+    rendered = cached = 0
+    for doc in docs:
+        directory = employee_dir(cycle_id, doc["emp_id"])
+        key = content_hash(doc)
+        existing = _pdfs(directory)
+        if any(name.startswith(key + ".") for name in existing):
+            cached += 1
+            continue
+        data = render_payslip(doc)
+        path = os.path.join(directory, f"{key}.{zlib.crc32(data):08x}.pdf")
+        os.makedirs(directory, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+        for old in existing:
+            try:
+                os.unlink(os.path.join(directory, old))
+            except FileNotFoundError:
+                pass
+        rendered += 1
+    return rendered, cached
+
+
+def _drop_others(cycle_id: int, in_run: Set[int]) -> int:
+    """Remove the rendered payslips of employees no longer in the cycle's run; returns how many."""
+    try:
+        employees = [e for e in os.scandir(cycle_dir(cycle_id)) if e.is_dir() and e.name.isdigit()]
+    except FileNotFoundError:
+        return 0
+    stale = [e.path for e in employees if int(e.name) not in in_run]
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+    return len(stale)
+
+
+async def latest_run(cycle_id: int) -> Row:
+    """The cycle's latest COMPLETED payroll run; PayrollError when it has none."""
+    rows, _ = await supabase_async.select("payroll_runs", {
+        "select": "run_id,cycle_id", "cycle_id": f"eq.{cycle_id}", "status": f"eq.{COMPLETED}",
+        "order": "run_id.desc", "limit": 1,
+    })
+    if not rows:
+        raise PayrollError(409, f"Payroll cycle {cycle_id} has no completed run")
+    return rows[0]
+
+
+async def _documents(cycle: Cycle, payslips: List[Row], components: Dict[int, Row]) -> List[Row]:
+    """Everything printed on each of ``payslips``, as plain values (hashed as is)."""
+    payslip_ids = ",".join(str(r["payslip_id"]) for r in payslips)
+    emp_ids = ",".join(str(r["emp_id"]) for r in payslips)
+    details, employees = await asyncio.gather(
+        _read("payroll_details", "detail_id,payslip_id,component_id,amount",
+              [("payslip_id", f"in.({payslip_ids})")], "detail_id"),
+        _read("employees", "id,first_name,last_name", [("id", f"in.({emp_ids})")], "id"),
+    )
+    lines: Dict[int, List[Row]] = {}
+    for detail in details:
+        lines.setdefault(detail["payslip_id"], []).append(detail)
+    names = {e["id"]: " ".join(filter(None, (e.get("first_name"), e.get("last_name")))) for e in employees}
+    docs = []
+    for payslip in payslips:
+        own = sorted(lines.get(payslip["payslip_id"], []), key=lambda d: d["component_id"])
+        by_type: Dict[str, List[List[str]]] = {"EARNING": [], "DEDUCTION": []}
+        for detail in own:
+            component = components.get(detail["component_id"], {"name": "Other", "type": "EARNING"})
+            by_type.setdefault(component["type"], []).append([component["name"], _money(detail["amount"])])
+        docs.append({
+            "emp_id": payslip["emp_id"],
+            "employee": names.get(payslip["emp_id"]) or f"Employee {payslip['emp_id']}",
+            "period": cycle.start.strftime("%B %Y"),
+            "from": cycle.start.isoformat(),
+            "to": cycle.end.isoformat(),
+            "paid_days": payslip["paid_days"],
+            "lop_days": payslip["lop_days"],
+            "earnings": by_type["EARNING"],
+            "deductions": by_type["DEDUCTION"],
+            "gross": _money(payslip["gross"]),
+            "total_deductions": _money(payslip["deductions"]),
+            "net_pay": _money(payslip["net_pay"]),
+        })
+    return docs
+
+
+# --- Jobs ---
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(settings.PAYSLIP_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def render_job(job: Row) -> None:
+    """Render the job's payslips, page by page in the process pool; progress is kept on the job."""
+    cycle_id, run_id = job["cycle_id"], job["run_id"]
+    loop = asyncio.get_running_loop()
+    in_flight: Set[asyncio.Future] = set()
+    in_run: Set[int] = set()
+    started = time.perf_counter()
+
+    async def render(cycle: Cycle, page: List[Row], components: Dict[int, Row]) -> None:
+        docs = await _documents(cycle, page, components)
+        job["payslips"] += len(docs)
+        in_run.update(doc["emp_id"] for doc in docs)
+        for doc in docs[:MAX_DOCUMENTS - len(job["documents"])]:
+            job["documents"].append({
+                "emp_id": doc["emp_id"], "url": f"/api/payroll/payroll/payslips/{cycle_id}/{doc['emp_id']}",
+            })
+        try:
+            rendered, cached = await loop.run_in_executor(_render_pool(), render_files, cycle_id, docs)
+        except Exception as e:
+            logger.exception("Rendering payslips of cycle %s failed", cycle_id)
+            job["failed"] += len(docs)
+            if len(job["errors"]) < MAX_ERRORS:
+                job["errors"].append(f"emp_id {docs[0]['emp_id']}..{docs[-1]['emp_id']}: {e}")
+            return
+        job["rendered"] += rendered
+        job["cached"] += cached
+
+    job["status"] = "running"
+    job["started_at"] = datetime.now(timezone.utc).isoformat()
+    try:
+        cycle = await load_cycle(cycle_id)
+        rows = await _read("salary_components", "component_id,name,type", [], "component_id")
+        components = {r["component_id"]: r for r in rows}
+        conditions = [("run_id", f"eq.{run_id}")]
+        if job["emp_id"] is not None:
+            conditions.append(("emp_id", f"eq.{job['emp_id']}"))
+        async for page in iter_pages(
+            "payslips", "payslip_id,emp_id,gross,deductions,net_pay,paid_days,lop_days",
+            conditions, None, "payslip_id", settings.PAYSLIP_RENDER_BATCH,
+        ):
+            # Reading a page's lines and names overlaps rendering the pages before it
+            in_flight.add(asyncio.ensure_future(render(cycle, page, components)))
+            if len(in_flight) >= 2 * settings.PAYSLIP_RENDER_WORKERS:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        await asyncio.gather(*in_flight)
+        if job["emp_id"] is None:
+            job["removed"] = await asyncio.to_thread(_drop_others, cycle_id, in_run)
+        job["status"] = "failed" if job["failed"] else "completed"
+    except Exception as e:
+        for task in in_flight:
+            task.cancel()
+        logger.exception("Payslip job %s failed", job["job_id"])
+        job["status"] = "failed"
+        job["detail"] = str(getattr(e, "message", e))
+    finally:
+        job["finished_at"] = datetime.now(timezone.utc).isoformat()
+        job["seconds"] = round(time.perf_counter() - started, 3)
+
+
+async def _run_queue() -> None:
+    while True:
+        job = await _queue.get()
+        try:
+            await render_job(job)
+        finally:
+            _queue.task_done()
+
+
+def queue_job(cycle_id: int, run_id: int, emp_id: Optional[int] = None) -> Row:
+    """Queue rendering of a run's payslips (one employee's with ``emp_id``); jobs run in order."""
+    global _queue, _runner
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "cycle_id": cycle_id,
+        "run_id": run_id,
+        "emp_id": emp_id,
+        "status": "queued",
+        "payslips": 0,
+        "rendered": 0,
+        "cached": 0,
+        "failed": 0,
+        "removed": 0,
+        "errors": [],
+        "detail": None,
+        "documents": [],
+        "queued_at": datetime.now(timezone.utc).isoformat(),
+        "started_at": None,
+        "finished_at": None,
+    }
+    _jobs[job["job_id"]] = job
+    while len(_jobs) > settings.PAYSLIP_MAX_JOBS:
+        oldest = next((k for k, j in _jobs.items() if j["status"] in ("completed", "failed")), None)
+        if oldest is None:
+            break
+        del _jobs[oldest]
+    if _queue is None:
+        _queue = asyncio.Queue()
+    if _runner is None or _runner.done():
+        _runner = asyncio.create_task(_run_queue())
+    _queue.put_nowait(job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[Row]:
+    job = _jobs.get(job_id)
+    if job is None or job["status"] != "queued":
+        return job
+    queued = [j["job_id"] for j in _jobs.values() if j["status"] == "queued"]
+    return {**job, "queue_position": queued.index(job_id) + 1}
+
+
+async def stop() -> None:
+    """Cancel the queue runner and stop the render processes (queued jobs are dropped)."""
+    global _pool, _runner
+    if _runner is not None:
+        _runner.cancel()
+        try:
+            await _runner
+        except asyncio.CancelledError:
+            pass
+        _runner = None
+    if _pool is not None:
+        await asyncio.to_thread(_pool.shutdown, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,204 @@
+"""
+Query-string helpers shared by the generic CRUD routers.
+
+Kept free of FastAPI / Flask imports so both ``app.crud`` and the legacy
+``utils.crud_blueprint`` can parse the same grammar.
+"""
+
+import base64
+import json
+import re
+from typing import Any, Collection, Iterable, List, Mapping, Optional, Tuple
+
+# Query params consumed by the routers themselves rather than treated as column filters
+RESERVED_PARAMS = {"limit", "after", "fields", "order", "q", "count", "dry_run", "max_rows", "returning", "format"}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# PostgREST operators a client may use in ?column=op.value filters
+FILTER_OPERATORS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in", "is"}
+_PATTERN_OPERATORS = {"like", "ilike"}
+_IS_VALUES = {"null", "true", "false", "unknown"}
+COUNT_METHODS = {"exact", "planned", "estimated"}
+
+
+class QueryError(ValueError):
+    """Invalid list/filter query supplied by the client (maps to HTTP 400)."""
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque keyset cursor for the last row of a page."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise QueryError("Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise QueryError("Invalid cursor")
+    return values
+
+
+def page_size(limit: Optional[str], default: int, maximum: int) -> int:
+    """Requested page size, clamped to ``maximum`` so no list can be unbounded."""
+    if limit is None or limit == "":
+        return min(default, maximum)
+    try:
+        size = int(limit)
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    if size < 1:
+        raise QueryError("limit must be at least 1")
+    return min(size, maximum)
+
+
+def validate_column(name: str, allowed: Optional[Collection[str]]) -> str:
+    """
+    Reject anything that is not a known column of the table. Tables without a
+    registry entry still only accept plain identifiers, so PostgREST select /
+    embedding syntax can never be smuggled through.
+    """
+    if allowed is not None:
+        if name not in allowed:
+            raise QueryError(f"Unknown column: {name}")
+    elif not _IDENTIFIER.match(name):
+        raise QueryError(f"Invalid column name: {name}")
+    return name
+
+
+def select_clause(fields: Optional[str], allowed: Optional[Collection[str]], pk: str, extra: Iterable[str] = ()) -> str:
+    """
+    PostgREST ``select`` for a ``?fields=a,b,c`` mask. The pk (and any ``extra``
+    columns such as the sort key) is always kept so cursors can be built.
+    """
+    if not fields:
+        return "*"
+    columns = [validate_column(f.strip(), allowed) for f in fields.split(",") if f.strip()]
+    if not columns:
+        return "*"
+    return ",".join(dict.fromkeys([pk, *extra, *columns]))
+
+
+def parse_filter(column: str, raw: str, allowed: Optional[Collection[str]]) -> Tuple[str, str, str]:
+    """
+    Parse one ``?column=[not.]op.value`` filter into ``(column, operator, value)``.
+
+    A value without a known operator prefix keeps the historical meaning of
+    equality (``?status=Active``). Pattern operators are only accepted on
+    text columns when the table's column types are known.
+    """
+    validate_column(column, allowed)
+    negate = False
+    op, sep, value = raw.partition(".")
+    if sep and op == "not":
+        inner, inner_sep, inner_value = value.partition(".")
+        if inner_sep and inner in FILTER_OPERATORS:
+            negate, op, value = True, inner, inner_value
+    if not sep or op not in FILTER_OPERATORS:
+        return column, "eq", raw
+
+    if op == "in" and not (value.startswith("(") and value.endswith(")") and len(value) > 2):
+        raise QueryError(f"{column}: in. expects a list such as in.(a,b)")
+    if op == "is" and value.lower() not in _IS_VALUES:
+        raise QueryError(f"{column}: is. expects null, true, false or unknown")
+    if op in _PATTERN_OPERATORS and isinstance(allowed, Mapping) and allowed.get(column) not in (None, "text"):
+        raise QueryError(f"{column}: {op} is only supported on text columns")
+    return column, f"not.{op}" if negate else op, value
+
+
+def filter_params(items: Iterable[Tuple[str, str]], allowed: Optional[Collection[str]]) -> List[Tuple[str, str]]:
+    """PostgREST query params for every non-reserved ``?column=`` filter (repeats allowed)."""
+    params = []
+    for key, raw in items:
+        if key in RESERVED_PARAMS:
+            continue
+        column, op, value = parse_filter(key, raw, allowed)
+        params.append((column, f"{op}.{value}"))
+    return params
+
+
+def count_method(value: Optional[str]) -> Optional[str]:
+    """``?count=exact|planned|estimated`` (``true`` is shorthand for exact)."""
+    if not value:
+        return None
+    if value == "true":
+        return "exact"
+    if value not in COUNT_METHODS:
+        raise QueryError("count must be exact, planned or estimated")
+    return value
+
+
+def parse_order(value: Optional[str], allowed: Optional[Collection[str]]) -> Optional[Tuple[str, bool]]:
+    """``?order=column.asc|desc`` as ``(column, descending)``; one sort column, the pk breaks ties."""
+    if not value:
+        return None
+    column, _, direction = value.partition(".")
+    if direction not in ("", "asc", "desc"):
+        raise QueryError("order must look like column.asc or column.desc")
+    return validate_column(column, allowed), direction == "desc"
+
+
+def order_clause(order: Optional[Tuple[str, bool]], pk: str) -> str:
+    if order is None:
+        return f"{pk}.asc"
+    column, desc = order
+    direction = "desc" if desc else "asc"
+    # nullslast in both directions keeps the keyset condition below simple
+    return f"{column}.{direction}.nullslast,{pk}.{direction}"
+
+
+def quote_value(value: Any) -> str:
+    """Double-quote a value for use inside a PostgREST ``or=(...)`` / ``and=(...)`` tree."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_condition(order: Optional[Tuple[str, bool]], pk: str, cursor: List[Any]) -> Tuple[str, str]:
+    """Query param selecting the rows strictly after ``cursor`` under ``order_clause(order, pk)``."""
+    if order is None:
+        if len(cursor) != 1:
+            raise QueryError("Cursor does not match the requested order")
+        return pk, f"gt.{cursor[0]}"
+    if len(cursor) != 2:
+        raise QueryError("Cursor does not match the requested order")
+    column, desc = order
+    value, last_pk = cursor
+    op = "lt" if desc else "gt"
+    if value is None:
+        # Already inside the trailing block of NULL sort keys
+        return "and", f"({column}.is.null,{pk}.{op}.{quote_value(last_pk)})"
+    return "or", (
+        f"({column}.{op}.{quote_value(value)},{column}.is.null,"
+        f"and({column}.eq.{quote_value(value)},{pk}.{op}.{quote_value(last_pk)}))"
+    )
+
+
+def cursor_values(row: Mapping[str, Any], order: Optional[Tuple[str, bool]], pk: str) -> List[Any]:
+    """Keyset position of ``row``: ``[pk]`` or ``[sort value, pk]``."""
+    if order is None:
+        return [row[pk]]
+    return [row.get(order[0]), row[pk]]
+
+
+def next_cursor_for(row: Mapping[str, Any], order: Optional[Tuple[str, bool]], pk: str) -> str:
+    return encode_cursor(cursor_values(row, order, pk))
+
+
+def search_condition(term: str, columns: Iterable[str]) -> Tuple[str, str]:
+    """``?q=`` as a case-insensitive substring match OR-ed across ``columns``."""
+    pattern = quote_value(f"*{term}*")
+    return "or", "(" + ",".join(f"{c}.ilike.{pattern}" for c in columns) + ")"
+
+
+def combine_conditions(conditions: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Plain filters pass through; several ``or`` / ``and`` trees are nested under one ``and``."""
+    plain, trees = [], []
+    for key, value in conditions:
+        (trees if key in ("or", "and") else plain).append((key, value))
+    if len(trees) > 1:
+        trees = [("and", "(" + ",".join(f"{key}{value}" for key, value in trees) + ")")]
+    return plain + trees
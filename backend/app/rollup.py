@@ -0,0 +1,219 @@
+"""
+Daily attendance rollup: present / absent / late counts per (date, company,
+department) in ``attendance_daily_rollup`` (db/attendance_rollup.sql).
+
+Every write to ``attendance`` reports the affected rows as they were and as
+they are now to ``record_change``; the difference goes upstream as signed
+deltas in one RPC, so keeping the rollup current costs one request per
+write. When the previous rows are unknown (bulk upserts) the touched days
+are recounted instead. ``rebuild`` recounts a date range from scratch and
+backs ``backfill_attendance_rollup.py``.
+
+Days are attributed to the employee's current company / department; moving
+an employee does not move their past days until the range is rebuilt.
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.config import settings
+from app.db import supabase_async
+from app.export import iter_pages
+
+ROLLUP_TABLE = "attendance_daily_rollup"
+# Stored for employees without a company / department (the key columns are NOT NULL)
+UNASSIGNED = 0
+# Days recounted per replace_attendance_rollup call during a rebuild
+REBUILD_WINDOW_DAYS = 31
+# Employees per lookup request, keeping id=in.(...) well inside URL limits
+LOOKUP_BATCH = 200
+COUNTS = ("present", "absent", "late")
+SOURCE_COLUMNS = "attendance_id,emp_id,attendance_date,status,check_in"
+
+Row = Dict[str, Any]
+Key = Tuple[str, int, int]
+Placement = Tuple[int, int, Optional[tzinfo]]
+
+
+@lru_cache(maxsize=64)
+def _zone(name: Optional[str]) -> Optional[tzinfo]:
+    try:
+        return ZoneInfo(name) if name else None
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def is_late(check_in: Optional[str], zone: Optional[tzinfo]) -> bool:
+    """Check-in after ``ATTENDANCE_LATE_AFTER`` on the company's wall clock."""
+    if not check_in:
+        return False
+    try:
+        moment = datetime.fromisoformat(str(check_in))
+    except ValueError:
+        return False
+    if zone is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(zone)
+    return moment.time() > settings.ATTENDANCE_LATE_AFTER
+
+
+def classify(row: Row, zone: Optional[tzinfo] = None) -> Tuple[int, int, int]:
+    """(present, absent, late) contributed by one attendance row."""
+    status = (row.get("status") or "").upper()
+    if status == "ABSENT":
+        return 0, 1, 0
+    if status not in ("PRESENT", "LATE") and not row.get("check_in"):
+        return 0, 0, 0
+    return 1, 0, int(status == "LATE" or is_late(row.get("check_in"), zone))
+
+
+async def placements(emp_ids: Iterable[Any]) -> Dict[Any, Placement]:
+    """employees.id -> (company_id, dept_id, company timezone)."""
+    ids = sorted({i for i in emp_ids if i is not None})
+
+    async def lookup(batch: List[Any]) -> List[Row]:
+        params = {"select": "id,company_id,dept_id,companies(timezone)", "id": f"in.({','.join(map(str, batch))})"}
+        rows, _ = await supabase_async.select("employees", params)
+        return rows
+
+    found: Dict[Any, Placement] = {}
+    batches = [ids[i:i + LOOKUP_BATCH] for i in range(0, len(ids), LOOKUP_BATCH)]
+    for rows in await asyncio.gather(*(lookup(batch) for batch in batches)):
+        for row in rows:
+            company = row.get("companies") or {}
+            found[row["id"]] = (
+                row.get("company_id") or UNASSIGNED,
+                row.get("dept_id") or UNASSIGNED,
+                _zone(company.get("timezone")),
+            )
+    return found
+
+
+def tally(rows: Iterable[Row], places: Dict[Any, Placement], sign: int, totals: Dict[Key, List[int]]) -> None:
+    for row in rows:
+        day = row.get("attendance_date")
+        if not day:
+            continue
+        company, dept, zone = places.get(row.get("emp_id"), (UNASSIGNED, UNASSIGNED, None))
+        counts = classify(row, zone)
+        if any(counts):
+            entry = totals[(str(day), company, dept)]
+            for i, n in enumerate(counts):
+                entry[i] += sign * n
+
+
+def _records(totals: Dict[Key, List[int]]) -> List[Row]:
+    return [
+        {"rollup_date": day, "company_id": company, "dept_id": dept, **dict(zip(COUNTS, counts))}
+        for (day, company, dept), counts in totals.items()
+        if any(counts)
+    ]
+
+
+async def record_change(before: Optional[Sequence[Row]], after: Sequence[Row]) -> None:
+    """
+    Fold one write into the rollup. ``before`` / ``after`` are the full attendance rows
+    before and after the write (``[]`` for an insert / delete); ``before=None`` means
+    the previous state is unknown and the days in ``after`` are recounted.
+    """
+    if before is None:
+        days = sorted({str(row["attendance_date"]) for row in after if row.get("attendance_date")})
+        if days:
+            await recount_days(days)
+        return
+    places = await placements(row.get("emp_id") for row in (*before, *after))
+    totals: Dict[Key, List[int]] = defaultdict(lambda: [0, 0, 0])
+    tally(before, places, -1, totals)
+    tally(after, places, 1, totals)
+    deltas = _records(totals)
+    if deltas:
+        await supabase_async.rpc("apply_attendance_rollup", {"deltas": deltas})
+
+
+async def count_attendance(conditions: Sequence[Tuple[str, str]]) -> Dict[Key, List[int]]:
+    """Rollup counts of every attendance row matching ``conditions``, read in keyset pages."""
+    totals: Dict[Key, List[int]] = defaultdict(lambda: [0, 0, 0])
+    places: Dict[Any, Placement] = {}
+    order = ("attendance_date", False)
+    async for rows in iter_pages("attendance", SOURCE_COLUMNS, conditions, order, "attendance_id", settings.EXPORT_CHUNK_SIZE):
+        places.update(await placements({row.get("emp_id") for row in rows} - places.keys()))
+        tally(rows, places, 1, totals)
+    return totals
+
+
+async def recount_days(days: Sequence[str]) -> int:
+    """Replace the rollup rows of ``days`` with a fresh count; returns the rows written."""
+    totals = await count_attendance([("attendance_date", f"in.({','.join(days)})")])
+    records = _records(totals)
+    await supabase_async.rpc("replace_attendance_rollup", {"days": list(days), "counts": records})
+    return len(records)
+
+
+async def rebuild(start: date, end: date) -> Dict[str, int]:
+    """Recount every day in ``[start, end]``, one window of days per upstream transaction."""
+    days = rows = 0
+    window_start = start
+    while window_start <= end:
+        window_end = min(window_start + timedelta(days=REBUILD_WINDOW_DAYS - 1), end)
+        window = [str(window_start + timedelta(days=i)) for i in range((window_end - window_start).days + 1)]
+        totals = await count_attendance([
+            ("attendance_date", f"gte.{window_start}"), ("attendance_date", f"lte.{window_end}"),
+        ])
+        records = _records(totals)
+        await supabase_async.rpc("replace_attendance_rollup", {"days": window, "counts": records})
+        days += len(window)
+        rows += len(records)
+        window_start = window_end + timedelta(days=1)
+    return {"days": days, "rows": rows}
+
+
+async def attendance_bounds() -> Optional[Tuple[date, date]]:
+    """First and last ``attendance_date`` on record, or None for an empty table."""
+    first, last = await asyncio.gather(
+        supabase_async.select("attendance", {"select": "attendance_date", "order": "attendance_date.asc", "limit": 1}),
+        supabase_async.select("attendance", {"select": "attendance_date", "order": "attendance_date.desc", "limit": 1}),
+    )
+    if not first[0]:
+        return None
+    return date.fromisoformat(first[0][0]["attendance_date"]), date.fromisoformat(last[0][0]["attendance_date"])
+
+
+async def daily_totals(
+    start: date, end: date, company_id: Optional[int] = None, dept_id: Optional[int] = None,
+) -> List[Row]:
+    """
+    ``{date, present, absent, late}`` for every day in ``[start, end]`` (zeros included),
+    summed over the departments that match; reads O(days x departments) rollup rows.
+    """
+    params: List[Tuple[str, Any]] = [
+        ("select", "rollup_date,present,absent,late"),
+        ("order", "rollup_date,company_id,dept_id"),
+        ("rollup_date", f"gte.{start}"),
+        ("rollup_date", f"lte.{end}"),
+    ]
+    if company_id is not None:
+        params.append(("company_id", f"eq.{company_id}"))
+    if dept_id is not None:
+        params.append(("dept_id", f"eq.{dept_id}"))
+    # The rollup is small (days x departments); plain offset pages keep under db-max-rows
+    rows: List[Row] = []
+    page_size = settings.EXPORT_CHUNK_SIZE
+    while True:
+        page, _ = await supabase_async.select(ROLLUP_TABLE, [*params, ("limit", page_size), ("offset", len(rows))])
+        rows.extend(page)
+        if len(page) < page_size:
+            break
+
+    days = {
+        str(start + timedelta(days=i)): {"date": str(start + timedelta(days=i)), **dict.fromkeys(COUNTS, 0)}
+        for i in range((end - start).days + 1)
+    }
+    for row in rows:
+        entry = days.get(str(row["rollup_date"]))
+        if entry is not None:
+            for name in COUNTS:
+                entry[name] += row[name] or 0
+    return list(days.values())
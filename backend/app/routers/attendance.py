@@ -1,43 +1,169 @@
-from fastapi import APIRouter, HTTPException
-from app.db import supabase
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from app import device_logs
+from app.cache import invalidate
+from app.crud import upstream_http_error
+from app.config import settings
+from app.db import supabase, supabase_async, PostgrestError
+from app.derive import derive
+from app.ingest import Backpressure, DuplicatePunch, punch_queue
+from app.query import QueryError
 from app.models.attendance import AttendanceCreate, AttendanceUpdate, AttendanceResponse
-from typing import List
-from datetime import date
+from app.rollup import daily_totals, record_change
+from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
 from fastapi.encoders import jsonable_encoder
 
 router = APIRouter(tags=["Attendance"])
+logger = logging.getLogger(__name__)
+
+# Longest range /rollup answers in one response
+MAX_ROLLUP_DAYS = 366
+# Longest range one /derive request recomputes (derive_attendance.py has no limit)
+MAX_DERIVE_DAYS = 31
+
+
+async def update_rollup(before: List[dict], after: List[dict]) -> None:
+    """Fold a committed punch into the daily rollup; runs after the response, failures are only logged."""
+    try:
+        await record_change(before, after)
+    except Exception:
+        logger.exception("Attendance rollup update failed")
 
 @router.post("/check-in", response_model=dict)
-def check_in(attendance: AttendanceCreate):
+async def check_in(attendance: AttendanceCreate, background_tasks: BackgroundTasks, response: Response):
+    """
+    One upstream statement: an upsert on UNIQUE(emp_id, attendance_date) that ignores
+    duplicates, so concurrent punches cannot both insert. An empty result means the
+    employee already checked in for that day.
+
+    With ATTENDANCE_WRITE_BEHIND the punch is only journaled locally and answered 202;
+    app/ingest.py writes it upstream in batches.
+    """
+    data = jsonable_encoder(attendance)
+    if settings.ATTENDANCE_WRITE_BEHIND:
+        try:
+            record = await punch_queue.submit(data)
+        except DuplicatePunch as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except Backpressure as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except OSError as e:
+            raise HTTPException(status_code=503, detail=f"Punch journal unavailable: {e}")
+        response.status_code = 202
+        return {"status": "queued", **record}
     try:
-        # Check if already checked in today
-        existing = supabase.table("attendance").select("*").eq("emp_id", attendance.emp_id).eq("attendance_date", str(date.today())).execute()
-        if existing.data:
-            raise HTTPException(status_code=400, detail="Already checked in today")
-        
-        # Serialize entry for Supabase
-        data = jsonable_encoder(attendance)
-        response = supabase.table("attendance").insert(data).execute()
-        return response.data[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        rows = await supabase_async.insert(
+            "attendance",
+            data,
+            params={"on_conflict": "emp_id,attendance_date"},
+            prefer=("return=representation", "resolution=ignore-duplicates"),
+        )
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+    finally:
+        invalidate("attendance")
+    if not rows:
+        raise HTTPException(status_code=409, detail=f"Already checked in for {data['attendance_date']}")
+    background_tasks.add_task(update_rollup, [], rows)
+    return rows[0]
 
 @router.post("/check-out", response_model=dict)
-def check_out(emp_id: int, update: AttendanceUpdate):
+async def check_out(emp_id: int, update: AttendanceUpdate):
+    """
+    One conditional PATCH of today's row while check_out is still empty. Only when it
+    matched nothing is the row read back, to tell "never checked in" (404) from
+    "already checked out" (409). check_out does not affect the daily rollup.
+    """
+    today = str(date.today())
+    data = jsonable_encoder({"check_out": update.check_out or datetime.now(timezone.utc)})
+    existing: List[dict] = []
     try:
-        # Find today's attendance record
-        existing = supabase.table("attendance").select("*").eq("emp_id", emp_id).eq("attendance_date", str(date.today())).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="No check-in record found for today")
-        
-        att_id = existing.data[0]['attendance_id']
-        data = jsonable_encoder(update)
-        response = supabase.table("attendance").update(data).eq("attendance_id", att_id).execute()
-        return response.data[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        rows = await supabase_async.update(
+            "attendance", data, {"emp_id": f"eq.{emp_id}", "attendance_date": f"eq.{today}", "check_out": "is.null"},
+        )
+        if not rows:
+            existing, _ = await supabase_async.select(
+                "attendance", {"select": "attendance_id", "emp_id": f"eq.{emp_id}", "attendance_date": f"eq.{today}"},
+            )
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+    finally:
+        invalidate("attendance")
+    if not rows:
+        if existing:
+            raise HTTPException(status_code=409, detail="Already checked out today")
+        raise HTTPException(status_code=404, detail="No check-in record found for today")
+    return rows[0]
+
+@router.post("/device-logs")
+async def ingest_device_logs(request: Request, batch_size: Optional[int] = None):
+    """
+    NDJSON punches from biometric / turnstile devices, one ``{"emp_id", "log_time"}``
+    per line (``Content-Encoding: gzip`` accepted), written to attendance_logs while the
+    body streams in. Repeats of a recent (emp_id, log_time) are counted as duplicates.
+    Answers per-upload counts and per-line errors; 503 when some batch could not be
+    written upstream, in which case the whole upload can simply be resent.
+    """
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(status_code=415, detail="Content-Encoding must be gzip or identity")
+    size = min(max(batch_size or settings.DEVICE_LOG_BATCH_SIZE, 1), settings.DEVICE_LOG_BATCH_SIZE)
+    try:
+        summary = await device_logs.ingest(request.stream(), gzip=encoding == "gzip", batch_size=size)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        invalidate("attendance_logs")
+    if summary["failed"]:
+        return JSONResponse(summary, status_code=503, headers={"Retry-After": "5"})
+    return summary
+
+@router.get("/ingest/metrics")
+def get_ingest_metrics():
+    """Write-behind queue depth, flush latency and counters, plus device log ingest totals."""
+    return {**punch_queue.metrics(), "device_logs": device_logs.metrics()}
+
+@router.post("/derive", response_model=dict)
+async def derive_attendance(from_date: Optional[date] = None, to_date: Optional[date] = None):
+    """
+    Rebuild the daily attendance records (first-in, last-out, worked hours) of a date
+    range from attendance_logs; yesterday by default. Safe to repeat.
+    """
+    end = to_date or date.today() - timedelta(days=1)
+    start = from_date or end
+    if start > end:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+    if (end - start).days >= MAX_DERIVE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DERIVE_DAYS} days per request")
+    try:
+        return await derive(start, end)
+    except PostgrestError as e:
+        raise HTTPException(status_code=500, detail=e.message)
+
+@router.get("/rollup", response_model=List[dict])
+async def get_attendance_rollup(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    company_id: Optional[int] = None,
+    dept_id: Optional[int] = None,
+):
+    """Present / absent / late per day (last 30 days by default), read from the daily rollup."""
+    end = to_date or date.today()
+    start = from_date or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+    if (end - start).days >= MAX_ROLLUP_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ROLLUP_DAYS} days per request")
+    try:
+        return await daily_totals(start, end, company_id, dept_id)
+    except PostgrestError as e:
+        raise HTTPException(status_code=500, detail=e.message)
 
-@router.get("/{emp_id}", response_model=List[dict])
+# Typed so the flat CRUD router's /export (app/main.py) is not taken for an emp_id
+@router.get("/{emp_id:int}", response_model=List[dict])
 def get_attendance(emp_id: int):
     try:
         response = supabase.table("attendance").select("*").eq("emp_id", emp_id).execute()
@@ -1,8 +1,7 @@
-import os
 import httpx
 import logging
 from fastapi import APIRouter, HTTPException, Request
-from app.db import supabase
+from app.db import supabase_async, PostgrestError
 from app.config import settings
 from app.models.auth import SignupRequest, LoginRequest, RefreshRequest, AuthResponse, UserResponse, SessionResponse
 from typing import Optional, Dict, Any, Tuple
@@ -10,7 +9,6 @@ from typing import Optional, Dict, Any, Tuple
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
 logger = logging.getLogger(__name__)
 
-_SUPABASE_URL = settings.SUPABASE_URL
 _SUPABASE_KEY = settings.SUPABASE_KEY
 _SERVICE_KEY = settings.SUPABASE_SERVICE_KEY or _SUPABASE_KEY
 
@@ -20,13 +18,20 @@ _HEADERS = {
     "Content-Type": "application/json",
 }
 
-def _try_confirm_email(email: str) -> bool:
+def _anon_headers() -> Dict[str, str]:
+    # Sign-in / sign-up go through the public key, admin calls use the pool's service key
+    return {"apikey": _SUPABASE_KEY, "Authorization": f"Bearer {_SUPABASE_KEY}"}
+
+def _error_message(r: httpx.Response) -> str:
     try:
-        r = httpx.get(
-            f"{_SUPABASE_URL}/auth/v1/admin/users",
-            headers=_HEADERS,
-            timeout=10,
-        )
+        result = r.json()
+    except ValueError:
+        return r.text
+    return result.get("msg") or result.get("error_description") or result.get("message") or str(result)
+
+async def _try_confirm_email(email: str) -> bool:
+    try:
+        r = await supabase_async.request("GET", "/auth/v1/admin/users", headers=_HEADERS)
         if r.status_code != 200:
             return False
 
@@ -36,48 +41,46 @@ def _try_confirm_email(email: str) -> bool:
             return False
 
         uid = user["id"]
-        patch = httpx.put(
-            f"{_SUPABASE_URL}/auth/v1/admin/users/{uid}",
+        patch = await supabase_async.request(
+            "PUT",
+            f"/auth/v1/admin/users/{uid}",
             headers=_HEADERS,
             json={"email_confirm": True},
-            timeout=10,
         )
         return patch.status_code == 200
     except Exception as e:
         logger.error(f"Error confirming email: {e}")
         return False
 
-def _direct_signin(email: str, password: str) -> Optional[Dict[str, Any]]:
+async def _token(grant_type: str, body: Dict[str, Any]) -> httpx.Response:
+    return await supabase_async.request(
+        "POST",
+        "/auth/v1/token",
+        params={"grant_type": grant_type},
+        headers=_anon_headers(),
+        json=body,
+    )
+
+async def _direct_signin(email: str, password: str) -> Optional[Dict[str, Any]]:
     try:
-        r = httpx.post(
-            f"{_SUPABASE_URL}/auth/v1/token?grant_type=password",
-            headers={
-                "apikey": _SUPABASE_KEY,
-                "Content-Type": "application/json",
-            },
-            json={"email": email, "password": password},
-            timeout=10,
-        )
+        r = await _token("password", {"email": email, "password": password})
         if r.status_code == 200:
             return r.json()
     except Exception as e:
         logger.error(f"Direct signin failed: {e}")
     return None
 
-def _signup_direct(email: str, password: str, full_name: str = "") -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+async def _signup_direct(email: str, password: str, full_name: str = "") -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     try:
-        r = httpx.post(
-            f"{_SUPABASE_URL}/auth/v1/signup",
-            headers={
-                "apikey": _SUPABASE_KEY,
-                "Content-Type": "application/json",
-            },
+        r = await supabase_async.request(
+            "POST",
+            "/auth/v1/signup",
+            headers=_anon_headers(),
             json={
                 "email": email,
                 "password": password,
                 "data": {"full_name": full_name},
             },
-            timeout=10,
         )
         result = r.json()
 
@@ -85,10 +88,10 @@ def _signup_direct(email: str, password: str, full_name: str = "") -> Tuple[Opti
             return None, result.get("msg") or result.get("error_description") or str(result)
 
         # Step 2: Try to auto-confirm via admin API
-        _try_confirm_email(email)
+        await _try_confirm_email(email)
 
         # Step 3: Try to sign in to get a session
-        signin = _direct_signin(email, password)
+        signin = await _direct_signin(email, password)
         if signin and signin.get("access_token"):
             return signin, None
 
@@ -97,6 +100,23 @@ def _signup_direct(email: str, password: str, full_name: str = "") -> Tuple[Opti
     except Exception as e:
         return None, str(e)
 
+def _auth_response(result: Dict[str, Any], email: str = "") -> Dict[str, Any]:
+    user_data = result.get("user") or {}
+    metadata = user_data.get("user_metadata") or {}
+    return {
+        "user": {
+            "id": user_data.get("id", ""),
+            "email": user_data.get("email", email),
+            "full_name": metadata.get("full_name", ""),
+            "created_at": user_data.get("created_at"),
+        },
+        "session": {
+            "access_token": result["access_token"],
+            "refresh_token": result.get("refresh_token", ""),
+            "expires_at": result.get("expires_at", 0),
+        },
+    }
+
 @router.post("/signup", response_model=AuthResponse, status_code=201)
 async def signup(body: SignupRequest):
     email = body.email.strip()
@@ -106,7 +126,7 @@ async def signup(body: SignupRequest):
     if len(password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
 
-    result, error = _signup_direct(email, password, full_name)
+    result, error = await _signup_direct(email, password, full_name)
 
     if error:
         low = error.lower()
@@ -140,76 +160,37 @@ async def login(body: LoginRequest):
     password = body.password
 
     try:
-        # SDK attempt
-        result = supabase.auth.sign_in_with_password({"email": email, "password": password})
-        user = result.user
-        session = result.session
-
-        return {
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.user_metadata.get("full_name", ""),
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-            },
-            "session": {
-                "access_token": session.access_token,
-                "refresh_token": session.refresh_token,
-                "expires_at": session.expires_at,
-            },
-        }
+        r = await _token("password", {"email": email, "password": password})
+    except PostgrestError as e:
+        raise HTTPException(status_code=500, detail=e.message)
 
-    except Exception as e:
-        err_msg = str(e).lower()
-        if "email not confirmed" in err_msg:
-            # Attempt to confirm and sign in manually
-            confirmed = _try_confirm_email(email)
-            if confirmed:
-                signin = _direct_signin(email, password)
-                if signin and signin.get("access_token"):
-                    user_data = signin.get("user", {})
-                    metadata = user_data.get("user_metadata", {})
-                    return {
-                        "user": {
-                            "id": user_data.get("id", ""),
-                            "email": user_data.get("email", email),
-                            "full_name": metadata.get("full_name", ""),
-                            "created_at": user_data.get("created_at"),
-                        },
-                        "session": {
-                            "access_token": signin["access_token"],
-                            "refresh_token": signin.get("refresh_token", ""),
-                            "expires_at": signin.get("expires_at", 0),
-                        },
-                    }
-            raise HTTPException(status_code=401, detail="Email not confirmed. Please check your email.")
-        
-        if "invalid" in err_msg or "credentials" in err_msg:
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-        
-        raise HTTPException(status_code=500, detail=str(e))
+    if r.status_code == 200:
+        return _auth_response(r.json(), email)
+
+    err_msg = _error_message(r).lower()
+    if "email not confirmed" in err_msg:
+        # Attempt to confirm and sign in manually
+        confirmed = await _try_confirm_email(email)
+        if confirmed:
+            signin = await _direct_signin(email, password)
+            if signin and signin.get("access_token"):
+                return _auth_response(signin, email)
+        raise HTTPException(status_code=401, detail="Email not confirmed. Please check your email.")
+
+    if "invalid" in err_msg or "credentials" in err_msg:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    raise HTTPException(status_code=500, detail=_error_message(r))
 
 @router.post("/refresh", response_model=AuthResponse)
 async def refresh(body: RefreshRequest):
     try:
-        result = supabase.auth.refresh_session(body.refresh_token)
-        user = result.user
-        session = result.session
-
-        return {
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.user_metadata.get("full_name", ""),
-            },
-            "session": {
-                "access_token": session.access_token,
-                "refresh_token": session.refresh_token,
-                "expires_at": session.expires_at,
-            },
-        }
-    except Exception:
+        r = await _token("refresh_token", {"refresh_token": body.refresh_token})
+    except PostgrestError:
         raise HTTPException(status_code=401, detail="Session expired. Please log in again.")
+    if r.status_code != 200:
+        raise HTTPException(status_code=401, detail="Session expired. Please log in again.")
+    return _auth_response(r.json())
 
 @router.get("/me")
 async def me(request: Request):
@@ -219,13 +200,21 @@ async def me(request: Request):
 
     token = auth_header.split(" ", 1)[1]
     try:
-        result = supabase.auth.get_user(token)
-        user = result.user
-        return {
-            "id": user.id,
-            "email": user.email,
-            "full_name": user.user_metadata.get("full_name", ""),
-            "created_at": user.created_at.isoformat() if user.created_at else None,
-        }
-    except Exception:
+        r = await supabase_async.request(
+            "GET",
+            "/auth/v1/user",
+            headers={"apikey": _SUPABASE_KEY, "Authorization": f"Bearer {token}"},
+        )
+    except PostgrestError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if r.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    user = r.json()
+    metadata = user.get("user_metadata") or {}
+    return {
+        "id": user.get("id", ""),
+        "email": user.get("email", ""),
+        "full_name": metadata.get("full_name", ""),
+        "created_at": user.get("created_at"),
+    }
@@ -1,31 +1,135 @@
-from fastapi import APIRouter, HTTPException
-from app.db import supabase
-from datetime import date
+import asyncio
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.cache import shared_cache
+from app.conditional import CACHE_CONTROL, if_none_match, not_modified, payload_etag
+from app.config import settings
+from app.db import supabase_async, PostgrestError
+from app.rollup import daily_totals
 
 router = APIRouter(tags=["Dashboard"])
 
-@router.get("/stats")
-def get_dashboard_stats():
-    try:
+CountMethod = Literal["exact", "planned", "estimated"]
+
+# One snapshot per (count method, day), shared by every dashboard opened within the TTL
+stats_cache = shared_cache(
+    "dashboard_stats", ("employees", "attendance", "leave_requests"),
+    ttl=settings.DASHBOARD_STATS_TTL, max_entries=8,
+)
+
+overview_cache = shared_cache(
+    "dashboard_overview",
+    ("employees", "departments", "companies", "job_openings", "leave_requests", "attendance"),
+    ttl=settings.DASHBOARD_OVERVIEW_TTL, max_entries=4,
+)
+
+# Days of attendance history in /overview, today included
+ATTENDANCE_DAYS = 30
+
+
+async def load_stats(method: CountMethod, today: str) -> dict:
+    # Count-only HEAD requests, all in flight at once; no rows cross the wire
+    emp_count, active_count, present_days, on_leave_count = await asyncio.gather(
         # Total Employees
-        emp_count = supabase.table("employees").select("*", count="exact").execute().count
-        
+        supabase_async.count("employees", method=method),
         # Active Employees
-        active_count = supabase.table("employees").select("*", count="exact").eq("status", "Active").execute().count
-
-        # Present Today
-        present_count = supabase.table("attendance").select("*", count="exact").eq("attendance_date", str(date.today())).execute().count
-
-        # On Leave Today (Pending or Approved requests covering today)
-        today = str(date.today())
-        # Supabase filter for range overlap is a bit complex, let's just get approved leaves that start <= today and end >= today
-        on_leave_count = supabase.table("leave_requests").select("*", count="exact").eq("status", "Approved").lte("from_date", today).gte("to_date", today).execute().count
-
-        return {
-            "total_employees": emp_count,
-            "active_employees": active_count,
-            "present_today": present_count,
-            "on_leave_today": on_leave_count
-        }
+        supabase_async.count("employees", {"status": "eq.Active"}, method=method),
+        # Present Today, from the daily rollup rather than the attendance table
+        daily_totals(date.fromisoformat(today), date.fromisoformat(today)),
+        # On Leave Today: approved requests whose range covers today
+        supabase_async.count(
+            "leave_requests",
+            [("status", "eq.Approved"), ("from_date", f"lte.{today}"), ("to_date", f"gte.{today}")],
+            method=method,
+        ),
+    )
+    return {
+        "total_employees": emp_count,
+        "active_employees": active_count,
+        "present_today": present_days[0]["present"],
+        "on_leave_today": on_leave_count,
+    }
+
+
+@router.get("/stats")
+async def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    count: Optional[CountMethod] = Query(
+        None, description="exact (default), planned (query planner estimate) or estimated (exact up to db-max-rows)",
+    ),
+):
+    method = count or settings.DASHBOARD_COUNT_METHOD
+    today = str(date.today())
+    try:
+        stats = await stats_cache.get_or_load((method, today), lambda: load_stats(method, today))
+    except PostgrestError as e:
+        raise HTTPException(status_code=500, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    etag = payload_etag(stats)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    response.headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return stats
+
+
+async def group_counts() -> Dict[str, Counter]:
+    """Headcount and open roles per dept_id, leave requests per status; grouped by the database."""
+    groups = await supabase_async.rpc("dashboard_group_counts")
+    return {name: Counter(dict(pairs)) for name, pairs in groups.items()}
+
+
+def by_department(counts: Counter, names: Dict[Any, str]) -> List[Dict[str, Any]]:
+    return [
+        {"dept_id": dept_id, "name": names.get(dept_id, "Unassigned" if dept_id is None else f"Dept {dept_id}"), "count": n}
+        for dept_id, n in counts.most_common()
+    ]
+
+
+async def load_overview(today: date) -> dict:
+    since = today - timedelta(days=ATTENDANCE_DAYS - 1)
+    departments, company_count, groups, attendance = await asyncio.gather(
+        supabase_async.select("departments", {"select": "dept_id,name"}),
+        supabase_async.count("companies"),
+        group_counts(),
+        daily_totals(since, today),
+    )
+    headcount, openings, leave_status = groups["headcount"], groups["open_roles"], groups["leave_status"]
+    names = {row["dept_id"]: row["name"] for row in departments[0]}
+
+    return {
+        "totals": {
+            "employees": sum(headcount.values()),
+            "departments": len(names),
+            "companies": company_count,
+            "open_roles": sum(openings.values()),
+            "pending_leaves": leave_status.get("PENDING", 0),
+        },
+        "headcount_by_department": by_department(headcount, names),
+        "open_roles_by_department": by_department(openings, names),
+        "leave_status": {status or "UNKNOWN": n for status, n in leave_status.most_common()},
+        "attendance": attendance,
+    }
+
+
+@router.get("/overview")
+async def get_dashboard_overview(request: Request, response: Response):
+    """Everything the dashboard page draws, aggregated here instead of in the browser."""
+    today = date.today()
+    try:
+        overview = await overview_cache.get_or_load(today, lambda: load_overview(today))
+    except PostgrestError as e:
+        raise HTTPException(status_code=500, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    etag = payload_etag(overview)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    response.headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return overview
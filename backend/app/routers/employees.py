@@ -1,17 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
+from app.cache import invalidate
 from app.db import supabase
 from app.models.employees import EmployeeCreate, EmployeeUpdate, EmployeeResponse
 from typing import List
 
 router = APIRouter(tags=["Employees"])
 
-@router.get("", response_model=List[dict])
-def get_employees():
-    try:
-        response = supabase.table("employees").select("*").execute()
-        return response.data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+# GET "" is served by the flat create_crud_router("employees") list (paging, ?fields=)
 
 @router.post("", response_model=dict)
 def create_employee(employee: EmployeeCreate):
@@ -23,8 +18,11 @@ def create_employee(employee: EmployeeCreate):
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        invalidate("employees")
 
-@router.get("/{emp_id}", response_model=dict)
+# Typed so the flat CRUD router's /export (app/main.py) is not taken for an emp_id
+@router.get("/{emp_id:int}", response_model=dict)
 def get_employee(emp_id: int):
     try:
         # Using 'id' as per schema
@@ -35,7 +33,7 @@ def get_employee(emp_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.put("/{emp_id}", response_model=dict)
+@router.put("/{emp_id:int}", response_model=dict)
 def update_employee(emp_id: int, employee: EmployeeUpdate):
     try:
         update_data = employee.model_dump(exclude_unset=True)
@@ -45,8 +43,10 @@ def update_employee(emp_id: int, employee: EmployeeUpdate):
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        invalidate("employees")
 
-@router.delete("/{emp_id}")
+@router.delete("/{emp_id:int}")
 def delete_employee(emp_id: int):
     try:
         response = supabase.table("employees").delete().eq("id", emp_id).execute()
@@ -54,3 +54,5 @@ def delete_employee(emp_id: int):
         return {"message": "Employee deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        invalidate("employees")
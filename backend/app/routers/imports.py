@@ -0,0 +1,49 @@
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.bulk import conflict_target
+from app.importer import RESOURCES, check_header, create_job, get_job, read_header, run_import, spool_upload
+from app.query import QueryError
+from app.schema import UNIQUE_KEYS
+from typing import Literal, Optional
+import os
+
+router = APIRouter(tags=["Import"])
+
+@router.post("/{resource}", status_code=202)
+async def start_import(
+    resource: Literal["employees", "contacts", "addresses", "bank_details", "salary_structure"],
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: Optional[Literal["csv", "xlsx"]] = None,
+    on_conflict: Optional[str] = None,
+):
+    """
+    Upload a CSV / XLSX file (multipart field with a filename, or a raw body) whose header
+    names the table's columns. Rows carrying the pk (or ?on_conflict= unique key) are
+    updated, the rest inserted; a blank cell leaves that column of an updated row as it is.
+    Returns a job to poll at /api/import/jobs/{job_id}.
+    """
+    table, pk, model = RESOURCES[resource]
+    try:
+        target = conflict_target(on_conflict, pk, UNIQUE_KEYS.get(table, []))
+        path, fmt = await spool_upload(request, format)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        check_header(await run_in_threadpool(read_header, path, fmt), model)
+    except Exception as e:
+        os.unlink(path)
+        detail = str(e) if isinstance(e, QueryError) else f"Unreadable {fmt} file: {e}"
+        raise HTTPException(status_code=400, detail=detail)
+
+    job = create_job(resource, fmt)
+    background_tasks.add_task(run_import, job, path, target)
+    return {"job_id": job["job_id"], "status": job["status"], "status_url": f"/api/import/jobs/{job['job_id']}"}
+
+@router.get("/jobs/{job_id}")
+async def import_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
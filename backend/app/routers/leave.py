@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from app.cache import invalidate
 from app.db import supabase
 from app.models.leave import LeaveRequestCreate, LeaveRequestUpdate
 from typing import List
@@ -19,6 +20,8 @@ def apply_leave(leave: LeaveRequestCreate):
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        invalidate("leave_requests")
 
 @router.get("/{emp_id}", response_model=List[dict])
 def get_leave_history(emp_id: int):
@@ -35,6 +38,8 @@ def update_leave_status(request_id: int, update: LeaveRequestUpdate):
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        invalidate("leave_requests")
 
 @router.get("/balances/{emp_id}", response_model=List[dict])
 def get_leave_balances(emp_id: int):
@@ -1,11 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from app.db import supabase
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from app.conditional import RangeNotSatisfiable, byte_range, if_none_match, not_modified, strong_etag
+from app.crud import upstream_http_error
+from app.db import supabase, supabase_async, PostgrestError
 from app.models.payroll import PayrollCreate, PayrollResponse
-from typing import List
+from app.payroll_engine import PayrollError, execute_run, load_cycle, progress, reopen_run, start_run
+from app.payslip_docs import archive_entries, current_file, get_job, latest_run, queue_job
+from app.zipstream import StoredZip
+from typing import List, Optional
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse
 
 router = APIRouter(prefix="/payroll", tags=["Payroll"])
 
+
+async def finish_run(run: dict) -> None:
+    try:
+        await execute_run(run)
+    except Exception:
+        # Already logged and recorded on the run as FAILED
+        pass
+
 @router.get("/", response_model=List[dict])
 def get_payroll(employee_id: int = None):
     try:
@@ -17,13 +33,122 @@ def get_payroll(employee_id: int = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Stub for report generation
-@router.post("/generate-report")
-def generate_report(employee_id: int):
-    # In a real app, generate PDF here
-    return {"message": "Report generated successfully", "download_url": "#"}
+@router.post("/generate-report", status_code=202)
+async def generate_report(cycle_id: int, employee_id: Optional[int] = None):
+    """
+    Queue PDF rendering of a cycle's payslips (its latest completed run), or only
+    employee_id's. Rendering happens in worker processes; unchanged payslips are
+    served from the cache. Poll GET /reports/{job_id} for progress and links.
+    """
+    try:
+        await load_cycle(cycle_id)
+        run = await latest_run(cycle_id)
+    except PayrollError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+    job = queue_job(cycle_id, run["run_id"], employee_id)
+    return {
+        "job_id": job["job_id"], "status": job["status"], "run_id": run["run_id"],
+        "status_url": f"/api/payroll/payroll/reports/{job['job_id']}",
+    }
+
+@router.get("/reports/{job_id}")
+async def report_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Payslip job not found")
+    return job
+
+@router.get("/payslips/{cycle_id}/{employee_id}")
+async def download_payslip(cycle_id: int, employee_id: int):
+    path = current_file(cycle_id, employee_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Payslip not rendered; POST /generate-report first")
+    return FileResponse(path, media_type="application/pdf", filename=f"payslip-{cycle_id}-{employee_id}.pdf")
 
 @router.post("/submit-proofs")
 def submit_proofs(employee_id: int):
     # In a real app, handle file uploads here
     return {"message": "Investment proofs submitted successfully"}
+
+@router.post("/runs", status_code=202)
+async def start_payroll_run(cycle_id: int, background_tasks: BackgroundTasks):
+    """
+    Run payroll for a payroll_cycles month: every active employee's payslip and
+    payroll_details lines are computed in one batch after the response. Poll
+    GET /runs/{run_id} until its status is COMPLETED or FAILED.
+    """
+    try:
+        run = await start_run(cycle_id)
+    except PayrollError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+    background_tasks.add_task(finish_run, run)
+    return {**run, "status_url": f"/api/payroll/payroll/runs/{run['run_id']}"}
+
+@router.post("/runs/{run_id}/recompute")
+async def recompute_payroll_run(run_id: int):
+    """
+    Bring a finished run up to date after late corrections (attendance, leave,
+    bonuses, ...): only payslips whose inputs changed are rewritten, and the
+    response lists what moved.
+    """
+    try:
+        run = await reopen_run(run_id)
+        return await execute_run(run, incremental=True)
+    except PayrollError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+
+@router.get("/runs/{run_id}")
+async def get_payroll_run(run_id: int):
+    try:
+        rows, _ = await supabase_async.select("payroll_runs", {"run_id": f"eq.{run_id}"})
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    # Per-shard stage while this worker executes the run (and for a while after)
+    shards = progress.get(run_id)
+    return {**rows[0], "shards": shards} if shards is not None else rows[0]
+
+@router.get("/cycles/{cycle_id}/payslips.zip")
+async def download_cycle_payslips(cycle_id: int, request: Request):
+    """
+    Every rendered payslip of the cycle in one ZIP, streamed from the files as it is
+    sent. Supports Range / If-Range, so an interrupted download resumes where it stopped.
+    """
+    try:
+        cycle = await load_cycle(cycle_id)
+    except PayrollError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PostgrestError as e:
+        raise upstream_http_error(e)
+    entries = await run_in_threadpool(archive_entries, cycle_id)
+    if not entries:
+        raise HTTPException(status_code=404, detail="No rendered payslips for this cycle; POST /generate-report first")
+    archive = StoredZip(entries)
+    etag = strong_etag("payslips.zip", cycle_id, archive.fingerprint)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="payslips-{cycle.start:%Y-%m}.zip"',
+    }
+    if if_none_match(request, etag):
+        return not_modified(etag, **{"Accept-Ranges": "bytes"})
+    try:
+        requested = byte_range(request, archive.size, etag)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{archive.size}"})
+    first, last = requested or (0, archive.size - 1)
+    headers["Content-Length"] = str(last - first + 1)
+    if requested is not None:
+        headers["Content-Range"] = f"bytes {first}-{last}/{archive.size}"
+    # A sync iterator: StreamingResponse reads the files in the threadpool, a chunk at a time
+    return StreamingResponse(
+        archive.iter_range(first, last), status_code=206 if requested else 200,
+        media_type="application/zip", headers=headers,
+    )
@@ -0,0 +1,193 @@
+"""
+Column registry for the tables exposed through the generic CRUD routers.
+
+Mirrors db/master_setup.sql (plus the columns db/schema_expansion.sql adds)
+and is used to whitelist client-supplied column names before they are
+pushed down to PostgREST. Types are coarse: int, numeric, text, uuid,
+date, time, timestamp.
+"""
+
+from typing import Dict, List, Tuple
+
+TABLES: Dict[str, Dict[str, str]] = {
+    # Organization
+    "companies": {
+        "company_id": "int", "name": "text", "registration_no": "text",
+        "timezone": "text", "created_at": "timestamp",
+    },
+    "branches": {
+        "branch_id": "int", "company_id": "int", "name": "text",
+        "location": "text", "created_at": "timestamp",
+    },
+    "departments": {
+        "dept_id": "int", "branch_id": "int", "name": "text", "created_at": "timestamp",
+    },
+    "designations": {
+        "designation_id": "int", "title": "text", "level": "int",
+        "grade": "text", "created_at": "timestamp",
+    },
+    "employment_types": {
+        "emp_type_id": "int", "type_name": "text", "created_at": "timestamp",
+    },
+    "work_locations": {
+        "location_id": "int", "location_type": "text", "created_at": "timestamp",
+    },
+    "shifts": {
+        "shift_id": "int", "start_time": "time", "end_time": "time", "created_at": "timestamp",
+    },
+    # Employees
+    "employees": {
+        "id": "int", "emp_id": "int", "company_id": "int", "dept_id": "int",
+        "designation_id": "int", "emp_type_id": "int", "manager_id": "int",
+        "first_name": "text", "last_name": "text", "email": "text",
+        "join_date": "date", "status": "text", "created_at": "timestamp",
+    },
+    "personal_details": {
+        "emp_id": "int", "dob": "date", "gender": "text",
+        "marital_status": "text", "created_at": "timestamp",
+    },
+    "contacts": {
+        "contact_id": "int", "emp_id": "int", "phone": "text",
+        "email": "text", "created_at": "timestamp",
+    },
+    "addresses": {
+        "address_id": "int", "emp_id": "int", "address_type": "text",
+        "address": "text", "created_at": "timestamp",
+    },
+    "documents": {
+        "doc_id": "int", "emp_id": "int", "doc_type": "text",
+        "file_path": "text", "created_at": "timestamp",
+    },
+    "bank_details": {
+        "bank_id": "int", "emp_id": "int", "account_no": "text",
+        "ifsc": "text", "created_at": "timestamp",
+    },
+    "salary_structure": {
+        "salary_id": "int", "emp_id": "int", "basic": "numeric", "hra": "numeric",
+        "allowances": "numeric", "created_at": "timestamp",
+    },
+    "status_history": {
+        "status_id": "int", "emp_id": "int", "status": "text", "changed_at": "timestamp",
+    },
+    # Attendance & Leave
+    "attendance": {
+        "attendance_id": "int", "emp_id": "int", "attendance_date": "date",
+        "check_in": "timestamp", "check_out": "timestamp", "status": "text",
+        "worked_hours": "numeric", "created_at": "timestamp",
+    },
+    "attendance_logs": {
+        "log_id": "int", "emp_id": "int", "log_time": "timestamp", "punch_id": "uuid", "created_at": "timestamp",
+    },
+    "leave_types": {
+        "leave_type_id": "int", "name": "text", "description": "text", "created_at": "timestamp",
+    },
+    "leave_balances": {
+        "balance_id": "int", "emp_id": "int", "leave_type_id": "int", "balance": "int",
+    },
+    "leave_requests": {
+        "request_id": "int", "emp_id": "int", "leave_type_id": "int",
+        "from_date": "date", "to_date": "date", "status": "text",
+        "reason": "text", "created_at": "timestamp",
+    },
+    "leave_approvals": {
+        "approval_id": "int", "request_id": "int", "manager_id": "int", "approved_at": "timestamp",
+    },
+    "holidays": {
+        "holiday_id": "int", "company_id": "int", "holiday_date": "date",
+        "name": "text", "created_at": "timestamp",
+    },
+    # Recruitment
+    "job_openings": {
+        "job_id": "int", "dept_id": "int", "title": "text", "created_at": "timestamp",
+    },
+    "candidates": {
+        "candidate_id": "int", "id": "uuid", "name": "text", "full_name": "text",
+        "email": "text", "role": "text", "status": "text", "rating": "int",
+        "resume_url": "text", "created_at": "timestamp",
+    },
+    "applications": {
+        "application_id": "int", "candidate_id": "int", "job_id": "int",
+        "status": "text", "created_at": "timestamp",
+    },
+    "interviews": {
+        "interview_id": "int", "application_id": "int", "interview_date": "timestamp",
+        "result": "text", "created_at": "timestamp",
+    },
+    "offers": {
+        "offer_id": "int", "application_id": "int", "salary": "numeric",
+        "status": "text", "created_at": "timestamp",
+    },
+    # Performance & Finance
+    "performance_cycles": {
+        "cycle_id": "int", "year": "int", "created_at": "timestamp",
+    },
+    "goals": {
+        "goal_id": "int", "emp_id": "int", "description": "text", "created_at": "timestamp",
+    },
+    "reviews": {
+        "review_id": "int", "emp_id": "int", "cycle_id": "int", "created_at": "timestamp",
+    },
+    "ratings": {
+        "rating_id": "int", "review_id": "int", "score": "int", "created_at": "timestamp",
+    },
+    "feedback": {
+        "feedback_id": "int", "from_emp": "int", "to_emp": "int",
+        "comments": "text", "created_at": "timestamp",
+    },
+    "expenses": {
+        "id": "uuid", "employee_id": "int", "category": "text", "description": "text",
+        "amount": "numeric", "receipt_url": "text", "status": "text",
+        "claim_date": "date", "created_at": "timestamp",
+    },
+    # Training & Assets
+    "training_programs": {
+        "training_id": "int", "title": "text", "created_at": "timestamp",
+    },
+    "enrollments": {
+        "enrollment_id": "int", "emp_id": "int", "training_id": "int", "created_at": "timestamp",
+    },
+    "certifications": {
+        "cert_id": "int", "emp_id": "int", "name": "text", "created_at": "timestamp",
+    },
+    "assets": {
+        "asset_id": "int", "name": "text", "created_at": "timestamp",
+    },
+    "asset_allocations": {
+        "allocation_id": "int", "emp_id": "int", "asset_id": "int",
+        "allocated_at": "timestamp", "created_at": "timestamp",
+    },
+    # Access & Roles
+    "system_roles": {
+        "role_id": "int", "role_name": "text", "created_at": "timestamp",
+    },
+    "permissions": {
+        "permission_id": "int", "permission_name": "text", "created_at": "timestamp",
+    },
+    "role_permissions": {
+        "role_id": "int", "permission_id": "int",
+    },
+    "user_accounts": {
+        "user_id": "int", "emp_id": "int", "role_id": "int", "username": "text",
+        "password_hash": "text", "created_at": "timestamp",
+    },
+}
+
+# UNIQUE constraints besides the primary key, usable as upsert conflict targets
+UNIQUE_KEYS: Dict[str, List[Tuple[str, ...]]] = {
+    "employees": [("emp_id",), ("email",)],
+    "attendance": [("emp_id", "attendance_date")],
+    "attendance_logs": [("punch_id",), ("emp_id", "log_time")],
+    "leave_balances": [("emp_id", "leave_type_id")],
+    "candidates": [("email",)],
+    "system_roles": [("role_name",)],
+    "permissions": [("permission_name",)],
+    "role_permissions": [("role_id", "permission_id")],
+    "user_accounts": [("username",)],
+}
+
+# Text columns never matched by the generic ?q= search
+SEARCH_EXCLUDED = {"password_hash"}
+
+
+def text_columns(columns: Dict[str, str]) -> List[str]:
+    return [c for c, kind in columns.items() if kind == "text" and c not in SEARCH_EXCLUDED]
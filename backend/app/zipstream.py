@@ -0,0 +1,154 @@
+"""
+ZIP archives of files on disk, streamed from any byte offset.
+
+Entries are stored, not deflated (payslip PDFs are compressed already), and
+each entry's size and CRC-32 are known from file metadata, so the archive's
+whole layout (its length and every header's offset) is fixed before the
+first byte is sent. Any byte range is then produced directly from the
+files: a resumed download starts reading at its offset instead of
+regenerating the archive, and at most ``CHUNK_SIZE`` bytes are held at a
+time; nothing is built in memory or on disk. ZIP64 records are written
+when there are more than 65535 entries or offsets pass 4 GiB.
+"""
+
+import hashlib
+import struct
+import time
+from bisect import bisect_right
+from typing import Iterator, List, NamedTuple, Union
+
+CHUNK_SIZE = 256 * 1024
+
+UTF8_NAMES = 0x0800
+VERSION = 20
+VERSION_ZIP64 = 45
+U16_MAX = 0xFFFF
+U32_MAX = 0xFFFFFFFF
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+ZIP64_OFFSET = struct.Struct("<HHQ")
+ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+ZIP64_LOCATOR = struct.Struct("<IIQI")
+END = struct.Struct("<IHHHHIIH")
+
+
+class ZipEntry(NamedTuple):
+    name: str
+    path: str
+    size: int
+    crc: int
+    mtime: float
+
+
+def _dos_time(mtime: float) -> tuple:
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+class StoredZip:
+    """Layout of a stored (uncompressed) ZIP of ``entries``, whose bytes ``iter_range`` produces."""
+
+    def __init__(self, entries: List[ZipEntry]):
+        self.entries = entries
+        self.names = [e.name.encode() for e in entries]
+        self.offsets: List[int] = []
+        digest = hashlib.blake2b(digest_size=16)
+        position = 0
+        for entry, name in zip(entries, self.names):
+            self.offsets.append(position)
+            position += LOCAL_HEADER.size + len(name) + entry.size
+            digest.update(b"%s\x1f%d\x1f%d\x1e" % (name, entry.size, entry.crc))
+        self.central_offset = position
+        self.central_offsets: List[int] = []
+        for offset, name in zip(self.offsets, self.names):
+            self.central_offsets.append(position)
+            position += CENTRAL_HEADER.size + len(name) + (ZIP64_OFFSET.size if offset > U32_MAX else 0)
+        self.central_size = position - self.central_offset
+        self.zip64 = len(entries) > U16_MAX or position > U32_MAX
+        self.size = position + END.size + (ZIP64_END.size + ZIP64_LOCATOR.size if self.zip64 else 0)
+        # Changes whenever an entry's name, size or content does
+        self.fingerprint = digest.hexdigest()
+
+    def _local_header(self, i: int) -> bytes:
+        entry, name = self.entries[i], self.names[i]
+        dos_time, dos_date = _dos_time(entry.mtime)
+        return LOCAL_HEADER.pack(
+            0x04034B50, VERSION, UTF8_NAMES, 0, dos_time, dos_date, entry.crc, entry.size, entry.size, len(name), 0,
+        ) + name
+
+    def _central_header(self, i: int) -> bytes:
+        entry, name, offset = self.entries[i], self.names[i], self.offsets[i]
+        dos_time, dos_date = _dos_time(entry.mtime)
+        extra = ZIP64_OFFSET.pack(0x0001, 8, offset) if offset > U32_MAX else b""
+        return CENTRAL_HEADER.pack(
+            0x02014B50, VERSION_ZIP64 if extra else VERSION, VERSION_ZIP64 if extra else VERSION, UTF8_NAMES, 0,
+            dos_time, dos_date, entry.crc, entry.size, entry.size, len(name), len(extra), 0, 0, 0, 0,
+            min(offset, U32_MAX),
+        ) + name + extra
+
+    def _end(self) -> bytes:
+        count, end = len(self.entries), b""
+        if self.zip64:
+            zip64_end = self.central_offset + self.central_size
+            end += ZIP64_END.pack(
+                0x06064B50, ZIP64_END.size - 12, VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, self.central_size, self.central_offset,
+            )
+            end += ZIP64_LOCATOR.pack(0x07064B50, 0, zip64_end, 1)
+        return end + END.pack(
+            0x06054B50, 0, 0, min(count, U16_MAX), min(count, U16_MAX),
+            min(self.central_size, U32_MAX), min(self.central_offset, U32_MAX), 0,
+        )
+
+    def _pieces(self, first: int, first_central: int) -> Iterator[Union[bytes, ZipEntry]]:
+        """
+        Headers as bytes and entries (their file data) in archive order, from local entry
+        ``first`` and central directory record ``first_central`` on.
+        """
+        for i in range(first, len(self.entries)):
+            yield self._local_header(i)
+            yield self.entries[i]
+        for i in range(first_central, len(self.entries)):
+            yield self._central_header(i)
+        yield self._end()
+
+    def iter_range(self, start: int, end: int) -> Iterator[bytes]:
+        """Bytes ``start..end`` (inclusive) of the archive, in chunks of about ``CHUNK_SIZE``."""
+        # Start at the piece holding ``start``: a resumed download skips straight to it
+        if start < self.central_offset:
+            first, first_central = bisect_right(self.offsets, start) - 1, 0
+            position = self.offsets[first]
+        else:
+            first, first_central = len(self.entries), max(bisect_right(self.central_offsets, start) - 1, 0)
+            position = self.central_offsets[first_central] if self.entries else self.central_offset
+        buffer = bytearray()
+        for piece in self._pieces(first, first_central):
+            if position > end:
+                break
+            length = len(piece) if isinstance(piece, bytes) else piece.size
+            if position + length > start:
+                low, high = max(start - position, 0), min(end + 1 - position, length)
+                if isinstance(piece, bytes):
+                    buffer += piece[low:high]
+                else:
+                    with open(piece.path, "rb") as f:
+                        f.seek(low)
+                        remaining = high - low
+                        while remaining:
+                            data = f.read(min(remaining, CHUNK_SIZE))
+                            if not data:
+                                # Replaced or truncated since the layout was computed: the client must restart
+                                raise OSError(f"{piece.path} changed while streaming")
+                            buffer += data
+                            remaining -= len(data)
+                            if len(buffer) >= CHUNK_SIZE:
+                                yield bytes(buffer)
+                                buffer.clear()
+            position += length
+            if len(buffer) >= CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
@@ -0,0 +1,47 @@
+"""
+Rebuild attendance_daily_rollup from the attendance table (db/attendance_rollup.sql
+must be applied first). Without dates the whole history is recounted.
+
+    python backfill_attendance_rollup.py
+    python backfill_attendance_rollup.py --from 2026-01-01 --to 2026-03-31
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from app.db import supabase_async
+from app.rollup import attendance_bounds, rebuild
+
+
+async def backfill(start, end):
+    try:
+        if start is None or end is None:
+            bounds = await attendance_bounds()
+            if bounds is None:
+                print("attendance is empty; nothing to backfill")
+                return
+            start, end = start or bounds[0], end or bounds[1]
+        started = time.perf_counter()
+        summary = await rebuild(start, end)
+        print(
+            f"Rebuilt {start} .. {end}: {summary['days']} days, {summary['rows']} rollup rows "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+    finally:
+        await supabase_async.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (default: earliest attendance)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day (default: latest attendance)")
+    args = parser.parse_args()
+    if args.start and args.end and args.start > args.end:
+        parser.error("--from must not be after --to")
+    asyncio.run(backfill(args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
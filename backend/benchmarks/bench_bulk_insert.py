@@ -0,0 +1,68 @@
+"""
+Bulk-insert throughput (rows/sec) through POST /{prefix}/bulk at several batch
+sizes, compared with one POST per row.
+
+    python benchmarks/fake_postgrest.py --latency 0.02 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_bulk_insert.py http://127.0.0.1:8000/api/holidays --rows 2000
+
+Against a real database, point the API at a scratch project: the rows are
+really inserted.
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+import httpx
+
+
+def synthetic_holidays(count: int):
+    start = date(2026, 1, 1)
+    return [
+        {"name": f"Bench holiday {i}", "holiday_date": str(start + timedelta(days=i % 365))}
+        for i in range(count)
+    ]
+
+
+async def per_row(client: httpx.AsyncClient, url: str, rows, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(row):
+        async with semaphore:
+            (await client.post(url, json=row)).raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(row) for row in rows))
+    return time.perf_counter() - started
+
+
+async def bulk(client: httpx.AsyncClient, url: str, rows, batch_size: int) -> float:
+    started = time.perf_counter()
+    response = await client.post(f"{url}/bulk", params={"batch_size": batch_size, "returning": "minimal"}, json=rows)
+    response.raise_for_status()
+    summary = response.json()
+    if summary["failed"]:
+        raise SystemExit(f"{summary['failed']} rows failed, e.g. {next(r for r in summary['results'] if r['status'] == 'error')}")
+    return time.perf_counter() - started
+
+
+async def main(url: str, count: int, batch_sizes, concurrency: int):
+    rows = synthetic_holidays(count)
+    async with httpx.AsyncClient(timeout=300) as client:
+        elapsed = await per_row(client, url, rows, concurrency)
+        print(f"one POST per row ({concurrency} concurrent): {count / elapsed:8.0f} rows/s")
+        for size in batch_sizes:
+            elapsed = await bulk(client, url, rows, size)
+            print(f"bulk, batch_size={size:<5}: {count / elapsed:8.0f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="CRUD collection URL, e.g. http://127.0.0.1:8000/api/holidays")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="50,200,500,1000,2000")
+    parser.add_argument("--concurrency", type=int, default=10, help="clients for the per-row baseline")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.rows, [int(b) for b in args.batch_sizes.split(",")], args.concurrency))
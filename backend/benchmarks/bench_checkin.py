@@ -0,0 +1,101 @@
+"""
+Shift-start burst: --checkins distinct employees punch in within --window
+seconds, plus --duplicates repeated punches that must be refused. Open loop:
+every request leaves at its scheduled (Poisson) arrival time whether or not
+earlier ones have finished, so a slow handler shows up as queueing in p99
+instead of as a lower request rate.
+
+    python benchmarks/fake_postgrest.py --latency 0.02 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_checkin.py http://127.0.0.1:8000 --checkins 5000 --window 60
+
+The fake keeps the punches in memory: restart it before running the same
+command against a checkout of the previous revision for the "before" numbers.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from datetime import date
+
+import httpx
+
+from bench_concurrency import percentile
+
+
+def arrivals(count: int, window: float, seed: int):
+    """``count`` Poisson arrival offsets scaled to end at ``window`` seconds."""
+    rng = random.Random(seed)
+    offsets, t = [], 0.0
+    for _ in range(count):
+        t += rng.expovariate(1.0)
+        offsets.append(t)
+    scale = window / offsets[-1] if offsets else 0
+    return [offset * scale for offset in offsets]
+
+
+async def run(base_url: str, checkins: int, duplicates: int, window: float, first_emp: int, seed: int):
+    today = str(date.today())
+    punches = [first_emp + i for i in range(checkins)]
+    rng = random.Random(seed)
+    punches += [rng.choice(punches) for _ in range(duplicates)] if punches else []
+    rng.shuffle(punches)
+    schedule = arrivals(len(punches), window, seed)
+
+    latencies = {"first": [], "duplicate": []}
+    statuses = Counter()
+    seen = set()
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def punch(emp_id: int, at: float, started: float):
+            kind = "duplicate" if emp_id in seen else "first"
+            seen.add(emp_id)
+            await asyncio.sleep(max(0.0, started + at - time.perf_counter()))
+            sent = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/attendance/check-in",
+                    json={"emp_id": emp_id, "attendance_date": today, "check_in": f"{today}T09:00:00+00:00"},
+                )
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies[kind].append(time.perf_counter() - sent)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(punch(emp_id, at, started) for emp_id, at in zip(punches, schedule)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_url", help="API root, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--checkins", type=int, default=5000, help="distinct employees punching in")
+    parser.add_argument("--duplicates", type=int, default=250, help="extra punches by employees already in")
+    parser.add_argument("--window", type=float, default=60.0, help="seconds the burst is spread over")
+    parser.add_argument("--first-emp", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    latencies, statuses, elapsed = asyncio.run(
+        run(args.base_url, args.checkins, args.duplicates, args.window, args.first_emp, args.seed)
+    )
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{total} punches in {elapsed:.1f}s ({total / elapsed:.0f}/s offered over {args.window:.0f}s)")
+    print("status codes: " + ", ".join(f"{code}={n}" for code, n in sorted(statuses.items(), key=str)))
+    for kind, samples in latencies.items():
+        if samples:
+            print(
+                f"  {kind:<10} n={len(samples):<6} p50={percentile(samples, 50) * 1000:7.1f} ms"
+                f"  p95={percentile(samples, 95) * 1000:7.1f} ms  p99={percentile(samples, 99) * 1000:7.1f} ms"
+                f"  max={max(samples) * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Closed-loop load generator: N concurrent clients hammer one URL for a fixed
+duration and report requests/sec and latency percentiles.
+
+Before/after comparison of the CRUD data-access layer (one uvicorn worker
+each, both pointed at benchmarks/fake_postgrest.py):
+
+    python benchmarks/fake_postgrest.py --latency 0.05 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_concurrency.py http://127.0.0.1:8000/api/departments -c 50 -d 10
+
+Run the same command against a checkout of the previous revision to get the
+"before" number.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(url: str, concurrency: int, duration: float, method: str = "GET", json_body=None):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=json_body)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration))
+    print(
+        f"{args.concurrency} clients, {args.duration:.0f}s: {result['requests']} requests, "
+        f"{result['errors']} errors, {result['rps']:.1f} req/s, "
+        f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+    )
@@ -0,0 +1,150 @@
+"""
+Daily attendance derivation (app/derive.py) on a synthetic month of punches.
+
+In-process: --employees x --days of four punches (plus 2% double taps) spread
+over three time zones go through the vectorized group-by and, for
+comparison, a plain Python loop (per-punch local date, dict of lists per
+employee-day). Both results are checked to be identical.
+
+    python benchmarks/bench_derive.py --employees 10000 --days 30
+
+End to end: time POST /api/attendance/derive over a month against the fake,
+which serves the punches itself (one RPC per day, then batched upserts):
+
+    python benchmarks/fake_postgrest.py --latency 0.02 --log-employees 10000 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_derive.py --api http://127.0.0.1:8000 --month 2026-09
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.derive import EPOCH_DATE, HOUR, Punches, attendance_rows, daily_records, utc_offsets  # noqa: E402
+
+ZONES = [None, ZoneInfo("Asia/Kolkata"), ZoneInfo("America/New_York")]
+DEBOUNCE = 60.0
+
+
+def synthetic_punches(employees: int, start: date, days: int, seed: int):
+    """Four punches a local weekday per employee (8:00, 12:00, 13:00, 17:00 + up to 40 min), some double taps."""
+    rng = np.random.default_rng(seed)
+    zone_of_employee = np.arange(employees) % len(ZONES)
+    emp, epoch = [], []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        if day.weekday() >= 5:
+            continue
+        # Local midnight of this day in each zone, as UTC epoch
+        midnight = np.array([
+            datetime.combine(day, datetime.min.time(), zone or timezone.utc).timestamp() for zone in ZONES
+        ])[zone_of_employee]
+        for hour in (8, 12, 13, 17):
+            times = midnight + hour * HOUR + rng.integers(0, 2400, employees)
+            emp.append(np.arange(1, employees + 1))
+            epoch.append(times)
+            taps = rng.random(employees) < 0.02
+            emp.append(np.arange(1, employees + 1)[taps])
+            epoch.append(times[taps] + 5)
+    emp_id, epochs = np.concatenate(emp).astype(np.int64), np.concatenate(epoch).astype(np.float64)
+    shuffle = rng.permutation(len(epochs))
+    return Punches(emp_id[shuffle], epochs[shuffle]), zone_of_employee
+
+
+def vectorized(punches: Punches, zone_of_employee, start: date, end: date):
+    since = datetime.combine(start, datetime.min.time(), timezone.utc) - timedelta(hours=14)
+    until = datetime.combine(end + timedelta(days=1), datetime.min.time(), timezone.utc) + timedelta(hours=12)
+    first_hour = int(since.timestamp()) // HOUR
+    offsets = utc_offsets(ZONES, first_hour, int((until - since).total_seconds()) // HOUR + 2)
+    records = daily_records(
+        punches, zone_of_employee[punches.emp_id - 1], offsets, first_hour,
+        (start - EPOCH_DATE).days, (end - EPOCH_DATE).days, DEBOUNCE,
+    )
+    return attendance_rows(records)
+
+
+def python_loop(punches: Punches, zone_of_employee, start: date, end: date):
+    """The straightforward version: local date per punch, then one group at a time."""
+    groups = defaultdict(list)
+    for emp, moment in zip(punches.emp_id.tolist(), punches.epoch.tolist()):
+        zone = ZONES[zone_of_employee[emp - 1]] or timezone.utc
+        day = datetime.fromtimestamp(moment, zone).date()
+        if start <= day <= end:
+            groups[(emp, day)].append(moment)
+    rows = []
+    for (emp, day), times in sorted(groups.items()):
+        times.sort()
+        kept = [times[0]]
+        for previous, moment in zip(times, times[1:]):
+            if moment - previous > DEBOUNCE:
+                kept.append(moment)
+        worked = sum(kept[i] - kept[i - 1] for i in range(1, len(kept), 2))
+        stamp = lambda t: datetime.fromtimestamp(int(t), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        row = {"emp_id": emp, "attendance_date": str(day), "check_in": stamp(kept[0])}
+        if len(kept) > 1:
+            row.update(check_out=stamp(kept[-1]), worked_hours=round(worked / 36) / 100)
+        rows.append(row)
+    return rows
+
+
+def in_process(employees: int, days: int, seed: int):
+    start = date(2026, 9, 1)
+    end = start + timedelta(days=days - 1)
+    punches, zone_of_employee = synthetic_punches(employees, start, days, seed)
+    print(f"{len(punches.epoch):,} punches, {employees:,} employees, {days} days, {len(ZONES)} time zones")
+
+    started = time.perf_counter()
+    fast = vectorized(punches, zone_of_employee, start, end)
+    vector_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    slow = python_loop(punches, zone_of_employee, start, end)
+    loop_seconds = time.perf_counter() - started
+
+    key = lambda r: (r["emp_id"], r["attendance_date"])
+    same = sorted(fast, key=key) == slow
+    print(f"  vectorized:  {vector_seconds:6.2f}s  {len(fast):,} records")
+    print(f"  python loop: {loop_seconds:6.2f}s  {len(slow):,} records  ({loop_seconds / vector_seconds:.0f}x slower)")
+    print(f"  identical results: {same}")
+    if not same:
+        sys.exit(1)
+
+
+def end_to_end(api: str, month: str):
+    first = date.fromisoformat(f"{month}-01")
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    started = time.perf_counter()
+    response = httpx.post(f"{api.rstrip('/')}/api/attendance/derive",
+                          params={"from_date": str(first), "to_date": str(last)}, timeout=600)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    summary = response.json()
+    print(f"{first} .. {last}: {summary['punches']:,} punches -> {summary['records']:,} records "
+          f"({summary['employees']:,} employees), {summary['failed']} failed, {elapsed:.2f}s")
+    print("  stages: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in summary["seconds"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--api", help="API root: time POST /api/attendance/derive instead")
+    parser.add_argument("--month", default="2026-09", help="month derived with --api (YYYY-MM)")
+    args = parser.parse_args()
+    if args.api:
+        end_to_end(args.api, args.month)
+    else:
+        in_process(args.employees, args.days, args.seed)
+
+
+if __name__ == "__main__":
+    main()
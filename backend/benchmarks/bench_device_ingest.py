@@ -0,0 +1,125 @@
+"""
+Device log ingest throughput (punches/sec) through POST /api/attendance/device-logs.
+
+--devices concurrent devices each upload --uploads NDJSON bodies of --lines
+punches; --resend of every body's lines repeat punches the device already
+sent (the dedupe window should drop them). Bodies are generated before the
+clock starts. --baseline N also times N single-row POSTs to the generic
+/api/attendance-logs route for comparison.
+
+    python benchmarks/fake_postgrest.py --latency 0.02 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_device_ingest.py http://127.0.0.1:8000 --devices 8 --uploads 25 --lines 5000 \\
+        --upstream http://127.0.0.1:54321
+
+With --upstream (the fake) the rows it actually stored are counted afterwards.
+"""
+
+import argparse
+import asyncio
+import gzip
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import orjson
+
+from bench_concurrency import percentile
+
+
+def device_bodies(device: int, uploads: int, lines: int, resend: float, seed: int):
+    """NDJSON bodies for one device: fresh punches plus repeats of ones it already sent."""
+    rng = random.Random(seed * 1000 + device)
+    start = datetime(2026, 10, 19, 8, 0, tzinfo=timezone.utc)
+    sent, bodies = [], []
+    for upload in range(uploads):
+        fresh = lines - int(lines * resend) if sent else lines
+        punches = [
+            {"emp_id": rng.randint(1, 100_000),
+             "log_time": (start + timedelta(seconds=(upload * lines + i) * 0.5, microseconds=device)).isoformat(),
+             "device": f"gate-{device}"}
+            for i in range(fresh)
+        ]
+        punches += [rng.choice(sent) for _ in range(lines - fresh)]
+        sent.extend(punches[:fresh])
+        bodies.append(b"\n".join(orjson.dumps(p) for p in punches) + b"\n")
+    return bodies
+
+
+async def run_ingest(base_url: str, devices: int, uploads: int, lines: int, resend: float, compress: bool, seed: int):
+    bodies = [device_bodies(d, uploads, lines, resend, seed) for d in range(devices)]
+    headers = {"Content-Type": "application/x-ndjson"}
+    if compress:
+        bodies = [[gzip.compress(body, 1) for body in device] for device in bodies]
+        headers["Content-Encoding"] = "gzip"
+    latencies, statuses, totals = [], Counter(), Counter()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        async def device(uploads_for_device):
+            for body in uploads_for_device:
+                sent = time.perf_counter()
+                response = await client.post("/api/attendance/device-logs", content=body, headers=headers)
+                latencies.append(time.perf_counter() - sent)
+                statuses[response.status_code] += 1
+                if response.status_code in (200, 503):
+                    summary = response.json()
+                    totals.update({k: v for k, v in summary.items() if isinstance(v, int) and not isinstance(v, bool)})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(device(b) for b in bodies))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, totals, elapsed, sum(len(b) for d in bodies for b in d)
+
+
+async def run_baseline(base_url: str, count: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    start = datetime(2026, 10, 20, 8, 0, tzinfo=timezone.utc)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def post(i):
+            async with semaphore:
+                row = {"emp_id": i % 100_000 + 1, "log_time": (start + timedelta(seconds=i)).isoformat()}
+                (await client.post("/api/attendance-logs", json=row)).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(count)))
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_url", help="API root, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--devices", type=int, default=8)
+    parser.add_argument("--uploads", type=int, default=25, help="bodies per device")
+    parser.add_argument("--lines", type=int, default=5000, help="punches per body")
+    parser.add_argument("--resend", type=float, default=0.05, help="share of each body repeating earlier punches")
+    parser.add_argument("--gzip", action="store_true", help="send gzip-encoded bodies")
+    parser.add_argument("--baseline", type=int, default=0, help="also time this many single-row POSTs")
+    parser.add_argument("--upstream", help="fake PostgREST root; counts the rows it stored")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    latencies, statuses, totals, elapsed, size = asyncio.run(
+        run_ingest(args.base_url, args.devices, args.uploads, args.lines, args.resend, args.gzip, args.seed)
+    )
+    punches = args.devices * args.uploads * args.lines
+    print(f"{punches} punches in {len(latencies)} uploads ({size / 1e6:.1f} MB{' gzip' if args.gzip else ''}) "
+          f"in {elapsed:.2f}s -> {punches / elapsed:,.0f} punches/s")
+    print("status codes: " + ", ".join(f"{code}={n}" for code, n in sorted(statuses.items())))
+    print("server counts: " + ", ".join(f"{k}={totals[k]}" for k in
+                                         ("received", "accepted", "duplicates", "invalid", "rejected", "failed")))
+    print(f"  upload latency p50={percentile(latencies, 50) * 1000:.0f} ms  "
+          f"p99={percentile(latencies, 99) * 1000:.0f} ms  max={max(latencies) * 1000:.0f} ms")
+    if args.upstream:
+        stored = httpx.head(f"{args.upstream.rstrip('/')}/rest/v1/attendance_logs").headers.get("content-range")
+        print(f"rows stored upstream: {stored.split('/')[-1] if stored else '?'}")
+
+    if args.baseline:
+        seconds = asyncio.run(run_baseline(args.base_url, args.baseline, 50))
+        print(f"baseline: {args.baseline} single-row POSTs in {seconds:.2f}s -> {args.baseline / seconds:,.0f} punches/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Encode 10k synthetic `employees` rows the way a CRUD list response does:
+
+* fastapi: response_model=List[Dict[str, Any]] validation + jsonable_encoder +
+  JSONResponse (the previous path)
+* orjson:  ORJSONResponse on the upstream rows (the current path)
+
+and compress the resulting body with gzip / brotli at the levels used by
+app/compression.py.
+
+    python benchmarks/bench_encode.py --rows 10000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import brotli
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.compression import BROTLI_QUALITY, GZIP_LEVEL  # noqa: E402
+
+
+def synthetic_employees(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i, "emp_id": i, "company_id": 1 + i % 3, "dept_id": 1 + i % 12,
+            "designation_id": 1 + i % 20, "emp_type_id": 1 + i % 4, "manager_id": None if i % 50 == 0 else i // 50 + 1,
+            "first_name": f"First{i}", "last_name": f"Last{i}", "email": f"employee{i}@example.com",
+            "join_date": f"20{10 + i % 15:02d}-{1 + i % 12:02d}-{1 + i % 28:02d}", "status": "ACTIVE",
+            "created_at": "2026-01-01T09:30:00.123456+00:00",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = synthetic_employees(args.rows)
+    field = create_response_field(name="Response_list_rows", type_=List[Dict[str, Any]])
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def orjson_path() -> bytes:
+        return ORJSONResponse(rows).body
+
+    body = orjson_path()
+    results = [
+        ("fastapi response_model + json", timed(fastapi_path, args.repeat), len(fastapi_path())),
+        ("orjson passthrough", timed(orjson_path, args.repeat), len(body)),
+        (f"gzip level {GZIP_LEVEL}", timed(lambda: gzip.compress(body, GZIP_LEVEL), args.repeat),
+         len(gzip.compress(body, GZIP_LEVEL))),
+        (f"brotli quality {BROTLI_QUALITY}", timed(lambda: brotli.compress(body, quality=BROTLI_QUALITY), args.repeat),
+         len(brotli.compress(body, quality=BROTLI_QUALITY))),
+    ]
+    print(f"{args.rows} employees rows, best of {args.repeat}")
+    for name, seconds, size in results:
+        print(f"  {name:<32} {seconds * 1000:8.2f} ms   {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Streams a synthetic table through GET /{prefix}/export and checks that the
+process's peak RSS stays under a fixed ceiling, i.e. that the export does not
+grow with the table size.
+
+Runs in-process: upstream PostgREST is an httpx MockTransport that generates
+keyset pages on demand, and the ASGI app is driven directly with a ``send``
+that counts and drops body chunks (httpx's ASGITransport would buffer the
+whole response).
+
+    python benchmarks/bench_export.py --rows 1000000 --format csv --max-rss-mb 128
+
+Before that, small exports of the tables that also have a dedicated router
+under the same prefix (attendance, employees) check that /export reaches the
+generic CRUD route. Exits non-zero when one of those fails or the ceiling is
+exceeded. Settings are read from .env as usual, but no request reaches the
+configured Supabase project.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from app.db import supabase_async  # noqa: E402
+from app.main import app  # noqa: E402
+
+PK_AFTER = re.compile(r"^gt\.(\d+)$")
+
+# Table -> (primary key, row i)
+TABLES = {
+    "holidays": ("holiday_id", lambda i: {
+        "holiday_id": i, "company_id": i % 7, "holiday_date": "2026-01-01",
+        "name": f"Holiday {i}", "created_at": "2026-01-01T00:00:00+00:00",
+    }),
+    "attendance": ("attendance_id", lambda i: {
+        "attendance_id": i, "emp_id": i % 500 + 1, "attendance_date": "2026-01-01", "status": "Present",
+    }),
+    "employees": ("emp_id", lambda i: {
+        "emp_id": i, "first_name": f"First {i}", "last_name": f"Last {i}", "status": "Active",
+    }),
+}
+
+# Tables whose prefix is shared with a dedicated router (app/routers/attendance.py, employees.py)
+ROUTED_TABLES = {"attendance": "/api/attendance/export", "employees": "/api/employees/export"}
+CHECK_ROWS = 25
+
+
+def fake_postgrest(total_rows: int):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        table = request.url.path.rsplit("/", 1)[-1]
+        pk, make_row = TABLES[table]
+        rows_in_table = CHECK_ROWS if table in ROUTED_TABLES else total_rows
+        params = request.url.params
+        limit = int(params.get("limit", rows_in_table))
+        match = PK_AFTER.match(params.get(pk, ""))
+        start = int(match.group(1)) + 1 if match else 1
+        end = min(start + limit, rows_in_table + 1)
+        rows = [make_row(i) for i in range(start, end)]
+        return httpx.Response(200, content=json.dumps(rows).encode(), headers={"content-type": "application/json"})
+
+    return httpx.MockTransport(handler)
+
+
+async def check_routes() -> bool:
+    """Small NDJSON exports of ROUTED_TABLES through the whole app: each must be a 200 with every row."""
+    ok = True
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for path in ROUTED_TABLES.values():
+            response = await client.get(path, params={"format": "ndjson"})
+            lines = response.text.splitlines() if response.status_code == 200 else []
+            print(f"GET {path}?format=ndjson: {response.status_code}, {len(lines)} rows")
+            ok = ok and response.status_code == 200 and len(lines) == CHECK_ROWS
+    return ok
+
+
+async def export(fmt: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/holidays/export", "raw_path": b"/api/holidays/export",
+        "query_string": f"format={fmt}".encode(), "headers": [], "client": ("127.0.0.1", 0),
+        "server": ("bench", 80), "root_path": "",
+    }
+    received = {"status": None, "bytes": 0}
+
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Then block like a client that stays connected until the body is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            received["bytes"] += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return received
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--max-rss-mb", type=float, default=128.0, help="peak RSS ceiling for the whole process")
+    args = parser.parse_args()
+
+    supabase_async._transport = fake_postgrest(args.rows)
+    if not asyncio.run(check_routes()):
+        sys.exit(1)
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    result = asyncio.run(export(args.format))
+    elapsed = time.perf_counter() - started
+    after = peak_rss_mb()
+
+    print(f"status {result['status']}, {result['bytes'] / 2**20:.1f} MiB in {elapsed:.1f}s "
+          f"({args.rows / elapsed:,.0f} rows/s)")
+    print(f"peak RSS {before:.1f} MiB before, {after:.1f} MiB after (ceiling {args.max_rss_mb:.0f} MiB)")
+    if result["status"] != 200 or after > args.max_rss_mb:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
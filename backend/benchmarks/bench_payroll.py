@@ -0,0 +1,224 @@
+"""
+Payroll runs (app/payroll_engine.py) on synthetic employees.
+
+In-process: the fake's September 2026 inputs for --employees employees
+(benchmarks/fake_postgrest.py) go through the engine's column conversion and
+vectorized payslip computation and, for comparison, a plain per-employee
+Python loop with Decimal arithmetic. Both results are checked to be identical.
+
+    python benchmarks/bench_payroll.py --employees 20000
+
+End to end: start a run over the API against the fake, which serves the
+inputs in keyset pages and keeps the payslips written, and poll it until it
+finishes:
+
+    python benchmarks/fake_postgrest.py --latency 0.02 --payroll-employees 20000 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_payroll.py --api http://127.0.0.1:8000 --changes 0 100 1000
+
+--changes then times an incremental recompute of that run after each number
+of late corrections (the fake applies them), against the full run. Set
+PAYROLL_WORKERS on the API to shard the run across processes.
+
+Shard scaling: --shards splits --employees into that many emp_id ranges, one
+process each, like PAYROLL_WORKERS does. Every process builds its range's
+inputs as upstream response bodies, waits for the others, then does a shard's
+CPU work: parse the pages, build the columns, compute the payslips and
+serialize the payslip and detail batches. Wall time is from the first shard
+starting to the last one finishing; totals are checked against one shard.
+
+    python benchmarks/bench_payroll.py --employees 100000 --shards 1 2 4 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+import httpx
+import numpy as np
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.payroll_engine import (  # noqa: E402
+    COMPONENTS, INACTIVE_STATUSES, Cycle, _columns, compute_payslips, detail_rows, payslip_rows,
+)
+from fake_postgrest import payroll_tables  # noqa: E402
+
+CYCLE = Cycle(1, date(2026, 9, 1), date(2026, 9, 30))
+CENT = Decimal("0.01")
+
+
+def vectorized(tables):
+    inputs = _columns(
+        CYCLE, tables["employees"], tables["salary_structure"], tables["attendance"], tables["leave_requests"],
+        tables["leave_types"], tables["bonuses"], tables["reimbursements"], tables["tax_deductions"],
+    )
+    payslips = compute_payslips(inputs, CYCLE.days)
+    return {
+        emp: (lop, gross / 100, deductions / 100, net / 100)
+        for emp, lop, gross, deductions, net in zip(
+            payslips.emp_id.tolist(), payslips.lop_days.tolist(), payslips.gross.tolist(),
+            payslips.deductions.tolist(), payslips.net_pay.tolist(),
+        )
+    }
+
+
+def python_loop(tables):
+    """The straightforward version: one employee at a time, Decimal money."""
+    money = lambda value: Decimal(str(value or 0)).quantize(CENT)
+    latest = {}
+    for row in sorted(tables["salary_structure"], key=lambda r: r["salary_id"]):
+        latest[row["emp_id"]] = row
+    unpaid_types = {r["leave_type_id"] for r in tables["leave_types"]}
+    by_employee = defaultdict(lambda: defaultdict(list))
+    for table in ("attendance", "leave_requests", "bonuses", "reimbursements", "tax_deductions"):
+        for row in tables[table]:
+            by_employee[row["emp_id"]][table].append(row)
+
+    payslips = {}
+    for employee in tables["employees"]:
+        emp = employee["id"]
+        if employee["status"] in INACTIVE_STATUSES or emp not in latest:
+            continue
+        joined = date.fromisoformat(employee["join_date"])
+        if joined > CYCLE.end:
+            continue
+        rows = by_employee[emp]
+        unpaid = {d for d in range(CYCLE.days) if date(2026, 9, d + 1) < joined}
+        unpaid |= {date.fromisoformat(r["attendance_date"]).day - 1 for r in rows["attendance"]}
+        for leave in rows["leave_requests"]:
+            if leave["leave_type_id"] in unpaid_types:
+                first = max(date.fromisoformat(leave["from_date"]), CYCLE.start)
+                last = min(date.fromisoformat(leave["to_date"]), CYCLE.end)
+                unpaid |= set(range(first.day - 1, last.day)) if first <= last else set()
+        salary = latest[emp]
+        fixed = money(salary["basic"]) + money(salary["hra"]) + money(salary["allowances"])
+        loss_of_pay = (fixed * len(unpaid) / CYCLE.days).quantize(CENT, ROUND_HALF_UP)
+        gross = fixed + sum(money(r["amount"]) for r in rows["bonuses"] + rows["reimbursements"])
+        tax = min(sum((money(r["amount"]) for r in rows["tax_deductions"]), Decimal(0)), max(gross - loss_of_pay, 0))
+        deductions = loss_of_pay + tax
+        payslips[emp] = (len(unpaid), float(gross), float(deductions), float(gross - deductions))
+    return payslips
+
+
+def in_process(employees: int, seed: int):
+    tables = payroll_tables(employees, seed)
+    print(f"{employees:,} employees, " + ", ".join(f"{len(rows):,} {table}" for table, rows in tables.items()))
+
+    started = time.perf_counter()
+    fast = vectorized(tables)
+    vector_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    slow = python_loop(tables)
+    loop_seconds = time.perf_counter() - started
+
+    same = fast == slow
+    print(f"  vectorized:  {vector_seconds:6.2f}s  {len(fast):,} payslips")
+    print(f"  python loop: {loop_seconds:6.2f}s  {len(slow):,} payslips  ({loop_seconds / vector_seconds:.1f}x slower)")
+    print(f"  identical results: {same}")
+    if not same:
+        sys.exit(1)
+
+
+# Set in shard processes: all of them start their timed work together
+_barrier = None
+
+
+def _init_shard(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def cpu_shard(first: int, last: int, seed: int):
+    """A shard's CPU work on employees first..last; returns (start, end, cpu seconds, payslips, net cents)."""
+    tables = payroll_tables(last, seed, first)
+    bodies = {table: orjson.dumps(rows) for table, rows in tables.items()}
+    _barrier.wait()
+    started, cpu = time.time(), time.process_time()
+    rows = {table: orjson.loads(body) for table, body in bodies.items()}
+    inputs = _columns(
+        CYCLE, rows["employees"], rows["salary_structure"], rows["attendance"], rows["leave_requests"],
+        rows["leave_types"], rows["bonuses"], rows["reimbursements"], rows["tax_deductions"],
+    )
+    payslips = compute_payslips(inputs, CYCLE.days)
+    everyone = np.arange(len(payslips.emp_id))
+    orjson.dumps(payslip_rows(1, payslips, CYCLE.days, everyone))
+    components = {line: i for i, line in enumerate(COMPONENTS, 1)}
+    orjson.dumps(detail_rows(payslips, everyone + 1, components))
+    return started, time.time(), time.process_time() - cpu, len(payslips.emp_id), int(payslips.net_pay.sum())
+
+
+def shard_scaling(employees: int, seed: int, counts):
+    print(f"{employees:,} employees, {os.cpu_count()} CPUs")
+    context = multiprocessing.get_context("spawn")
+    baseline = None
+    for count in counts:
+        step = -(-employees // count)
+        ranges = [(first, min(first + step - 1, employees)) for first in range(1, employees + 1, step)]
+        barrier = context.Barrier(len(ranges))
+        with ProcessPoolExecutor(len(ranges), mp_context=context, initializer=_init_shard, initargs=(barrier,)) as pool:
+            results = list(pool.map(cpu_shard, *zip(*ranges), [seed] * len(ranges)))
+        wall = max(r[1] for r in results) - min(r[0] for r in results)
+        cpu = sum(r[2] for r in results)
+        payslips, net = sum(r[3] for r in results), sum(r[4] for r in results)
+        baseline = baseline or (wall, payslips, net)
+        print(f"  {len(ranges)} shards: {wall:6.2f}s wall, {cpu:6.2f}s CPU, {baseline[0] / wall:4.1f}x speedup, "
+              f"{payslips:,} payslips, net {net / 100:,.2f}, same totals: {(payslips, net) == baseline[1:]}")
+
+
+def end_to_end(api: str, cycle_id: int, changes, upstream: str):
+    base = f"{api.rstrip('/')}/api/payroll/payroll/runs"
+    started = time.perf_counter()
+    response = httpx.post(base, params={"cycle_id": cycle_id}, timeout=60)
+    response.raise_for_status()
+    run = response.json()
+    while run.get("status") == "RUNNING":
+        time.sleep(0.1)
+        run = httpx.get(f"{base}/{run['run_id']}", timeout=60).json()
+    elapsed = time.perf_counter() - started
+    print(f"run {run['run_id']} of cycle {cycle_id}: {run['status']}, {run.get('employees')} payslips, "
+          f"net {run.get('total_net')}, {elapsed:.2f}s")
+    if run.get("detail"):
+        print(f"  {run['detail']}")
+    for count in changes:
+        if count:
+            httpx.post(f"{upstream.rstrip('/')}/fake/payroll-changes", params={"count": count, "seed": count}).raise_for_status()
+        started = time.perf_counter()
+        response = httpx.post(f"{base}/{run['run_id']}/recompute", timeout=600)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        summary = response.json()
+        print(f"recompute after {count} corrections: {summary['changed']} changed, {summary['added']} added, "
+              f"{summary['removed']} removed, {summary['payslips_written']} payslips + {summary['details']} lines "
+              f"written, net {summary['total_net']}, {elapsed:.2f}s")
+        print("  stages: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in summary["seconds"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--api", help="API root: time a run through POST /api/payroll/payroll/runs instead")
+    parser.add_argument("--cycle-id", type=int, default=1, help="cycle run with --api")
+    parser.add_argument("--changes", type=int, nargs="*", default=[],
+                        help="with --api: corrections applied by the fake before each incremental recompute")
+    parser.add_argument("--upstream", default="http://127.0.0.1:54321", help="the fake PostgREST, for --changes")
+    parser.add_argument("--shards", type=int, nargs="*", help="time the per-shard CPU work with these shard counts")
+    args = parser.parse_args()
+    if args.api:
+        end_to_end(args.api, args.cycle_id, args.changes, args.upstream)
+    elif args.shards:
+        shard_scaling(args.employees, args.seed, args.shards)
+    else:
+        in_process(args.employees, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Payslip PDF rendering (app/payslip_docs.py).
+
+In-process: render --count synthetic payslips with app/pdf.py in one process.
+
+    python benchmarks/bench_payslips.py --count 2000
+
+End to end against the fake (benchmarks/fake_postgrest.py): run payroll for
+cycle 1, render every payslip, render again (all cached), then apply --changes
+late corrections, recompute the run and render once more (only the changed
+payslips are rendered). While a job renders, the API's latency is sampled to
+show the rendering does not hold it up. Finally the cycle's ZIP is downloaded
+whole, then again as an interrupted download resumed with Range / If-Range,
+and both copies are checked against each other and with zipfile.
+
+    python benchmarks/fake_postgrest.py --latency 0.02 --payroll-employees 20000 &
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000 &
+    python benchmarks/bench_payslips.py --api http://127.0.0.1:8000 --changes 100
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import statistics
+import sys
+import time
+import zipfile
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.payslip_docs import content_hash, render_payslip  # noqa: E402
+
+
+def sample_doc(emp: int) -> dict:
+    return {
+        "emp_id": emp, "employee": f"Employee {emp}", "period": "September 2026",
+        "from": "2026-09-01", "to": "2026-09-30", "paid_days": 29, "lop_days": 1,
+        "earnings": [["Basic", "52,000.00"], ["HRA", "20,800.00"], ["Allowances", "3,150.50"], ["Bonus", "5,000.00"]],
+        "deductions": [["Loss of Pay", "2,531.68"], ["Tax", "9,400.00"]],
+        "gross": "80,950.50", "total_deductions": "11,931.68", "net_pay": f"{69018 + emp % 100:,}.82",
+    }
+
+
+def in_process(count: int):
+    docs = [sample_doc(emp) for emp in range(1, count + 1)]
+    started = time.perf_counter()
+    sizes = [len(render_payslip(doc)) for doc in docs]
+    rendered = time.perf_counter() - started
+    started = time.perf_counter()
+    for doc in docs:
+        content_hash(doc)
+    hashed = time.perf_counter() - started
+    print(f"{count:,} payslips: rendered in {rendered:.2f}s ({count / rendered:,.0f}/s, "
+          f"{statistics.mean(sizes):,.0f} bytes each), hashed in {hashed:.3f}s")
+
+
+def render(client: httpx.Client, base: str, cycle_id: int, label: str):
+    started = time.perf_counter()
+    job = client.post(f"{base}/generate-report", params={"cycle_id": cycle_id}).raise_for_status().json()
+    latencies = []
+    while job["status"] in ("queued", "running"):
+        time.sleep(0.05)
+        sent = time.perf_counter()
+        job = client.get(f"{base}/reports/{job['job_id']}").json()
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {job['status']}, {job['payslips']:,} payslips, {job['rendered']:,} rendered, "
+          f"{job['cached']:,} cached, {job['failed']} failed in {elapsed:.2f}s; API latency while rendering: "
+          f"median {statistics.median(latencies) * 1000:.1f}ms, max {max(latencies) * 1000:.1f}ms")
+    if job.get("detail") or job["errors"]:
+        print(f"  {job.get('detail')} {job['errors']}")
+    return job
+
+
+def download(client: httpx.Client, url: str, headers=None):
+    """Stream ``url``; returns (response, sha256, bytes, seconds) without keeping the body."""
+    digest, size, started = hashlib.sha256(), 0, time.perf_counter()
+    with client.stream("GET", url, headers=headers) as response:
+        for chunk in response.iter_bytes():
+            digest.update(chunk)
+            size += len(chunk)
+    return response, digest, size, time.perf_counter() - started
+
+
+def archive(client: httpx.Client, api: str, cycle_id: int):
+    url = f"{api.rstrip('/')}/api/payroll/payroll/cycles/{cycle_id}/payslips.zip"
+    response, whole, size, seconds = download(client, url)
+    print(f"GET payslips.zip: {response.status_code}, {size:,} bytes in {seconds:.2f}s ({size / seconds / 1e6:.0f} MB/s)")
+    # An interrupted download: the first third, then the rest resumed against the same version
+    etag, cut = response.headers["etag"], size // 3
+    resumed = hashlib.sha256()
+    with client.stream("GET", url) as first:
+        received = 0
+        for chunk in first.iter_bytes():
+            resumed.update(chunk[:cut - received])
+            received += len(chunk)
+            if received >= cut:
+                break
+    started, rest_size = time.perf_counter(), 0
+    with client.stream("GET", url, headers={"Range": f"bytes={cut}-", "If-Range": etag}) as rest:
+        for chunk in rest.iter_bytes():
+            resumed.update(chunk)
+            rest_size += len(chunk)
+    rest_seconds = time.perf_counter() - started
+    print(f"resumed at byte {cut:,}: {rest.status_code} {rest.headers.get('content-range')}, {rest_size:,} bytes "
+          f"in {rest_seconds:.2f}s, identical to the whole download: {resumed.digest() == whole.digest()}")
+    body = client.get(url).content
+    names = zipfile.ZipFile(io.BytesIO(body)).namelist()
+    print(f"zipfile: {len(names):,} payslips, CRCs ok: {zipfile.ZipFile(io.BytesIO(body)).testzip() is None}")
+
+
+def end_to_end(api: str, cycle_id: int, changes: int, upstream: str):
+    base = f"{api.rstrip('/')}/api/payroll/payroll"
+    with httpx.Client(timeout=600) as client:
+        run = client.post(f"{base}/runs", params={"cycle_id": cycle_id}).raise_for_status().json()
+        while run.get("status") == "RUNNING":
+            time.sleep(0.2)
+            run = client.get(f"{base}/runs/{run['run_id']}").json()
+        print(f"run {run['run_id']}: {run['status']}, {run.get('employees')} payslips")
+        job = render(client, base, cycle_id, "first render")
+        render(client, base, cycle_id, "second render")
+        if changes:
+            client.post(f"{upstream.rstrip('/')}/fake/payroll-changes", params={"count": changes}).raise_for_status()
+            summary = client.post(f"{base}/runs/{run['run_id']}/recompute").raise_for_status().json()
+            print(f"recompute after {changes} corrections: {summary['changed']} changed")
+            render(client, base, cycle_id, "after recompute")
+        archive(client, api, cycle_id)
+        if job["documents"]:
+            pdf = client.get(f"{api.rstrip('/')}{job['documents'][0]['url']}")
+            print(f"GET {job['documents'][0]['url']}: {pdf.status_code} {pdf.headers.get('content-type')}, "
+                  f"{len(pdf.content):,} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--api", help="API root: time report jobs through /api/payroll/payroll/generate-report")
+    parser.add_argument("--cycle-id", type=int, default=1)
+    parser.add_argument("--changes", type=int, default=0, help="with --api: corrections before the last render")
+    parser.add_argument("--upstream", default="http://127.0.0.1:54321", help="the fake PostgREST, for --changes")
+    args = parser.parse_args()
+    if args.api:
+        end_to_end(args.api, args.cycle_id, args.changes, args.upstream)
+    else:
+        in_process(args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Minimal stand-in for the Supabase REST API, used by the benchmarks.
+
+Every GET on /rest/v1/<table> sleeps for --latency seconds (to mimic the
+network round trip to Supabase) and answers with --rows synthetic rows.
+Writes echo their payload back, except on ``attendance``, which keeps its rows
+in memory and enforces UNIQUE(emp_id, attendance_date) the way PostgREST does
+(409 / 23505, or an empty result with resolution=ignore-duplicates), and on
+``attendance_logs``, which keeps (emp_id, log_time) keys the same way and
+reports how many it holds in Content-Range. RPC calls succeed with no body,
+except ``attendance_log_columns``, which answers synthetic weekday punches
+(four a day, a few double taps) for --log-employees employees.
+
+With --payroll-employees N the payroll inputs of cycle 1 (September 2026) are
+synthetic rows for N employees, served in keyset pages (``limit`` and
+``<pk>=gt.<last>``, emp_id ranges and id lists; other filters are ignored), and
+payroll_runs, payslips and payroll_details keep what is written to them. POST /fake/payroll-changes?count=N
+then corrects N random employees' inputs (a new bonus, an absence or a salary
+revision), for timing incremental recomputes. Point the API at it with SUPABASE_URL:
+
+    python benchmarks/fake_postgrest.py --port 54321 --latency 0.05
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+LATENCY = 0.05
+ROWS = 20
+LOG_EMPLOYEES = 0
+PAYROLL_EMPLOYEES = 0
+
+# (emp_id, attendance_date) -> row
+attendance = {}
+# (emp_id, log_time) of every stored log
+attendance_logs = set()
+# Payroll input tables, rows in pk order; outputs as written
+payroll_inputs = {}
+# payroll_details: payslip_id -> its lines
+payroll_outputs = {"payroll_runs": [], "payslips": {}, "payslip_ids": 0, "payroll_details": {}, "detail_ids": 0}
+
+
+def synthetic_rows(table: str, count: int, start: int = 1):
+    return [
+        {"id": i, "name": f"{table}-{i}", "status": "ACTIVE", "created_at": "2026-01-01T00:00:00+00:00"}
+        for i in range(start, start + count)
+    ]
+
+
+def eq_filter(request: Request, column: str):
+    value = request.query_params.get(column, "")
+    return value[3:] if value.startswith("eq.") else None
+
+
+async def attendance_endpoint(request: Request) -> Response:
+    key = (eq_filter(request, "emp_id"), eq_filter(request, "attendance_date"))
+    if request.method == "GET":
+        row = attendance.get(key)
+        return Response(json.dumps([row] if row else []), media_type="application/json")
+    if request.method == "PATCH":
+        row = attendance.get(key)
+        if row is None or (request.query_params.get("check_out") == "is.null" and row["check_out"] is not None):
+            return Response("[]", media_type="application/json")
+        row.update(json.loads(await request.body()))
+        return Response(json.dumps([row]), media_type="application/json")
+    if request.method != "POST":
+        return Response("[]", media_type="application/json")
+    payload = json.loads(await request.body())
+    created = []
+    for row in payload if isinstance(payload, list) else [payload]:
+        key = (str(row["emp_id"]), str(row["attendance_date"]))
+        if key in attendance:
+            if "ignore-duplicates" in request.headers.get("prefer", ""):
+                continue
+            if "merge-duplicates" in request.headers.get("prefer", ""):
+                attendance[key].update(row)
+                created.append(attendance[key])
+                continue
+            error = {"code": "23505", "message": "duplicate key value violates unique constraint"}
+            return Response(json.dumps(error), status_code=409, media_type="application/json")
+        row = {"attendance_id": len(attendance) + 1, "check_in": None, "check_out": None, "status": None, **row}
+        attendance[key] = row
+        created.append(row)
+    if "return=minimal" in request.headers.get("prefer", ""):
+        return Response(status_code=201)
+    return Response(json.dumps(created), status_code=201, media_type="application/json")
+
+
+async def attendance_logs_endpoint(request: Request) -> Response:
+    if request.method in ("GET", "HEAD"):
+        return Response(b"" if request.method == "HEAD" else b"[]", media_type="application/json",
+                        headers={"Content-Range": f"*/{len(attendance_logs)}"})
+    payload = json.loads(await request.body())
+    ignore = "ignore-duplicates" in request.headers.get("prefer", "")
+    created = []
+    for row in payload if isinstance(payload, list) else [payload]:
+        key = (row["emp_id"], row["log_time"])
+        if key in attendance_logs:
+            if ignore:
+                continue
+            error = {"code": "23505", "message": "duplicate key value violates unique constraint"}
+            return Response(json.dumps(error), status_code=409, media_type="application/json")
+        attendance_logs.add(key)
+        created.append(row)
+    if "return=minimal" in request.headers.get("prefer", ""):
+        return Response(status_code=201)
+    return Response(json.dumps(created), status_code=201, media_type="application/json")
+
+
+def log_columns(since: datetime, until: datetime):
+    emp_ids, epochs = [], []
+    day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < until:
+        if day.weekday() < 5:
+            rng = random.Random(day.toordinal())
+            base = day.timestamp()
+            for emp_id in range(1, LOG_EMPLOYEES + 1):
+                for hour in (8, 12, 13, 17):
+                    moment = base + hour * 3600 + rng.randrange(2400)
+                    taps = 2 if rng.random() < 0.02 else 1
+                    for tap in range(taps):
+                        if since.timestamp() <= moment + tap * 5 < until.timestamp():
+                            emp_ids.append(emp_id)
+                            epochs.append(moment + tap * 5)
+        day += timedelta(days=1)
+    return {"emp_id": emp_ids, "epoch": epochs}
+
+
+# Payroll input tables and their pks; an employee's rows get pks emp_id * PK_STRIDE + 0, 1, ...
+# so pk order is emp_id order too, and an emp_id range is a slice
+PAYROLL_PKS = {"employees": "id", "salary_structure": "salary_id", "attendance": "attendance_id",
+               "leave_requests": "request_id", "bonuses": "bonus_id", "reimbursements": "reimb_id",
+               "tax_deductions": "deduction_id"}
+PK_STRIDE = 16
+FIRST_NAMES = ("Asha", "Ravi", "Meera", "John", "Fatima", "Chen", "Lucia", "Omar", "Priya", "Tomas")
+LAST_NAMES = ("Sharma", "Iyer", "Smith", "Khan", "Wei", "Garcia", "Nair", "Novak", "Okafor", "Rao")
+
+
+def payroll_tables(employees: int, seed: int = 7, first: int = 1):
+    """
+    Synthetic inputs of a September 2026 cycle for employee ids first..employees: the rows
+    app/payroll_engine.py reads, keyed by table. An employee's rows depend only on (seed, emp_id).
+    """
+    tables = {name: [] for name in PAYROLL_PKS}
+    tables["leave_types"] = [{"leave_type_id": 5}]
+    day = lambda d: (datetime(2026, 9, 1) + timedelta(days=d - 1)).date().isoformat()
+    for emp in range(first, employees + 1):
+        rng = random.Random(seed * 1_000_003 + emp)
+        rows = {name: [] for name in PAYROLL_PKS}
+        joined = f"2026-09-{rng.randint(2, 30):02d}" if rng.random() < 0.03 else "2024-01-15"
+        status = "TERMINATED" if rng.random() < 0.02 else "ACTIVE"
+        tables["employees"].append({
+            "id": emp, "first_name": rng.choice(FIRST_NAMES), "last_name": rng.choice(LAST_NAMES),
+            "join_date": joined, "status": status,
+        })
+        for revision in range(2 if rng.random() < 0.1 else 1):
+            basic = rng.randrange(2_000_000, 15_000_000) / 100
+            rows["salary_structure"].append({
+                "emp_id": emp, "basic": basic, "hra": round(basic * 0.4, 2),
+                "allowances": rng.randrange(0, 500_000) / 100,
+            })
+        for absent in rng.sample(range(1, 31), rng.choice((0, 0, 0, 1, 1, 2, 3))):
+            rows["attendance"].append({"emp_id": emp, "attendance_date": day(absent)})
+        if rng.random() < 0.08:
+            start = rng.randint(-3, 28)
+            rows["leave_requests"].append({
+                "emp_id": emp, "leave_type_id": rng.choice((1, 5, 5)),
+                "from_date": day(start), "to_date": day(start + rng.randint(0, 6)),
+            })
+        if rng.random() < 0.1:
+            rows["bonuses"].append({"emp_id": emp, "amount": rng.randrange(100_000, 2_000_000) / 100})
+        for _ in range(rng.choice((0, 0, 0, 1, 2))):
+            rows["reimbursements"].append({"emp_id": emp, "amount": rng.randrange(1_000, 300_000) / 100})
+        rows["tax_deductions"].append({"emp_id": emp, "amount": rng.randrange(0, 3_000_000) / 100})
+        for table, table_rows in rows.items():
+            for i, row in enumerate(table_rows):
+                row[PAYROLL_PKS[table]] = emp * PK_STRIDE + i
+            tables[table].extend(table_rows)
+    return tables
+
+
+def payroll_endpoint(request: Request, table: str) -> Response:
+    if table == "payroll_cycles":
+        return Response(json.dumps([{"cycle_id": 1, "month": 9, "year": 2026}]), media_type="application/json")
+    if table == "salary_components":
+        names = ("Basic", "HRA", "Allowances", "Bonus", "Reimbursement", "Loss of Pay", "Tax")
+        rows = [{"component_id": i, "name": name, "type": "DEDUCTION" if i > 5 else "EARNING"}
+                for i, name in enumerate(names, 1)]
+        return Response(json.dumps(rows), media_type="application/json")
+    if table == "payroll_runs":
+        equal = {c: v for c in ("run_id", "cycle_id", "status") if (v := eq_filter(request, c)) is not None}
+        rows = [r for r in payroll_outputs["payroll_runs"] if all(str(r.get(c)) == v for c, v in equal.items())]
+        return keyset_page(request, rows)
+    if table == "payroll_details":
+        ids = sorted(int(i) for i in in_filter(request, "payslip_id"))
+        rows = [d for i in ids for d in payroll_outputs["payroll_details"].get(i, ())]
+        return keyset_page(request, sorted(rows, key=lambda d: d["detail_id"]))
+    column = "id" if table == "employees" else "emp_id"
+    bounds = dict(value.split(".", 1) for value in request.query_params.getlist(column) if "." in value)
+    low, high = int(bounds.get("gte", 0)), int(bounds.get("lt", 2 ** 62))
+    if table == "payslips":
+        run = int(eq_filter(request, "run_id") or 0)
+        rows = [r for r in payroll_outputs["payslips"].values() if r["run_id"] == run and low <= r["emp_id"] < high]
+        rows.sort(key=lambda r: r["payslip_id"])
+    else:
+        # Input rows are in pk and emp_id order: ranges are binary searches
+        rows = payroll_inputs[table]
+        if bounds:
+            rows = rows[bisect_left(rows, low, key=lambda r: r[column]):bisect_left(rows, high, key=lambda r: r[column])]
+        if table == "employees" and in_filter(request, "id"):
+            ids = {int(i) for i in in_filter(request, "id")}
+            rows = [r for r in rows if r["id"] in ids]
+    return keyset_page(request, rows)
+
+
+def keyset_page(request: Request, rows) -> Response:
+    """``rows`` (in pk order) ordered, after the ``gt`` cursor and limited as the query asks."""
+    order = request.query_params.get("order", "id.asc")
+    pk = order.split(".")[0]
+    if order.endswith(".desc"):
+        rows = rows[::-1]
+    after = request.query_params.get(pk, "")
+    if after.startswith("gt."):
+        rows = rows[bisect_right(rows, int(after[3:]), key=lambda r: r[pk]):]
+    limit = int(request.query_params.get("limit", len(rows)))
+    return Response(json.dumps(rows[:limit]), media_type="application/json")
+
+
+def in_filter(request: Request, column: str):
+    value = request.query_params.get(column, "")
+    return set(value[4:-1].split(",")) if value.startswith("in.(") else set()
+
+
+async def payroll_write_endpoint(request: Request, table: str) -> Response:
+    if request.method == "DELETE":
+        ids = {int(i) for i in in_filter(request, "payslip_id")}
+        if table == "payslips":
+            outputs = payroll_outputs["payslips"]
+            for key in [k for k, row in outputs.items() if row["payslip_id"] in ids]:
+                del outputs[key]
+        if table == "payroll_details":
+            for payslip_id in ids:
+                payroll_outputs["payroll_details"].pop(payslip_id, None)
+        return Response(status_code=204)
+    payload = json.loads(await request.body())
+    minimal = "return=minimal" in request.headers.get("prefer", "")
+    if table == "payroll_runs" and request.method == "PATCH":
+        run_id = int(eq_filter(request, "run_id"))
+        statuses = in_filter(request, "status")
+        updated = []
+        for run in payroll_outputs["payroll_runs"]:
+            if run["run_id"] == run_id and (not statuses or run.get("status") in statuses):
+                run.update(payload)
+                updated.append(run)
+        return Response(status_code=204) if minimal else Response(json.dumps(updated), media_type="application/json")
+    if table == "payroll_runs":
+        run = {"run_id": len(payroll_outputs["payroll_runs"]) + 1, **payload}
+        payroll_outputs["payroll_runs"].append(run)
+        return Response(json.dumps([run]), status_code=201, media_type="application/json")
+    if table == "payslips":
+        created = []
+        outputs = payroll_outputs["payslips"]
+        for row in payload:
+            key = (row["run_id"], row["emp_id"])
+            if key in outputs:
+                if "merge-duplicates" not in request.headers.get("prefer", ""):
+                    error = {"code": "23505", "message": "duplicate key value violates unique constraint"}
+                    return Response(json.dumps(error), status_code=409, media_type="application/json")
+                outputs[key].update(row)
+            else:
+                payroll_outputs["payslip_ids"] += 1
+                outputs[key] = {"payslip_id": payroll_outputs["payslip_ids"], **row}
+            created.append({"payslip_id": outputs[key]["payslip_id"], "emp_id": row["emp_id"]})
+        return Response(status_code=201) if minimal else Response(
+            json.dumps(created), status_code=201, media_type="application/json")
+    if table == "payroll_details":
+        for row in payload:
+            payroll_outputs["detail_ids"] += 1
+            lines = payroll_outputs["payroll_details"].setdefault(row["payslip_id"], [])
+            lines.append({"detail_id": payroll_outputs["detail_ids"], **row})
+    return Response(status_code=201 if request.method == "POST" else 204)
+
+
+PAYROLL_READS = {"payroll_cycles", "salary_components", "payroll_runs", "payslips", "payroll_details", "employees",
+                 "salary_structure", "leave_requests", "leave_types", "bonuses", "reimbursements", "tax_deductions"}
+PAYROLL_WRITES = {"payroll_runs", "payslips", "payroll_details", "reimbursements"}
+
+
+async def payroll_changes_endpoint(request: Request) -> Response:
+    """Late corrections for ``count`` random employees, appended with fresh pks like real inserts."""
+    count = int(request.query_params.get("count", 100))
+    rng = random.Random(int(request.query_params.get("seed", 11)))
+    employees = rng.sample(range(1, PAYROLL_EMPLOYEES + 1), min(count, PAYROLL_EMPLOYEES))
+
+    def append(table: str, pk: str, row: dict) -> None:
+        # After the employee's other rows, with the next pk of their block
+        rows = payroll_inputs[table]
+        at = bisect_right(rows, row["emp_id"], key=lambda r: r["emp_id"])
+        previous = rows[at - 1][pk] if at and rows[at - 1]["emp_id"] == row["emp_id"] else None
+        rows.insert(at, {pk: row["emp_id"] * PK_STRIDE if previous is None else previous + 1, **row})
+
+    for i, emp in enumerate(employees):
+        kind = i % 3
+        if kind == 0:
+            append("bonuses", "bonus_id", {"emp_id": emp, "amount": rng.randrange(10_000, 500_000) / 100})
+        elif kind == 1:
+            append("attendance", "attendance_id", {"emp_id": emp, "attendance_date": f"2026-09-{rng.randint(1, 30):02d}"})
+        else:
+            basic = rng.randrange(2_000_000, 15_000_000) / 100
+            append("salary_structure", "salary_id", {"emp_id": emp, "basic": basic, "hra": round(basic * 0.4, 2),
+                                                     "allowances": 0})
+    return Response(json.dumps({"changed": len(employees)}), media_type="application/json")
+
+
+async def rpc_endpoint(request: Request) -> Response:
+    await asyncio.sleep(LATENCY)
+    if request.path_params["function"] == "attendance_log_columns":
+        args = json.loads(await request.body())
+        since, until = (datetime.fromisoformat(args[k]).astimezone(timezone.utc) for k in ("since", "until"))
+        return Response(json.dumps(log_columns(since, until)), media_type="application/json")
+    return Response(status_code=204)
+
+
+async def table_endpoint(request: Request) -> Response:
+    await asyncio.sleep(LATENCY)
+    table = request.path_params["table"]
+    if PAYROLL_EMPLOYEES:
+        if request.method == "GET" and (
+            table in PAYROLL_READS or (table == "attendance" and "status" in request.query_params)
+        ):
+            return payroll_endpoint(request, table)
+        if request.method in ("POST", "PATCH", "DELETE") and table in PAYROLL_WRITES:
+            return await payroll_write_endpoint(request, table)
+    if table == "attendance":
+        return await attendance_endpoint(request)
+    if table == "attendance_logs":
+        return await attendance_logs_endpoint(request)
+    if request.method in ("GET", "HEAD"):
+        rows = synthetic_rows(table, ROWS)
+        headers = {"Content-Range": f"0-{len(rows) - 1}/{len(rows)}"}
+        body = b"" if request.method == "HEAD" else json.dumps(rows).encode()
+        return Response(body, media_type="application/json", headers=headers)
+    payload = await request.body()
+    rows = json.loads(payload) if payload else []
+    if isinstance(rows, dict):
+        rows = [rows]
+    return Response(json.dumps(rows), status_code=201 if request.method == "POST" else 200,
+                    media_type="application/json")
+
+
+app = Starlette(routes=[
+    Route("/rest/v1/rpc/{function}", rpc_endpoint, methods=["POST"]),
+    Route("/fake/payroll-changes", payroll_changes_endpoint, methods=["POST"]),
+    Route("/rest/v1/{table}", table_endpoint, methods=["GET", "HEAD", "POST", "PATCH", "DELETE"]),
+])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="seconds per upstream call")
+    parser.add_argument("--rows", type=int, default=ROWS, help="rows returned per GET")
+    parser.add_argument("--log-employees", type=int, default=LOG_EMPLOYEES,
+                        help="employees punching in attendance_log_columns")
+    parser.add_argument("--payroll-employees", type=int, default=PAYROLL_EMPLOYEES,
+                        help="employees in the synthetic payroll inputs of cycle 1")
+    args = parser.parse_args()
+    LATENCY, ROWS, LOG_EMPLOYEES = args.latency, args.rows, args.log_employees
+    PAYROLL_EMPLOYEES = args.payroll_employees
+    if PAYROLL_EMPLOYEES:
+        payroll_inputs = payroll_tables(PAYROLL_EMPLOYEES)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -47,6 +47,10 @@ SUPABASE_URL: str = os.getenv("SUPABASE_URL")
 SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
 SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
+# Page sizes for the generic list endpoints (utils.crud_blueprint)
+DEFAULT_PAGE_SIZE: int = int(os.getenv("CRUD_DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE: int = int(os.getenv("CRUD_MAX_PAGE_SIZE", "1000"))
+
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # Admin client uses the service-role key (needed for auto-confirming emails)
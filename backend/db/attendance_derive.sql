@@ -0,0 +1,19 @@
+-- Daily attendance derived from attendance_logs (app/derive.py, python derive_attendance.py)
+
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS worked_hours NUMERIC(5, 2);
+
+-- Range scans by punch time for every derivation
+CREATE INDEX IF NOT EXISTS idx_attendance_logs_time ON attendance_logs (log_time);
+
+-- Punches in [since, until) as two aligned arrays {emp_id: [...], epoch: [...]}: one
+-- compact response per slice instead of pages of row objects. Both aggregates read
+-- the rows in the same order, so element i of each belongs to the same punch.
+CREATE OR REPLACE FUNCTION attendance_log_columns(since TIMESTAMPTZ, until TIMESTAMPTZ)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'emp_id', COALESCE(array_agg(emp_id), '{}'),
+        'epoch', COALESCE(array_agg(EXTRACT(EPOCH FROM log_time)::FLOAT8), '{}')
+    )
+    FROM attendance_logs
+    WHERE log_time >= since AND log_time < until AND emp_id IS NOT NULL;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,19 @@
+-- Write-behind check-ins (app/ingest.py, ATTENDANCE_WRITE_BEHIND=true)
+-- Every journaled punch carries a punch_id; the unique index makes replaying a batch
+-- after a crash or failed flush a no-op instead of a duplicate log row.
+
+ALTER TABLE attendance_logs ADD COLUMN IF NOT EXISTS punch_id UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS attendance_logs_punch_id_key ON attendance_logs (punch_id);
+
+-- Device punches (app/device_logs.py, POST /api/attendance/device-logs)
+-- Devices resend punches; UNIQUE(emp_id, log_time) lets every batch be upserted with
+-- duplicates ignored, so a resent upload (or a repeat older than the in-process dedupe
+-- window) adds nothing. Existing exact repeats are removed first, keeping the oldest row.
+
+DELETE FROM attendance_logs newer
+USING attendance_logs older
+WHERE newer.emp_id = older.emp_id
+  AND newer.log_time = older.log_time
+  AND newer.log_id > older.log_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS attendance_logs_emp_time_key ON attendance_logs (emp_id, log_time);
@@ -0,0 +1,44 @@
+-- Daily attendance rollup: one row per (date, company, department)
+-- Maintained by the API (app/rollup.py); rebuild with `python backfill_attendance_rollup.py`.
+-- Employees without a company / department are counted under 0.
+
+CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+    rollup_date DATE NOT NULL,
+    company_id INTEGER NOT NULL DEFAULT 0,
+    dept_id INTEGER NOT NULL DEFAULT 0,
+    present INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    late INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (rollup_date, company_id, dept_id)
+);
+
+-- Range scans by date for every rebuild and report
+CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (attendance_date);
+
+-- Add signed deltas [{rollup_date, company_id, dept_id, present, absent, late}, ...] in one statement
+CREATE OR REPLACE FUNCTION apply_attendance_rollup(deltas JSONB)
+RETURNS VOID AS $$
+    INSERT INTO attendance_daily_rollup AS r (rollup_date, company_id, dept_id, present, absent, late)
+    SELECT d.rollup_date, d.company_id, d.dept_id, SUM(d.present), SUM(d.absent), SUM(d.late)
+    FROM jsonb_to_recordset(deltas)
+        AS d(rollup_date DATE, company_id INTEGER, dept_id INTEGER, present INTEGER, absent INTEGER, late INTEGER)
+    GROUP BY d.rollup_date, d.company_id, d.dept_id
+    ON CONFLICT (rollup_date, company_id, dept_id) DO UPDATE SET
+        present = r.present + EXCLUDED.present,
+        absent = r.absent + EXCLUDED.absent,
+        late = r.late + EXCLUDED.late,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- Replace every rollup row of the given days with freshly counted ones, atomically
+CREATE OR REPLACE FUNCTION replace_attendance_rollup(days DATE[], counts JSONB)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM attendance_daily_rollup WHERE rollup_date = ANY(days);
+    INSERT INTO attendance_daily_rollup (rollup_date, company_id, dept_id, present, absent, late)
+    SELECT d.rollup_date, d.company_id, d.dept_id, d.present, d.absent, d.late
+    FROM jsonb_to_recordset(counts)
+        AS d(rollup_date DATE, company_id INTEGER, dept_id INTEGER, present INTEGER, absent INTEGER, late INTEGER);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,15 @@
+-- Grouped counts behind GET /api/dashboard/overview (app/routers/dashboard.py)
+
+-- Employees and job openings per department and leave requests per status, each as
+-- [[key, count], ...]: three GROUP BYs in one round trip instead of paging the tables
+CREATE OR REPLACE FUNCTION dashboard_group_counts()
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'headcount', (SELECT COALESCE(json_agg(json_build_array(dept_id, n)), '[]')
+                      FROM (SELECT dept_id, COUNT(*) AS n FROM employees GROUP BY dept_id) g),
+        'open_roles', (SELECT COALESCE(json_agg(json_build_array(dept_id, n)), '[]')
+                       FROM (SELECT dept_id, COUNT(*) AS n FROM job_openings GROUP BY dept_id) g),
+        'leave_status', (SELECT COALESCE(json_agg(json_build_array(status, n)), '[]')
+                         FROM (SELECT status, COUNT(*) AS n FROM leave_requests GROUP BY status) g)
+    );
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,105 @@
+-- Payroll runs (app/payroll_engine.py, POST /api/payroll/payroll/runs, python run_payroll.py)
+
+CREATE TABLE IF NOT EXISTS payroll_cycles (
+    cycle_id SERIAL PRIMARY KEY,
+    month INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS payroll_runs (
+    run_id SERIAL PRIMARY KEY,
+    cycle_id INTEGER REFERENCES payroll_cycles(cycle_id) ON DELETE CASCADE,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS payslips (
+    payslip_id SERIAL PRIMARY KEY,
+    emp_id INTEGER REFERENCES employees(id) ON DELETE CASCADE,
+    run_id INTEGER REFERENCES payroll_runs(run_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS salary_components (
+    component_id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL -- EARNING / DEDUCTION
+);
+
+CREATE TABLE IF NOT EXISTS payroll_details (
+    detail_id SERIAL PRIMARY KEY,
+    payslip_id INTEGER REFERENCES payslips(payslip_id) ON DELETE CASCADE,
+    component_id INTEGER REFERENCES salary_components(component_id),
+    amount NUMERIC(12, 2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bonuses (
+    bonus_id SERIAL PRIMARY KEY,
+    emp_id INTEGER REFERENCES employees(id) ON DELETE CASCADE,
+    amount NUMERIC(12, 2) NOT NULL,
+    bonus_date DATE DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS reimbursements (
+    reimb_id SERIAL PRIMARY KEY,
+    emp_id INTEGER REFERENCES employees(id) ON DELETE CASCADE,
+    amount NUMERIC(12, 2) NOT NULL,
+    status TEXT DEFAULT 'PENDING'
+);
+
+CREATE TABLE IF NOT EXISTS tax_deductions (
+    deduction_id SERIAL PRIMARY KEY,
+    emp_id INTEGER REFERENCES employees(id) ON DELETE CASCADE,
+    amount NUMERIC(12, 2) NOT NULL
+);
+
+-- Run state and totals; detail holds the error of a FAILED run
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'COMPLETED';
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS employees INTEGER;
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS total_gross NUMERIC(14, 2);
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS total_deductions NUMERIC(14, 2);
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS total_net NUMERIC(14, 2);
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS detail TEXT;
+ALTER TABLE payroll_runs ADD COLUMN IF NOT EXISTS finished_at TIMESTAMP WITH TIME ZONE;
+
+-- One run of a cycle at a time
+CREATE UNIQUE INDEX IF NOT EXISTS payroll_runs_one_running
+    ON payroll_runs (cycle_id) WHERE status = 'RUNNING';
+
+-- Payslip totals, so listing a run does not sum payroll_details
+ALTER TABLE payslips ADD COLUMN IF NOT EXISTS gross NUMERIC(12, 2);
+ALTER TABLE payslips ADD COLUMN IF NOT EXISTS deductions NUMERIC(12, 2);
+ALTER TABLE payslips ADD COLUMN IF NOT EXISTS net_pay NUMERIC(12, 2);
+ALTER TABLE payslips ADD COLUMN IF NOT EXISTS paid_days INTEGER;
+ALTER TABLE payslips ADD COLUMN IF NOT EXISTS lop_days INTEGER;
+-- Fingerprint of the inputs the payslip was computed from: a recompute skips unchanged ones
+ALTER TABLE payslips ADD COLUMN IF NOT EXISTS input_hash TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS payslips_run_emp_key ON payslips (run_id, emp_id);
+CREATE INDEX IF NOT EXISTS idx_payroll_details_payslip ON payroll_details (payslip_id);
+
+-- Leave of an unpaid type counts as loss of pay
+ALTER TABLE leave_types ADD COLUMN IF NOT EXISTS is_paid BOOLEAN DEFAULT TRUE;
+UPDATE leave_types SET is_paid = FALSE WHERE name ILIKE '%unpaid%' OR name ILIKE '%loss of pay%';
+INSERT INTO leave_types (name, description, is_paid)
+SELECT 'Unpaid Leave', 'Deducted from pay as loss of pay', FALSE
+WHERE NOT EXISTS (SELECT 1 FROM leave_types WHERE is_paid = FALSE);
+
+-- A reimbursement is paid once: by the cycle that picked it up
+ALTER TABLE reimbursements ADD COLUMN IF NOT EXISTS cycle_id INTEGER REFERENCES payroll_cycles(cycle_id);
+
+-- Range reads of the run's inputs
+CREATE INDEX IF NOT EXISTS idx_bonuses_date ON bonuses (bonus_date);
+CREATE INDEX IF NOT EXISTS idx_attendance_date_status ON attendance (attendance_date, status);
+CREATE INDEX IF NOT EXISTS idx_leave_requests_dates ON leave_requests (from_date, to_date);
+
+-- Components every payslip line refers to
+INSERT INTO salary_components (name, type)
+SELECT name, type FROM (VALUES
+    ('Basic', 'EARNING'),
+    ('HRA', 'EARNING'),
+    ('Allowances', 'EARNING'),
+    ('Bonus', 'EARNING'),
+    ('Reimbursement', 'EARNING'),
+    ('Loss of Pay', 'DEDUCTION'),
+    ('Tax', 'DEDUCTION')
+) AS c(name, type)
+WHERE NOT EXISTS (SELECT 1 FROM salary_components s WHERE s.name = c.name);
@@ -0,0 +1,64 @@
+"""
+Recompute daily attendance (first-in, last-out, worked hours) from attendance_logs
+(db/attendance_derive.sql must be applied first). Defaults to yesterday.
+
+    python derive_attendance.py
+    python derive_attendance.py --date 2026-10-17
+    python derive_attendance.py --month 2026-09
+    python derive_attendance.py --from 2026-09-01 --to 2026-10-17
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from app.db import supabase_async
+from app.derive import derive
+
+
+def month_range(value: str):
+    first = date.fromisoformat(f"{value}-01")
+    following = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, following - timedelta(days=1)
+
+
+async def run(start: date, end: date):
+    try:
+        started = time.perf_counter()
+        summary = await derive(start, end)
+        print(
+            f"Derived {start} .. {end}: {summary['punches']} punches -> {summary['records']} records "
+            f"for {summary['employees']} employees, {summary['failed']} failed "
+            f"in {time.perf_counter() - started:.1f}s {summary['seconds']}"
+        )
+        for error in summary["errors"]:
+            print(f"  emp {error['emp_id']} {error['attendance_date']}: {error['detail']}")
+    finally:
+        await supabase_async.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", type=date.fromisoformat, help="one day")
+    parser.add_argument("--month", help="a calendar month, YYYY-MM")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day of a range")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day of a range (default: yesterday)")
+    args = parser.parse_args()
+    if args.month:
+        try:
+            start, end = month_range(args.month)
+        except ValueError:
+            parser.error("--month must look like 2026-09")
+    elif args.date:
+        start = end = args.date
+    else:
+        end = args.end or date.today() - timedelta(days=1)
+        start = args.start or end
+    if start > end:
+        parser.error("--from must not be after --to")
+    asyncio.run(run(start, end))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Run payroll for one payroll_cycles month (db/payroll_engine.sql must be applied first):
+every active employee's payslip and payroll_details lines in one batch.
+
+    python run_payroll.py --cycle-id 12
+    python run_payroll.py --month 2026-09    # the cycle of that month
+    python run_payroll.py --recompute 40     # rewrite only the changed payslips of run 40
+    python run_payroll.py --month 2026-09 --workers 8   # employees sharded across 8 processes
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from app.db import supabase_async
+from app.payroll_engine import PayrollError, execute_run, reopen_run, start_run
+
+
+async def cycle_of_month(value: str) -> int:
+    year, month = (int(part) for part in value.split("-"))
+    rows, _ = await supabase_async.select(
+        "payroll_cycles", {"select": "cycle_id", "year": f"eq.{year}", "month": f"eq.{month}", "order": "cycle_id.desc"},
+    )
+    if not rows:
+        raise PayrollError(404, f"No payroll cycle for {value}")
+    return rows[0]["cycle_id"]
+
+
+async def run(cycle_id, month, recompute, workers) -> int:
+    try:
+        started = time.perf_counter()
+        if recompute is not None:
+            summary = await execute_run(await reopen_run(recompute), incremental=True, workers=workers)
+        else:
+            if cycle_id is None:
+                cycle_id = await cycle_of_month(month)
+            summary = await execute_run(await start_run(cycle_id), workers=workers)
+        print(
+            f"Run {summary['run_id']} of cycle {summary['cycle_id']}: {summary['status']}, "
+            f"{summary['employees']} payslips ({summary['payslips_written']} written), "
+            f"net {summary['total_net']:.2f}, {summary['details']} lines "
+            f"in {time.perf_counter() - started:.1f}s {summary['seconds']}"
+        )
+        if len(summary["shards"]) > 1:
+            for shard in summary["shards"]:
+                print(f"  shard {shard['shard']} {shard['emp_range']}: {shard.get('employees')} employees "
+                      f"{shard.get('seconds')}")
+        if recompute is not None:
+            print(f"  {summary['changed']} changed, {summary['added']} added, {summary['removed']} removed, "
+                  f"{summary['unchanged']} unchanged")
+            for change in summary["diff"]:
+                moved = ", ".join(
+                    f"{name} {value['before']} -> {value['after']}"
+                    for name, value in change.items() if isinstance(value, dict)
+                )
+                print(f"  emp {change['emp_id']} {change['change']}: {moved}")
+        for error in summary["errors"]:
+            print(f"  {error}")
+        return 0 if summary["status"] == "COMPLETED" else 1
+    except PayrollError as e:
+        print(e.message, file=sys.stderr)
+        return 1
+    finally:
+        await supabase_async.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--cycle-id", type=int, help="payroll_cycles.cycle_id")
+    target.add_argument("--month", help="the cycle of a calendar month, YYYY-MM")
+    target.add_argument("--recompute", type=int, metavar="RUN_ID", help="recompute a finished run incrementally")
+    parser.add_argument("--workers", type=int, help="processes to shard employees across (default PAYROLL_WORKERS)")
+    args = parser.parse_args()
+    if args.month and not (len(args.month) == 7 and args.month[4] == "-" and args.month.replace("-", "").isdigit()):
+        parser.error("--month must look like 2026-09")
+    sys.exit(asyncio.run(run(args.cycle_id, args.month, args.recompute, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
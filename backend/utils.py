@@ -3,34 +3,77 @@ Generic CRUD blueprint factory for Supabase-backed tables.
 """
 
 from flask import Blueprint, request, jsonify
-from config import supabase
+from config import supabase, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.query import (
+    RESERVED_PARAMS, QueryError, decode_cursor, encode_cursor, page_size,
+    parse_filter, select_clause,
+)
+from app.schema import TABLES
 
 
-def crud_blueprint(table_name: str, primary_key: str, bp_name: str, url_prefix: str) -> Blueprint:
+def crud_blueprint(table_name: str, primary_key: str, bp_name: str, url_prefix: str,
+                   columns=None) -> Blueprint:
     """
     Create a Flask Blueprint that provides five standard REST endpoints
     for the given Supabase table:
 
-        GET    /              — list all rows  (supports ?column=value filtering)
-        GET    /<id>          — get one row by primary key
+        GET    /              — list rows  (supports ?column=[op.]value filters,
+                                           ?limit=&after= keyset paging
+                                           and ?fields=a,b column masks)
+        GET    /<id>          — get one row by primary key  (?fields= too)
         POST   /              — insert a new row  (JSON body)
         PUT    /<id>          — update a row       (JSON body)
         DELETE /<id>          — delete a row
+
+    Filters use the PostgREST operators eq, neq, gt, gte, lt, lte, like,
+    ilike, in and is, e.g. ?attendance_date=gte.2026-01-01 or
+    ?status=in.(Approved,Pending); a bare value means equality.
+
+    ``columns`` whitelists the names accepted by ?fields= and filters; it
+    defaults to the table's entry in app/schema.py.
     """
     bp = Blueprint(bp_name, __name__, url_prefix=url_prefix)
+    known_types = TABLES.get(table_name, {})
+    if columns is None and table_name in TABLES:
+        columns = list(known_types)
+    allowed = {c: known_types.get(c) for c in columns} if columns is not None else None
 
     # ---------- LIST / FILTER ----------
     @bp.route("", methods=["GET"])
     def list_rows():
         try:
-            query = supabase.table(table_name).select("*")
+            paginated = "limit" in request.args or "after" in request.args
+            size = page_size(
+                request.args.get("limit"),
+                DEFAULT_PAGE_SIZE if paginated else MAX_PAGE_SIZE,
+                MAX_PAGE_SIZE,
+            )
+            # keyset on the primary key, one extra row tells us whether a next page exists
+            query = (
+                supabase.table(table_name)
+                .select(select_clause(request.args.get("fields"), allowed, primary_key))
+                .order(primary_key)
+                .limit(size + 1)
+            )
+            if request.args.get("after"):
+                query = query.gt(primary_key, decode_cursor(request.args["after"])[-1])
 
-            # allow simple equality filters via query-string
-            for col, val in request.args.items():
-                query = query.eq(col, val)
+            # validated operator filters via query-string, pushed down to PostgREST
+            for col, raw in request.args.items(multi=True):
+                if col not in RESERVED_PARAMS:
+                    query = query.filter(*parse_filter(col, raw, allowed))
 
-            result = query.execute()
-            return jsonify(result.data), 200
+            rows = query.execute().data
+            next_cursor = None
+            if len(rows) > size:
+                rows = rows[:size]
+                next_cursor = encode_cursor([rows[-1][primary_key]])
+
+            body = {"data": rows, "next_cursor": next_cursor} if paginated else rows
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+            return jsonify(body), 200, headers
+        except QueryError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -40,13 +83,15 @@ def crud_blueprint(table_name: str, primary_key: str, bp_name: str, url_prefix:
         try:
             result = (
                 supabase.table(table_name)
-                .select("*")
+                .select(select_clause(request.args.get("fields"), allowed, primary_key))
                 .eq(primary_key, id_val)
                 .execute()
             )
             if not result.data:
                 return jsonify({"error": "Not found"}), 404
             return jsonify(result.data[0]), 200
+        except QueryError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
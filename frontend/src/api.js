@@ -7,11 +7,50 @@ const api = axios.create({
     headers: { 'Content-Type': 'application/json' },
 });
 
+// Conditional GET: remember each response's ETag and replay the stored copy on 304 Not Modified
+const ETAG_CACHE_SIZE = 200;
+const etagCache = new Map();
+
+api.interceptors.request.use((config) => {
+    if ((config.method || 'get') === 'get') {
+        const cached = etagCache.get(api.getUri(config));
+        if (cached) {
+            config.headers['If-None-Match'] = cached.etag;
+            config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+        }
+    }
+    return config;
+});
+
+api.interceptors.response.use((response) => {
+    const { config } = response;
+    if ((config.method || 'get') !== 'get') return response;
+    const key = api.getUri(config);
+    if (response.status === 304 && etagCache.has(key)) {
+        const cached = etagCache.get(key);
+        // Refresh recency so the least recently used entry is evicted first
+        etagCache.delete(key);
+        etagCache.set(key, cached);
+        return { ...response, status: 200, data: cached.data, headers: { ...cached.headers, ...response.headers } };
+    }
+    const etag = response.headers.etag;
+    if (etag) {
+        etagCache.delete(key);
+        etagCache.set(key, { etag, data: response.data, headers: { ...response.headers } });
+        if (etagCache.size > ETAG_CACHE_SIZE) etagCache.delete(etagCache.keys().next().value);
+    }
+    return response;
+});
+
 // Generic CRUD helpers
 export const getAll = (table, params) => api.get(`/${table}`, { params });
 export const getOne = (table, id) => api.get(`/${table}/${id}`);
 export const createOne = (table, data) => api.post(`/${table}`, data);
 export const updateOne = (table, id, data) => api.put(`/${table}/${id}`, data);
 export const deleteOne = (table, id) => api.delete(`/${table}/${id}`);
+// Dashboard aggregates computed by the API
+export const getDashboardOverview = () => api.get('/dashboard/overview');
+// Streamed server-side dump (csv | ndjson); used as a plain download link
+export const exportUrl = (table, params) => api.getUri({ url: `/${table}/export`, params });
 
 export default api;
@@ -5,7 +5,10 @@ import DataTable from './DataTable';
 import CrudModal from './CrudModal';
 import ConfirmDialog from './ConfirmDialog';
 import { useToast } from './Toast';
-import { getAll, createOne, updateOne, deleteOne } from '../api';
+import { getAll, createOne, updateOne, deleteOne, exportUrl } from '../api';
+
+// Tables larger than this are searched, sorted and paged by the API instead of in the browser
+const SERVER_MODE_THRESHOLD = 1000;
 
 /**
  * Reusable CRUD page section for a single table.
@@ -13,26 +16,43 @@ import { getAll, createOne, updateOne, deleteOne } from '../api';
 export default function CrudPage({ table, pk, title, columns, fields }) {
     const [data, setData] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [serverMode, setServerMode] = useState(false);
+    const [refreshKey, setRefreshKey] = useState(0);
     const [modalOpen, setModalOpen] = useState(false);
     const [editing, setEditing] = useState(null);
     const [deleteTarget, setDeleteTarget] = useState(null);
     const toast = useToast();
 
+    // Only ask the API for the columns this page renders or edits
+    const fieldMask = [...new Set([pk, ...columns.map(c => c.key), ...(fields || []).map(f => f.key)])].join(',');
+
     const fetchData = useCallback(async () => {
         setLoading(true);
         try {
-            const res = await getAll(table);
-            setData(res.data);
+            const res = await getAll(table, { fields: fieldMask, limit: SERVER_MODE_THRESHOLD, count: 'exact' });
+            // Dedicated routers (e.g. /assets) return a bare array and cannot page: keep it client-side
+            const paged = !Array.isArray(res.data);
+            const rows = paged ? res.data.data : res.data;
+            const total = Number(res.headers['x-total-count'] ?? rows.length);
+            const large = paged && total > SERVER_MODE_THRESHOLD;
+            setServerMode(large);
+            setData(large ? [] : rows);
+            setRefreshKey(k => k + 1);
         } catch (e) {
             console.error(e);
             toast.error('Failed to load data');
         } finally {
             setLoading(false);
         }
-    }, [table]);
+    }, [table, fieldMask]);
 
     useEffect(() => { fetchData(); }, [fetchData]);
 
+    const fetchPage = useCallback(
+        (params) => getAll(table, { fields: fieldMask, ...params }),
+        [table, fieldMask],
+    );
+
     const handleSubmit = async (form) => {
         try {
             if (editing) {
@@ -75,6 +95,14 @@ export default function CrudPage({ table, pk, title, columns, fields }) {
     };
 
     const exportCSV = () => {
+        if (serverMode) {
+            // Too large to hold in the browser: let the API stream the file
+            const a = document.createElement('a');
+            a.href = exportUrl(table, { format: 'csv', fields: fieldMask });
+            a.download = `${table}_export.csv`;
+            a.click();
+            return;
+        }
         if (!data.length) { toast.warning('No data to export'); return; }
         const headers = columns.map(c => c.label);
         const rows = data.map(row => columns.map(c => {
@@ -115,6 +143,8 @@ export default function CrudPage({ table, pk, title, columns, fields }) {
                 columns={columns}
                 data={data}
                 loading={loading}
+                fetchPage={serverMode ? fetchPage : undefined}
+                refreshKey={refreshKey}
                 onEdit={handleEdit}
                 onDelete={handleDeleteClick}
             />
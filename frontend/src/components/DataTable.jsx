@@ -1,26 +1,83 @@
-import { useState, useMemo } from 'react';
+import { useState, useMemo, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Search, ChevronUp, ChevronDown, Edit2, Trash2, ChevronLeft, ChevronRight } from 'lucide-react';
 import './DataTable.css';
 
 const PAGE_SIZE = 10;
+const SEARCH_DEBOUNCE_MS = 300;
 
-export default function DataTable({ columns, data, onEdit, onDelete, loading }) {
+/**
+ * Sortable, searchable, paginated table.
+ *
+ * By default everything happens in memory on `data`. When `fetchPage` is given
+ * (large tables) search, sort and paging are delegated to the API instead:
+ * fetchPage({ limit, after, order, q, count }) must resolve to the axios
+ * response of a paginated CRUD list ({ data, next_cursor } + X-Total-Count).
+ */
+export default function DataTable({ columns, data, onEdit, onDelete, loading, fetchPage, refreshKey }) {
+    const serverMode = Boolean(fetchPage);
     const [search, setSearch] = useState('');
     const [sortCol, setSortCol] = useState(null);
     const [sortDir, setSortDir] = useState('asc');
     const [page, setPage] = useState(0);
 
+    // Server mode state: debounced search term, current page rows, total and one keyset cursor per page
+    const [query, setQuery] = useState('');
+    const [serverRows, setServerRows] = useState([]);
+    const [serverTotal, setServerTotal] = useState(0);
+    const [cursors, setCursors] = useState([null]);
+    const [serverLoading, setServerLoading] = useState(false);
+
+    useEffect(() => {
+        if (!serverMode) return undefined;
+        const t = setTimeout(() => setQuery(search.trim()), SEARCH_DEBOUNCE_MS);
+        return () => clearTimeout(t);
+    }, [search, serverMode]);
+
+    useEffect(() => {
+        setPage(0);
+        setCursors([null]);
+    }, [query, sortCol, sortDir, refreshKey]);
+
+    useEffect(() => {
+        if (!serverMode) return undefined;
+        let cancelled = false;
+        setServerLoading(true);
+        fetchPage({
+            limit: PAGE_SIZE,
+            after: cursors[page] || undefined,
+            order: sortCol ? `${sortCol}.${sortDir}` : undefined,
+            q: query || undefined,
+            count: 'exact',
+        })
+            .then(res => {
+                if (cancelled) return;
+                setServerRows(res.data.data);
+                setServerTotal(Number(res.headers['x-total-count'] ?? res.data.data.length));
+                setCursors(prev => {
+                    const next = prev.slice(0, page + 1);
+                    if (res.data.next_cursor) next[page + 1] = res.data.next_cursor;
+                    return next;
+                });
+            })
+            .catch(e => console.error(e))
+            .finally(() => { if (!cancelled) setServerLoading(false); });
+        return () => { cancelled = true; };
+        // cursors is read for the current page only; it is updated by this effect itself
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [serverMode, fetchPage, page, query, sortCol, sortDir, refreshKey]);
+
     const filtered = useMemo(() => {
+        if (serverMode) return [];
         if (!search) return data;
         const q = search.toLowerCase();
         return data.filter(row =>
             columns.some(c => String(row[c.key] ?? '').toLowerCase().includes(q))
         );
-    }, [data, search, columns]);
+    }, [data, search, columns, serverMode]);
 
     const sorted = useMemo(() => {
-        if (!sortCol) return filtered;
+        if (serverMode || !sortCol) return filtered;
         return [...filtered].sort((a, b) => {
             const va = a[sortCol] ?? '';
             const vb = b[sortCol] ?? '';
@@ -28,10 +85,13 @@ export default function DataTable({ columns, data, onEdit, onDelete, loading })
             if (va > vb) return sortDir === 'asc' ? 1 : -1;
             return 0;
         });
-    }, [filtered, sortCol, sortDir]);
+    }, [filtered, sortCol, sortDir, serverMode]);
 
-    const totalPages = Math.ceil(sorted.length / PAGE_SIZE);
-    const pageData = sorted.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
+    const total = serverMode ? serverTotal : filtered.length;
+    const totalPages = Math.ceil(total / PAGE_SIZE);
+    const pageData = serverMode ? serverRows : sorted.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
+    const isLoading = loading || (serverMode && serverLoading);
+    const hasNext = serverMode ? Boolean(cursors[page + 1]) : page < totalPages - 1;
 
     const handleSort = (key) => {
         if (sortCol === key) {
@@ -55,7 +115,7 @@ export default function DataTable({ columns, data, onEdit, onDelete, loading })
                         onChange={e => { setSearch(e.target.value); setPage(0); }}
                     />
                 </div>
-                <span className="dt-count">{filtered.length} records</span>
+                <span className="dt-count">{total} records</span>
             </div>
 
             {/* Table */}
@@ -75,7 +135,7 @@ export default function DataTable({ columns, data, onEdit, onDelete, loading })
                         </tr>
                     </thead>
                     <tbody>
-                        {loading ? (
+                        {isLoading ? (
                             <tr><td colSpan={columns.length + 1} className="dt-loading">Loading…</td></tr>
                         ) : pageData.length === 0 ? (
                             <tr><td colSpan={columns.length + 1} className="dt-empty">No data found</td></tr>
@@ -125,7 +185,7 @@ export default function DataTable({ columns, data, onEdit, onDelete, loading })
                         <ChevronLeft size={16} />
                     </button>
                     <span>{page + 1} / {totalPages}</span>
-                    <button disabled={page >= totalPages - 1} onClick={() => setPage(p => p + 1)}>
+                    <button disabled={!hasNext} onClick={() => setPage(p => p + 1)}>
                         <ChevronRight size={16} />
                     </button>
                 </div>
@@ -8,7 +8,7 @@ import {
 } from 'lucide-react';
 import { AreaChart, Area, XAxis, YAxis, Tooltip, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import StatCard from '../components/StatCard';
-import { getAll } from '../api';
+import { getDashboardOverview } from '../api';
 import './Dashboard.css';
 
 const PIE_COLORS = ['#6366f1', '#8b5cf6', '#22c55e', '#f59e0b', '#3b82f6'];
@@ -22,47 +22,28 @@ const quickActions = [
 
 export default function Dashboard() {
     const navigate = useNavigate();
-    const [stats, setStats] = useState({ employees: 0, departments: 0, companies: 0, openJobs: 0, leaves: 0, attendance: 0 });
-    const [empData, setEmpData] = useState([]);
+    const [stats, setStats] = useState({ employees: 0, departments: 0, companies: 0, openJobs: 0, leaves: 0 });
+    const [attData, setAttData] = useState([]);
     const [deptData, setDeptData] = useState([]);
 
     useEffect(() => {
         const load = async () => {
             try {
-                const [emp, dept, comp, jobs, leaves, att] = await Promise.all([
-                    getAll('employees'),
-                    getAll('departments'),
-                    getAll('companies'),
-                    getAll('job-openings'),
-                    getAll('leave-requests'),
-                    getAll('attendance'),
-                ]);
+                // Counts and chart series are aggregated (and cached) by the backend
+                const { data } = await getDashboardOverview();
                 setStats({
-                    employees: emp.data.length,
-                    departments: dept.data.length,
-                    companies: comp.data.length,
-                    openJobs: jobs.data.length,
-                    leaves: leaves.data.filter(l => l.status === 'PENDING').length,
-                    attendance: att.data.length,
+                    employees: data.totals.employees,
+                    departments: data.totals.departments,
+                    companies: data.totals.companies,
+                    openJobs: data.totals.open_roles,
+                    leaves: data.totals.pending_leaves,
                 });
 
-                // Chart data — employees by trend (mock monthly)
-                const months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'];
-                const base = Math.max(emp.data.length - 5, 1);
-                setEmpData(months.map((m, i) => ({ name: m, count: base + i })));
+                // Area data — employees present per day, last 30 days
+                setAttData(data.attendance.map(d => ({ name: d.date.slice(5), count: d.present })));
 
                 // Pie data — employees per department
-                const deptMap = {};
-                emp.data.forEach(e => {
-                    const key = e.dept_id || 'Unknown';
-                    deptMap[key] = (deptMap[key] || 0) + 1;
-                });
-                const deptNames = {};
-                dept.data.forEach(d => { deptNames[d.dept_id] = d.name; });
-                setDeptData(Object.entries(deptMap).map(([id, val]) => ({
-                    name: deptNames[id] || `Dept ${id}`,
-                    value: val,
-                })));
+                setDeptData(data.headcount_by_department.map(d => ({ name: d.name, value: d.count })));
             } catch (e) { console.error(e); }
         };
         load();
@@ -93,9 +74,9 @@ export default function Dashboard() {
                     animate={{ opacity: 1, y: 0 }}
                     transition={{ duration: 0.4, delay: 0.25 }}
                 >
-                    <h3>Employee Growth</h3>
+                    <h3>Attendance (Last 30 Days)</h3>
                     <ResponsiveContainer width="100%" height={240}>
-                        <AreaChart data={empData}>
+                        <AreaChart data={attData}>
                             <defs>
                                 <linearGradient id="colorEmp" x1="0" y1="0" x2="0" y2="1">
                                     <stop offset="5%" stopColor="#6366f1" stopOpacity={0.3} />